@@ -0,0 +1,134 @@
+"""
+Anomaly detection over every AVP × month and Brand × month series of C0-C3.
+
+For each (Type, member) the monthly C0-C3 totals form a series on a gap-free
+month axis (months without deals are 0), once across all SBUs (SBUs = 'All', as
+in fiscal.py) and once per SBU. Every cell, empty months included, is scored at
+once against its own series with a robust z-score, 0.6745 * (x - median) / MAD,
+so one spike or collapse does not hide itself by inflating a mean/std. The
+median and MAD come from the months with deals only: over a zero-filled sparse
+series both sit near 0 and any single deal would score as a spike, while a
+month that drops to 0 in a series with deals nearly every month
+(COLLAPSE_ACTIVE_SHARE) stands out as a collapse. Computed once
+per data version; the insights rule only filters the result by Type, SBU and
+month.
+"""
+import os
+import warnings
+
+import numpy as np
+import pandas as pd
+import streamlit as st
+
+from pipeline import cols_to_sum
+
+ANOMALY_DIMENSIONS = ['AVP', 'Brand Name']
+ANOMALY_Z = 3.5                # |robust z| above this is an anomaly (Iglewicz-Hoaglin)
+# A series is scored when it has deals in at least MIN_ACTIVE_SHARE of the months
+# loaded, and in no fewer than MIN_ACTIVE_MONTHS (so the median / MAD mean something)
+MIN_ACTIVE_SHARE = float(os.environ.get("C0C3_ANOMALY_MIN_SHARE", "0.5"))
+MIN_ACTIVE_MONTHS = int(os.environ.get("C0C3_ANOMALY_MIN_MONTHS", "3"))
+# An empty month is a collapse only in a series with deals in at least this share
+# of the months; in an intermittent series a month without deals is routine
+COLLAPSE_ACTIVE_SHARE = float(os.environ.get("C0C3_ANOMALY_COLLAPSE_SHARE", "0.8"))
+ALL_SBUS = 'All'
+MIN_DEVIATION = 10000000       # Ignore deviations under ₹1 Cr from the series median
+# The scale never drops below this share of the median: a member with a handful
+# of similar-sized deals has a near-0 MAD and would flag any ordinary month
+MIN_RELATIVE_SCALE = 0.25
+ANOMALY_COLUMNS = [
+    'Type', 'SBUs', 'Dimension', 'Member', 'Measure', 'Month_Sort', 'Month_Year',
+    'Value', 'Median', 'Robust Z',
+]
+
+
+def dimension_month_cube(df, dimension):
+    """
+    C0-C3 per (Type, SBU, member) and month, plus an ALL_SBUS series per (Type,
+    member), as a dense array of shape (series, measures, months), with the
+    series index and the month axis.
+    """
+    totals = df.groupby(['Type', 'SBUs', dimension, 'Month_Sort'], observed=True)[cols_to_sum].sum()
+    if totals.empty:
+        return np.empty((0, len(cols_to_sum), 0)), pd.MultiIndex.from_arrays([[], [], []]), pd.PeriodIndex([], freq='M')
+    totals.index = totals.index.set_levels(totals.index.levels[1].astype(str), level='SBUs')
+    all_sbus = totals.groupby(level=['Type', dimension, 'Month_Sort']).sum()
+    all_sbus = pd.concat({ALL_SBUS: all_sbus}, names=['SBUs']).reorder_levels(['Type', 'SBUs', dimension, 'Month_Sort'])
+    totals = pd.concat([all_sbus, totals])
+    months = totals.index.get_level_values('Month_Sort')
+    month_axis = pd.period_range(months.min(), months.max(), freq='M')
+    wide = totals.unstack('Month_Sort', fill_value=0)
+    wide = wide.reindex(columns=pd.MultiIndex.from_product([cols_to_sum, month_axis]), fill_value=0)
+    cube = wide.to_numpy(dtype='float64').reshape(len(wide), len(cols_to_sum), len(month_axis))
+    return cube, wide.index, month_axis
+
+
+def robust_z(cube, active):
+    """
+    Robust z-score of every cell against its own series (last axis), with the
+    median and MAD taken over the `active` cells only. Where the MAD is 0
+    (mostly-constant series) the mean absolute deviation stands in, and the
+    scale is floored at MIN_RELATIVE_SCALE of the median; series with no
+    active cells score 0.
+    """
+    observed = np.where(active, cube, np.nan)
+    with warnings.catch_warnings():
+        warnings.simplefilter('ignore', RuntimeWarning)  # All-NaN series: no active months
+        median = np.nanmedian(observed, axis=-1, keepdims=True)
+        deviation = np.abs(observed - median)
+        scale = np.nanmedian(deviation, axis=-1, keepdims=True) / 0.6745
+        fallback = np.nanmean(deviation, axis=-1, keepdims=True) * 1.2533
+    median = np.nan_to_num(median)
+    scale = np.nan_to_num(np.where(scale > 0, scale, fallback))
+    scale = np.maximum(scale, MIN_RELATIVE_SCALE * np.abs(median))
+    with np.errstate(divide='ignore', invalid='ignore'):
+        z = np.where(scale > 0, (cube - median) / scale, 0.0)
+    return z, median
+
+
+def compute_anomalies(df):
+    """
+    Every anomalous cell across the ANOMALY_DIMENSIONS series, strongest first.
+    """
+    found = []
+    for dimension in ANOMALY_DIMENSIONS:
+        if dimension not in df.columns:
+            continue
+        cube, series, month_axis = dimension_month_cube(df, dimension)
+        if cube.size == 0:
+            continue
+        active = cube != 0
+        z, median = robust_z(cube, active)
+        # The bar scales with the months loaded, so a short window still scores
+        months_active = active.sum(axis=-1, keepdims=True)
+        scored = (months_active >= max(MIN_ACTIVE_MONTHS, MIN_ACTIVE_SHARE * cube.shape[-1])) & (median != 0)
+        scored = scored & (active | (months_active >= COLLAPSE_ACTIVE_SHARE * cube.shape[-1]))
+        flagged = scored & (np.abs(z) > ANOMALY_Z) & (np.abs(cube - median) >= MIN_DEVIATION)
+        series_idx, measure_idx, month_idx = np.nonzero(flagged)
+        if len(series_idx) == 0:
+            continue
+        found.append(pd.DataFrame({
+            'Type': series.get_level_values(0)[series_idx],
+            'SBUs': series.get_level_values(1)[series_idx],
+            'Dimension': dimension,
+            'Member': series.get_level_values(2)[series_idx],
+            'Measure': np.array(cols_to_sum)[measure_idx],
+            'Month_Sort': month_axis[month_idx],
+            'Month_Year': month_axis[month_idx].strftime('%b %Y'),
+            'Value': cube[series_idx, measure_idx, month_idx],
+            'Median': median[series_idx, measure_idx, 0],
+            'Robust Z': z[series_idx, measure_idx, month_idx],
+        }))
+    if not found:
+        return pd.DataFrame(columns=ANOMALY_COLUMNS)
+    anomalies = pd.concat(found, ignore_index=True)
+    order = np.argsort(-np.abs(anomalies['Robust Z'].to_numpy()), kind='stable')
+    return anomalies.iloc[order].reset_index(drop=True)
+
+
+@st.cache_data(max_entries=2)
+def detect_anomalies(_df, data_version):
+    """
+    compute_anomalies, once per data version (independent of the filters).
+    """
+    return compute_anomalies(_df)
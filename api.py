@@ -0,0 +1,252 @@
+"""
+Read-only JSON API serving the same C0-C3 aggregates as the dashboard.
+
+Run next to the app:
+    python api.py --port 8503
+
+Endpoints (all GET, filters via query string: type=VAS|Retainer, month=<Mon YYYY>
+and sbu=<SBU>, the latter two repeatable):
+    /api/pipeline   Pipeline by month + TOTAL row
+    /api/funnel     Funnel stage counts
+    /api/avp        AVP metrics
+    /api/brands     Brand ranking (k=<top-k>, 1-100, default 10) with Others
+    /api/forecast   Linear-trend forecast (periods=<n>, 1-24, default 2)
+    /api/fiscal     Month / quarter / half / FY rollups vs Revenue_Summary targets
+                    (level=Month|Quarter|Half|FY, default Half; month filter ignored)
+    /api/health     Data version / row count
+
+Static reports rendered by reports.py are served from REPORTS_DIR:
+    /reports/<version>/<file>.html   (index.html lists them)
+    /reports/latest/<file>.html      The most recently published version
+
+Responses carry an ETag derived from the data version, endpoint and filters, so
+clients can send If-None-Match and get a 304 when nothing changed.
+"""
+import argparse
+import hashlib
+import json
+import logging
+import os
+import re
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlparse, parse_qs
+
+import numpy as np
+import pandas as pd
+
+from pipeline import (
+    VIEW_COLUMNS, load_prepared_data, apply_filters, prepare_shared_data, funnel_counts,
+    build_avp_metrics, forecast_trend,
+)
+from ranking import dimension_totals, rank_dimension
+from reports import REPORTS_DIR, latest_version
+from fiscal import LEVELS, fiscal_rollups, fiscal_view, revenue_targets, with_targets, target_fiscal_year
+from utils import data_version, load_revenue_summary_data
+
+logger = logging.getLogger("c0c3.api")
+
+MAX_K = 100        # Largest /api/brands k
+MAX_PERIODS = 24   # Largest /api/forecast horizon, in months
+REPORT_PATH = re.compile(r'^[A-Za-z0-9_-]+$')
+REPORT_FILE = re.compile(r'^[a-z0-9.-]+\.(html|json|js)$')
+
+
+def _json_default(value):
+    if isinstance(value, np.generic):
+        return value.item()
+    if isinstance(value, (pd.Timestamp, pd.Period)):
+        return str(value)
+    if value is pd.NaT:
+        return None
+    raise TypeError(f"Not JSON serializable: {type(value)}")
+
+
+def _records(frame):
+    return json.loads(frame.to_json(orient='records'))
+
+
+def parse_filters(query):
+    """
+    Canonical filter selection from a query string: sorted so that the same
+    selection always maps to the same cache key and ETag.
+    """
+    selected_type = query.get('type', ['VAS'])[0]
+    selected_months = tuple(sorted(query.get('month', [])))
+    selected_sbu = tuple(sorted(query.get('sbu', [])))
+    return selected_type, selected_months, selected_sbu
+
+
+def int_param(query, name, default, low, high):
+    """
+    Integer query parameter `name` in low..high; ValueError (-> 400) otherwise.
+    """
+    raw = query.get(name, [str(default)])[0]
+    try:
+        value = int(raw)
+    except ValueError:
+        raise ValueError(f"{name} must be an integer, got {raw!r}") from None
+    if not low <= value <= high:
+        raise ValueError(f"{name} must be between {low} and {high}")
+    return value
+
+
+def make_etag(version, endpoint, filter_key, params=()):
+    raw = json.dumps([version, endpoint, filter_key, params], default=str)
+    return '"' + hashlib.sha1(raw.encode()).hexdigest()[:20] + '"'
+
+
+def build_payload(endpoint, df, filter_key, query):
+    version = data_version(df)
+    filtered_df = apply_filters(df, *filter_key, columns=VIEW_COLUMNS)
+
+    if endpoint == 'pipeline':
+        agg_df, display_df, total_data = prepare_shared_data(filtered_df)
+        return {'rows': _records(display_df), 'total': total_data}
+    if endpoint == 'funnel':
+        return {'stages': _records(funnel_counts(filtered_df))}
+    if endpoint == 'avp':
+        avp_totals = dimension_totals(filtered_df, version, filter_key, 'AVP')
+        return {'rows': _records(build_avp_metrics(avp_totals))}
+    if endpoint == 'brands':
+        k = int_param(query, 'k', 10, 1, MAX_K)
+        ranking = rank_dimension(filtered_df, version, filter_key, 'Brand Name', 'C3', k=k)
+        return {
+            'top': [{'Brand Name': b, 'C3': v} for b, v in ranking.top.items()],
+            'others': ranking.others,
+            'total': ranking.total,
+        }
+    if endpoint == 'forecast':
+        periods = int_param(query, 'periods', 2, 1, MAX_PERIODS)
+        agg_df, _, _ = prepare_shared_data(filtered_df)
+        months, c0, c3 = forecast_trend(agg_df, periods=periods)
+        # NaN (single month, no trend) is not valid JSON
+        c0, c3 = ([None if np.isnan(v) else v for v in values] for values in (c0, c3))
+        return {'months': months, 'C0_Cr': c0, 'C3_Cr': c3}
+    if endpoint == 'fiscal':
+        level = query.get('level', ['Half'])[0]
+        if level not in LEVELS:
+            raise ValueError(f"level must be one of {', '.join(LEVELS)}")
+        target_fy = target_fiscal_year()
+        rollup = fiscal_view(fiscal_rollups(df, version), level, filter_key[0], filter_key[2])
+        rollup = with_targets(rollup, revenue_targets(load_revenue_summary_data()), target_fy)
+        return {'level': level, 'target_fy': target_fy, 'rows': _records(rollup.reset_index())}
+    return None
+
+
+ENDPOINTS = {'pipeline', 'funnel', 'avp', 'brands', 'forecast', 'fiscal'}
+
+
+class ApiHandler(BaseHTTPRequestHandler):
+    server_version = "C0C3Api/1.0"
+
+    def _send(self, status, body=b"", headers=None):
+        self.send_response(status)
+        for key, value in (headers or {}).items():
+            self.send_header(key, value)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        if body and self.command != 'HEAD':
+            self.wfile.write(body)
+
+    def _send_json(self, status, payload, headers=None):
+        body = json.dumps(payload, default=_json_default).encode()
+        self._send(status, body, {"Content-Type": "application/json", **(headers or {})})
+
+    def _send_report(self, parts):
+        # /reports/<version>|latest/<file>, names checked so nothing outside REPORTS_DIR is reachable
+        version = parts[1] if len(parts) > 1 else 'latest'
+        if len(parts) < 3:
+            # Redirect to the index so its relative links resolve inside the version directory
+            return self._send(302, headers={"Location": f"/reports/{version}/index.html"})
+        file_name = parts[2]
+        if version == 'latest':
+            version = latest_version()
+        if (len(parts) > 3 or not version or not REPORT_PATH.match(version)
+                or not REPORT_FILE.match(file_name)):
+            return self._send_json(404, {'error': 'not found'})
+        path = os.path.join(REPORTS_DIR, version, file_name)
+        try:
+            with open(path, 'rb') as f:
+                body = f.read()
+        except OSError:
+            return self._send_json(404, {'error': 'not found'})
+
+        # A version's reports never change, so the version and file name make the ETag
+        etag = f'"{version}-{file_name}"'
+        headers = {"ETag": etag, "Cache-Control": "no-cache"}
+        if etag in [t.strip() for t in self.headers.get("If-None-Match", "").split(',')]:
+            return self._send(304, headers=headers)
+        content_type = {
+            'html': "text/html; charset=utf-8", 'json': "application/json", 'js': "text/javascript",
+        }[file_name.rsplit('.', 1)[1]]
+        self._send(200, body, {"Content-Type": content_type, **headers})
+
+    def do_GET(self):
+        url = urlparse(self.path)
+        query = parse_qs(url.query)
+        parts = url.path.strip('/').split('/')
+        if parts[0] == 'reports':
+            return self._send_report(parts)
+        if len(parts) != 2 or parts[0] != 'api':
+            return self._send_json(404, {'error': 'not found'})
+        endpoint = parts[1]
+
+        df = load_prepared_data()
+        if df.empty:
+            return self._send_json(503, {'error': 'data unavailable'})
+        version = data_version(df)
+
+        if endpoint == 'health':
+            return self._send_json(200, {'data_version': version, 'rows': len(df)})
+        if endpoint not in ENDPOINTS:
+            return self._send_json(404, {'error': f'unknown endpoint {endpoint}'})
+
+        filter_key = parse_filters(query)
+        params = sorted((k, v) for k, v in query.items() if k not in ('type', 'month', 'sbu'))
+        etag = make_etag(version, endpoint, filter_key, params)
+        cache_headers = {"ETag": etag, "Cache-Control": "no-cache"}
+
+        # Conditional GET: unchanged data + filters -> no recompute, no body
+        if etag in [t.strip() for t in self.headers.get("If-None-Match", "").split(',')]:
+            return self._send(304, headers=cache_headers)
+
+        try:
+            payload = build_payload(endpoint, df, filter_key, query)
+        except ValueError as e:
+            return self._send_json(400, {'error': str(e)})
+        except Exception:
+            # A JSON error beats a dropped connection; the traceback goes to the log
+            logger.exception("Failed to build /api/%s for %s", endpoint, filter_key)
+            return self._send_json(500, {'error': 'internal error'})
+        payload = {
+            'data_version': version,
+            'filters': {'type': filter_key[0], 'month': filter_key[1], 'sbu': filter_key[2]},
+            **payload,
+        }
+        self._send_json(200, payload, cache_headers)
+
+    do_HEAD = do_GET
+
+    def log_message(self, format, *args):
+        logger.info("%s - %s", self.address_string(), format % args)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="C0-C3 read-only JSON API")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8503)
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(levelname)s %(name)s: %(message)s")
+    server = ThreadingHTTPServer((args.host, args.port), ApiHandler)
+    logger.info("Serving C0-C3 API on http://%s:%s/api/", args.host, args.port)
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+
+
+if __name__ == "__main__":
+    main()
@@ -1,9 +1,18 @@
 import streamlit as st
 import pandas as pd
-import plotly.express as px
-import plotly.graph_objects as go
 from datetime import datetime, timedelta
-from utils import load_google_sheet_data, load_revenue_summary_data
+from utils import cached_base_sources, load_revenue_summary_data, data_version
+from pipeline import (
+    cols_to_sum, load_prepared_data, apply_filters as filter_frame, prepare_shared_data,
+    funnel_counts, cached_prepared_sources,
+)
+from drilldown import entity_rows, group_indices, DEAL_COLUMNS
+from export import EXPORT_FORMATS, start_export
+from diagnostics import memory_report, column_memory
+from views import view_aggregates, deep_dive_figures, pipeline_table_html, detail_table
+from paging import render_paged_table
+from insights import evaluate_insights
+from anomalies import detect_anomalies
 import os
 import base64
 
@@ -22,6 +31,22 @@ st.set_page_config(
     initial_sidebar_state="collapsed"
 )
 
+# On-demand profiling (?profile=<C0C3_PROFILE_KEY>): the rerun after "Profile next rerun"
+# is sampled from here to the end of the script. Tab-specific modules (charts, catalog,
+# conversion, fiscal, prewarm, reports, comparison) are imported where they are used, so a
+# rerun only loads what it draws.
+from profiling import profiling_allowed, RerunSampler, finish_profile
+profiling_enabled = profiling_allowed(st.query_params)
+# A sampler still running here belongs to a rerun that never reached the end
+# (st.stop, a rerun request, an error): stop and save it now
+leftover_sampler = st.session_state.pop("rerun_sampler", None)
+if leftover_sampler is not None:
+    st.session_state["last_profile"] = finish_profile(leftover_sampler, interrupted=True)
+rerun_sampler = None
+if profiling_enabled and st.session_state.pop("profile_next_rerun", False):
+    rerun_sampler = RerunSampler(__file__).start()
+    st.session_state["rerun_sampler"] = rerun_sampler
+
 # Custom CSS - X (Twitter) Inspired Professional Design
 st.markdown("""
 <style>
@@ -553,44 +578,30 @@ st.markdown("""
 """, unsafe_allow_html=True)
 
 # Load Data
-df = load_google_sheet_data()
-# Default filter: Start from October 2025 onwards
-if not df.empty:
-    df = df[df['Month222'] >= '2025-10-01']
+df = load_prepared_data()
 rev_df = load_revenue_summary_data()
 
 if df.empty:
     st.error("Failed to load data. Please check the internet connection or Google Sheet permissions.")
     st.stop()
 
-# --- Prepare Pipeline Data (for Filters) ---
-df['Month_Year'] = df['Month222'].dt.strftime('%b %Y')
-df['Month_Sort'] = df['Month222'].dt.to_period('M')
+# Debug views (memory report etc.) are opt-in via ?debug=1
+debug_mode = st.query_params.get("debug") == "1"
+chart_sizes = {}
 
-# Ensure C columns are numeric
-cols_to_sum = ['C0', 'C1', 'C2', 'C3']
-for col in cols_to_sum:
-    df[col] = pd.to_numeric(df[col], errors='coerce').fillna(0)
 
-# Prepare shared aggregation data
-def prepare_shared_data(filtered_df):
-    # Aggregation
-    agg_df = filtered_df.groupby(['Month_Sort', 'Month_Year'])[cols_to_sum].sum().reset_index()
-    agg_df = agg_df.sort_values('Month_Sort')
-    display_df = agg_df.drop(columns=['Month_Sort'])
-
-    # Totals
-    total_row = display_df[cols_to_sum].sum()
-    total_data = {'Month_Year': 'TOTAL'}
-    for col in cols_to_sum:
-        total_data[col] = total_row[col]
-    return agg_df, display_df, total_data
+def show_chart(fig, name, **kwargs):
+    # st.plotly_chart, plus the serialized figure size for the debug view
+    if debug_mode:
+        from charts import figure_payload_bytes
+        chart_sizes[name] = figure_payload_bytes(fig)
+    return st.plotly_chart(fig, **kwargs)
 
 
 # --- Consolidated Header Row ---
 st.markdown('<div class="header-container">', unsafe_allow_html=True)
 # Ratios: Logo/Title, Nav Tabs, Type Toggle, Month, SBUs
-col_brand, col_tabs, col_type, col_month, col_sbu = st.columns([1.8, 1.6, 1.0, 1.0, 1.0])
+col_brand, col_tabs, col_type, col_month, col_sbu = st.columns([1.8, 2.1, 1.0, 1.0, 1.0])
 
 with col_brand:
     # Look for common logo filenames
@@ -616,42 +627,59 @@ with col_brand:
 
 with col_tabs:
     # Custom Radio Tabs
-    tab_choice = st.radio("Nav", ["Executive Overview", "Deep Dive & Insights"], horizontal=True, label_visibility="collapsed")
+    tab_choice = st.radio("Nav", ["Executive Overview", "Deep Dive & Insights", "Compare"], horizontal=True, label_visibility="collapsed", key="nav_tab")
 
 with col_type:
     # Professional pill-style toggle for Type
     selected_type = st.radio("Type", options=["VAS", "Retainer"], index=0, horizontal=True, label_visibility="collapsed")
 
+# Filter options from the per-version dimension catalog (catalog.py), each labelled with
+# its deals and C3 under the other filters. Keyed, so relabelling keeps the selection.
+from catalog import dimension_catalog, facet_counts, option_label
+catalog = dimension_catalog(df, data_version(df))
+month_options = catalog['values']['Month']
+sbu_options = catalog['values']['SBUs']
+
 with col_month:
-    month_options = df.sort_values('Month222')['Month_Year'].dropna().unique().tolist()
-    selected_months = st.multiselect("Month", options=month_options, placeholder="Month", label_visibility="collapsed")
+    month_counts = facet_counts(catalog, 'Month', selected_type, selected_sbu=st.session_state.get("selected_sbu", []))
+    selected_months = st.multiselect(
+        "Month", options=month_options, format_func=lambda m: option_label(m, month_counts),
+        placeholder="Month", label_visibility="collapsed", key="selected_months"
+    )
 
 with col_sbu:
-    sbu_options = sorted(df['SBUs'].dropna().unique().tolist())
-    selected_sbu = st.multiselect("SBUs", options=sbu_options, placeholder="SBUs", label_visibility="collapsed")
+    sbu_counts = facet_counts(catalog, 'SBUs', selected_type, selected_months=selected_months)
+    selected_sbu = st.multiselect(
+        "SBUs", options=sbu_options, format_func=lambda s: option_label(s, sbu_counts),
+        placeholder="SBUs", label_visibility="collapsed", key="selected_sbu"
+    )
 
 st.markdown('</div>', unsafe_allow_html=True)
 
 # --- Filter Logic ---
-filtered_df = df.copy()
-
-if selected_months:
-    filtered_df = filtered_df[filtered_df['Month_Year'].isin(selected_months)]
-
-if selected_sbu:
-    filtered_df = filtered_df[filtered_df['SBUs'].isin(selected_sbu)]
-
-# Type Toggle Filtering (Always applies since it's a radio)
-filtered_df = filtered_df[filtered_df['Type'] == selected_type]
-
-# Execute shared data preparation
-agg_df, display_df, total_data = prepare_shared_data(filtered_df)
-
-# Consolidate Calculations for Insights (Shared by both tabs)
-brand_perf = filtered_df.groupby('Brand Name')['C3'].sum().sort_values(ascending=False)
-avp_metrics = filtered_df.groupby('AVP')[['C0', 'C1', 'C2', 'C3']].sum().reset_index()
-avp_metrics['Total Pipeline'] = (avp_metrics['C0'] + avp_metrics['C1'] + avp_metrics['C2']) / 10000000
-avp_metrics['Realized Value'] = avp_metrics['C3'] / 10000000
+def apply_filters(frame):
+    return filter_frame(frame, selected_type, selected_months, selected_sbu)
+
+# Cache key for everything derived from this filter selection
+version = data_version(df)
+filter_key = (selected_type, tuple(selected_months), tuple(selected_sbu))
+if rerun_sampler is not None:
+    rerun_sampler.context.update(version=version, filter_key=filter_key, tab=tab_choice)
+
+# Warm the common views in the background, once per data version
+from prewarm import start_prewarm
+prewarm_report = start_prewarm(df, version)
+
+# Shared aggregates and figures for this filter state (both tabs)
+view = view_aggregates(df, version, filter_key)
+agg_df, display_df, total_data = view['agg_df'], view['display_df'], view['total_data']
+brand_totals = view['brand_totals']
+avp_totals = view['avp_totals']
+avp_metrics = view['avp_metrics']
+ts_metrics = view['ts_metrics']
+
+# AVP / brand month anomalies, scored once per data version
+anomalies = detect_anomalies(df, version)
 
 # ==========================================
 # MAIN CONTENT
@@ -663,119 +691,10 @@ if tab_choice == "Executive Overview":
     # --- Pipeline Section ---
     # Using pre-computed agg_df, display_df, and total_data
 
-    # Funnel Data - Redefined Status-based Logic
-    # C0-Ideation: Column J (C0 (Ideation/ Brainstorming Stage)) not blank
-    c0_count = filtered_df['C0 (Ideation/ Brainstorming Stage)'].notna().sum()
-    
-    # C1-Pitch: Column L (C1 (Pitch Stage)) in ('C2', 'Pitch Completed', 'Proposal Sent', 'Round 2 Needed')
-    pitch_statuses = ['C2', 'Pitch Completed', 'Proposal Sent', 'Round 2 Needed']
-    c1_count = filtered_df['C1 (Pitch Stage)'].isin(pitch_statuses).sum()
-    
-    # C2-Negotiation: Column O (C2 (Negotiation Stage)) not 'Lost' and not blank
-    c2_count = filtered_df[
-        filtered_df['C2 (Negotiation Stage)'].notna() & 
-        (filtered_df['C2 (Negotiation Stage)'].str.strip() != 'Lost') &
-        (filtered_df['C2 (Negotiation Stage)'].str.strip() != '')
-    ].shape[0]
-    
-    # C3-Closed: Column Q (C3 (Deal Closed Stage)) == 'Won'
-    c3_count = (filtered_df['C3 (Deal Closed Stage)'].str.strip() == 'Won').sum()
-
-    funnel_data = pd.DataFrame({
-        'Stage': ['C0 - Ideation', 'C1 - Pitch', 'C2 - Negotiation', 'C3 - Closed'],
-        'Count': [c0_count, c1_count, c2_count, c3_count]
-    })
-
-    fig = go.Figure(go.Funnel(
-        y = funnel_data['Stage'],
-        x = funnel_data['Count'],
-        textposition = "inside",
-        textinfo = "value+percent initial",
-        opacity = 0.9, 
-        marker = {"color": ["#1565C0", "#1976D2", "#42A5F5", "#90CAF9"]}, 
-        connector = {"fillcolor": "#E0E0E0"}
-    ))
-    fig.update_layout(
-        margin=dict(t=8, b=18, l=135, r=10),
-        paper_bgcolor="rgba(0,0,0,0)",
-        plot_bgcolor="rgba(0,0,0,0)",
-        font=dict(color="#E7E9EA", size=10),
-        height=207,
-        showlegend=False,
-        yaxis=dict(
-            showticklabels=False,
-            automargin=False
-        ),
-        hoverlabel=dict(
-            bgcolor="#16181C",
-            bordercolor="#2F3336",
-            font_size=11,
-            font_family="-apple-system, BlinkMacSystemFont, Segoe UI, Roboto, Helvetica, Arial, sans-serif",
-            font_color="white",
-            align="left"
-        )
-    )
-    
-    # Add manual left-aligned annotations for stage names
-    for i, row in funnel_data.iterrows():
-        fig.add_annotation(
-            x=-0.3,
-            y=row['Stage'],
-            text=f"<b>{row['Stage']}</b>",
-            showarrow=False,
-            xref="paper",
-            yref="y",
-            xanchor="left",
-            font=dict(color="#E7E9EA", size=11),
-        )
-    fig.update_traces(
-        textfont=dict(size=10),
-        textinfo="value+percent initial",
-        texttemplate="%{value}<br>%{percentInitial:.0%}",
-        hovertemplate=(
-            "<b>%{y}</b><br><br>"
-            "Initial: <b>%{percentInitial:.0%}</b><br>"
-            "Previous: <b>%{percentPrevious:.0%}</b>"
-            "<extra></extra>"
-        )
-    )
-
-    def fmt_cr(val):
-        return f"₹{val/10000000:.1f} Cr"
+    fig = view['fig_funnel']
 
-    # Construct HTML Table with Trends
-    html = '<div class="table-wrapper">'
-    html += '<div class="scroll-area">'
-    html += '<table class="pipeline-table" style="margin:0;">'
-    html += '<thead><tr><th>Month</th><th>C0 - Ideation</th><th>C1 - Pitch</th><th>C2 - Negotiation</th><th>C3 - Closed</th></tr></thead>'
-    html += '<tbody>'
-    
-    for i in range(len(display_df)):
-        row = display_df.iloc[i]
-        prev_row = display_df.iloc[i-1] if i > 0 else None
-        
-        row_html = f"<tr><td>{row['Month_Year']}</td>"
-        for col in cols_to_sum:
-            val = row[col]
-            trend_html = '<span class="trend-neutral">-<span class="trend-pct">0%</span></span>' # Baseline for first row
-            
-            if prev_row is not None:
-                p_val = prev_row[col]
-                if p_val > 0:
-                    diff = ((val - p_val) / p_val) * 100
-                    if diff > 0.5:
-                        trend_html = f'<span class="trend-up">▲<span class="trend-pct">{diff:.0f}%</span></span>'
-                    elif diff < -0.5:
-                        trend_html = f'<span class="trend-down">▼<span class="trend-pct">{abs(diff):.0f}%</span></span>'
-                    else:
-                        trend_html = f'<span class="trend-neutral">-<span class="trend-pct">0%</span></span>'
-            
-            row_html += f"<td>{fmt_cr(val)}{trend_html}</td>"
-        row_html += "</tr>"
-        html += row_html
-        
-    html += f"<tr class='total-row'><td>TOTAL</td><td>{fmt_cr(total_data['C0'])}</td><td>{fmt_cr(total_data['C1'])}</td><td>{fmt_cr(total_data['C2'])}</td><td>{fmt_cr(total_data['C3'])}</td></tr>"
-    html += '</tbody></table></div>'
+    # HTML pipeline table with MoM trend arrows (shared with the static reports)
+    html = pipeline_table_html(view)
 
     # Layout - Balanced Alignment with Fine-Tuned Spacer Column
     # ROW 1: Headers aligned on the same horizontal line
@@ -790,57 +709,13 @@ if tab_choice == "Executive Overview":
     with col_c_table:
         st.markdown(html, unsafe_allow_html=True)
     with col_c_funnel:
-        st.plotly_chart(fig, use_container_width=True, config={'responsive': True, 'displayModeBar': False})
+        show_chart(fig, "Funnel Analysis", use_container_width=True, config={'responsive': True, 'displayModeBar': False})
 
     # 4. c0c3 Insights (Consolidated Executive Insights)
     st.markdown('<div class="chart-header" style="margin-top: -1rem; margin-bottom: 0.5rem;">C0-C3 Insights</div>', unsafe_allow_html=True)
     
-    # --- Calculate metrics for insights ---
-    # Bottleneck Logic
-    deals_with_c0 = filtered_df['C0 (Ideation/ Brainstorming Stage)'].notna().sum()
-    deals_with_c1 = filtered_df['C1 (Pitch Stage)'].notna().sum()
-    deals_with_c2 = filtered_df['C2 (Negotiation Stage)'].notna().sum()
-    deals_with_c3 = (filtered_df['C3 (Deal Closed Stage)'].str.strip() == 'Won').sum()
-    
-    c0_to_c1 = (deals_with_c1 / deals_with_c0 * 100) if deals_with_c0 > 0 else 0
-    c1_to_c2 = (deals_with_c2 / deals_with_c1 * 100) if deals_with_c1 > 0 else 0
-    c2_to_c3 = (deals_with_c3 / deals_with_c2 * 100) if deals_with_c2 > 0 else 0
-    
-    conv_data = pd.Series({'C0→C1': c0_to_c1, 'C1→C2': c1_to_c2, 'C2→C3': c2_to_c3})
-    bottleneck_stage = conv_data.idxmin()
-    bottleneck_rate = conv_data.min()
-
-    insights = []
-    
-    # A. Forecast & Potential Unlock
-    c2_potential = (total_data['C2'] * 0.5) / 10000000 # 50% of Negotiation
-    if c2_potential > 0:
-        insights.append(f"🔮 **Revenue Forecast**: Pipeline data suggests a potential unlock of **₹{c2_potential:.2f} Cr** from deals currently in 'Negotiation' (assuming 50% closure probability). Focus on closing these C2 deals.")
-
-    # B. Bottleneck Alert
-    insights.append(f"⚠️ **Bottleneck Alert**: The lowest conversion rate is at **{bottleneck_stage}** stage (**{bottleneck_rate:.1f}%**). Focus on improving this transition to unlock pipeline potential.")
-
-    # C. Top Performer
-    if not avp_metrics.empty:
-        avp_metrics['Conv'] = (avp_metrics['Realized Value'] / avp_metrics['Total Pipeline']).fillna(0)
-        top_avp = avp_metrics.sort_values('Realized Value', ascending=False).iloc[0]
-        insights.append(f"🏆 **Top Performer**: **{top_avp['AVP']}** is leading with **₹{top_avp['Realized Value']:.1f} Cr** realized value and **{top_avp['Conv']*100:.1f}%** conversion rate.")
-
-    # D. Concentration Risk
-    top_3_brands_val = brand_perf.head(3).sum()
-    total_brands_val = brand_perf.sum()
-    if total_brands_val > 0:
-        conc_ratio = (top_3_brands_val / total_brands_val) * 100
-        risk_level = "HIGH" if conc_ratio > 50 else "MEDIUM" if conc_ratio > 30 else "LOW"
-        insights.append(f"⚖️ **Concentration Risk ({risk_level})**: The top 3 brands contribute **{conc_ratio:.1f}%** of revenue. {'Consider diversifying client base.' if risk_level == 'HIGH' else 'Monitor closely.' if risk_level == 'MEDIUM' else 'Healthy distribution.'}")
-
-    # E. Stalled Opportunities
-    brand_pipeline = filtered_df.groupby('Brand Name')[['C1', 'C2', 'C3']].sum()
-    stalled_brands = brand_pipeline[(brand_pipeline['C1'] + brand_pipeline['C2'] > 50000000) & (brand_pipeline['C3'] == 0)]
-    if not stalled_brands.empty:
-        count_stalled = len(stalled_brands)
-        example_brand = stalled_brands.index[0]
-        insights.append(f"🐢 **Stalled Opportunities**: There are **{count_stalled}** brands (e.g., **{example_brand}**) with significant pipeline value (>₹5 Cr) but zero closures. Immediate review required.")
+    # Declarative rules (insights.py), evaluated once per filter state over the cached view
+    insights = [result.message for result in evaluate_insights(view, anomalies, version, filter_key) if result.message]
 
     # Render Insights
     for i in insights:
@@ -849,80 +724,72 @@ if tab_choice == "Executive Overview":
     if not insights:
         st.success("✅ Dashboard reflects stable performance. No critical anomalies detected.")
 
+    # Fiscal rollups (fiscal.py), precomputed once per data version, against Revenue_Summary targets
+    st.markdown("<div style='margin-bottom: 1rem;'></div>", unsafe_allow_html=True)
+    fiscal_head, fiscal_pick = st.columns([2, 1])
+    with fiscal_head:
+        st.markdown('<div class="chart-header">Fiscal Summary vs Targets (₹ Cr)</div>', unsafe_allow_html=True)
+    with fiscal_pick:
+        fiscal_level = st.radio("Fiscal level", ["Quarter", "Half", "FY"], index=1, horizontal=True, label_visibility="collapsed", key="fiscal_level")
+    from fiscal import fiscal_rollups, fiscal_view, revenue_targets, with_targets, target_fiscal_year
+    target_fy = target_fiscal_year()
+    fiscal_table = with_targets(
+        fiscal_view(fiscal_rollups(df, version), fiscal_level, selected_type, tuple(selected_sbu)),
+        revenue_targets(rev_df), target_fy,
+    )
+    for col in cols_to_sum + ['Target']:
+        fiscal_table[col] = fiscal_table[col] / 10000000
+    fiscal_table['Coverage'] = fiscal_table['Coverage'] * 100
+    st.dataframe(
+        fiscal_table.reset_index()[['Period'] + cols_to_sum + ['Deals', 'C3 - Closed', 'Target', 'Attainment %', 'Coverage']],
+        hide_index=True, use_container_width=True,
+        column_config={
+            **{col: st.column_config.NumberColumn(format="₹%.2f") for col in cols_to_sum + ['Target']},
+            'C3 - Closed': st.column_config.NumberColumn("Won Deals"),
+            'Attainment %': st.column_config.NumberColumn(format="%.1f%%"),
+            'Coverage': st.column_config.NumberColumn("Months Covered", format="%.0f%%"),
+        }
+    )
+    st.caption(
+        f"Targets from Revenue_Summary apply to {target_fy}. Type and SBU filters apply; the month filter does not. "
+        f"Months Covered is the share of the period's months with deals in the data."
+    )
 
-else:
+    # Pre-rendered copy of this view (reports.py), when one exists for this data version
+    from reports import report_url
+    static_report = report_url(version, filter_key)
+    if static_report:
+        st.caption(f"[Static report for this view]({static_report})")
+
+
+elif tab_choice == "Deep Dive & Insights":
     # ==========================================
     # TAB 2: DEEP DIVE & INSIGHTS
     # ==========================================
-    
+    # Figures only this tab uses (first build pulls in plotly.express)
+    figures = deep_dive_figures(view, version, filter_key)
+
     # Calculate KPIs needed for insights
     total_pipeline = total_data['C0'] + total_data['C1'] + total_data['C2']
     total_closed = total_data['C3']
     total_pipeline_cr = total_pipeline / 10000000
     total_closed_cr = total_closed / 10000000
 
-    # Calculate comprehensive AVP metrics for insight 3
-    avp_perf = filtered_df.groupby('AVP').agg({
-        'C0': 'sum',
-        'C1': 'sum',
-        'C2': 'sum',
-        'C3': 'sum'
-    }).reset_index()
-    avp_perf['Closed Revenue (Cr)'] = avp_perf['C3'] / 10000000
 
-    
     # ROW 1: Pipeline Conversion Funnel Analytics
     conv_col1, conv_col2 = st.columns([1.6, 1])
     
     with conv_col1:
         st.markdown('<div class="chart-header">Stage Conversion Rates</div>', unsafe_allow_html=True)
-        # Calculate stage-wise deal counts
-        total_deals = len(filtered_df)
-        deals_with_c0 = filtered_df['C0 (Ideation/ Brainstorming Stage)'].notna().sum()
-        deals_with_c1 = filtered_df['C1 (Pitch Stage)'].notna().sum()
-        deals_with_c2 = filtered_df['C2 (Negotiation Stage)'].notna().sum()
-        deals_with_c3 = (filtered_df['C3 (Deal Closed Stage)'] == 'Won').sum()
-        
-        # Calculate conversion rates
-        c0_to_c1_rate = (deals_with_c1 / deals_with_c0 * 100) if deals_with_c0 > 0 else 0
-        c1_to_c2_rate = (deals_with_c2 / deals_with_c1 * 100) if deals_with_c1 > 0 else 0
-        c2_to_c3_rate = (deals_with_c3 / deals_with_c2 * 100) if deals_with_c2 > 0 else 0
-        overall_conv = (deals_with_c3 / deals_with_c0 * 100) if deals_with_c0 > 0 else 0
-        
-        conversion_data = pd.DataFrame({
-            'Stage': ['Overall', 'C2→C3', 'C1→C2', 'C0→C1'],
-            'Conversion Rate': [overall_conv, c2_to_c3_rate, c1_to_c2_rate, c0_to_c1_rate],
-            'Color': ['#00BA7C', '#42A5F5', '#1976D2', '#1565C0']
-        })
-        
-        # Chart logic follows below (Title moved to header row)
+        # Stage-wise deal counts and conversion rates (cached with the view)
+        conversion = view['conversion']
+        deals_with_c0 = conversion['deals_with_c0']
+        deals_with_c3 = conversion['deals_with_c3']
+        overall_conv = conversion['overall_conv']
+        conversion_data = conversion['conversion_data']
 
-        
-        fig_conv = go.Figure(data=[
-            go.Bar(
-                x=conversion_data['Conversion Rate'],
-                y=conversion_data['Stage'],
-                orientation='h',
-                text=[f'{x:.1f}%' for x in conversion_data['Conversion Rate']],
-                textposition='outside',
-                marker=dict(color=conversion_data['Color']),
-                hovertemplate='<b>%{y}</b><br>Conversion: %{x:.1f}%<extra></extra>'
-            )
-        ])
-        fig_conv.update_layout(
-            xaxis_title='Conversion Rate (%)',
-            yaxis_title=None,
-            height=250,
-            paper_bgcolor="rgba(0,0,0,0)",
-            plot_bgcolor="rgba(0,0,0,0)",
-            font=dict(color="#E7E9EA", size=10),
-            margin=dict(t=10, b=35, l=10, r=40),
-            showlegend=False,
-            bargap=0.4,
-            xaxis=dict(fixedrange=True, range=[0, 100]),
-            yaxis=dict(fixedrange=True)
-        )
-        st.plotly_chart(fig_conv, use_container_width=True, config={'displayModeBar': False})
+        fig_conv = figures['fig_conv']
+        show_chart(fig_conv, "Stage Conversion Rates", use_container_width=True, config={'displayModeBar': False})
     
     with conv_col2:
         st.markdown('<div class="chart-header">Pipeline Health Metrics</div>', unsafe_allow_html=True)
@@ -959,274 +826,353 @@ else:
         st.markdown(metrics_html, unsafe_allow_html=True)
     
     st.markdown("<div style='margin-bottom: 2rem;'></div>", unsafe_allow_html=True)
+
+    # ROW 2: Stage conversion per AVP / SBU / month / brand (one grouped pass, conversion.py)
+    matrix_head, matrix_pick = st.columns([2, 1])
+    with matrix_head:
+        st.markdown('<div class="chart-header">Conversion Matrix</div>', unsafe_allow_html=True)
+    from conversion import CONVERSION_DIMENSIONS, MATRIX_MAX_ROWS, RATE_COLUMNS, conversion_matrix
+    from charts import build_conversion_heatmap
+    with matrix_pick:
+        conversion_dim = st.radio("Conversion by", list(CONVERSION_DIMENSIONS), horizontal=True, label_visibility="collapsed", key="conversion_dim")
+    matrix = conversion_matrix(df, version, filter_key, CONVERSION_DIMENSIONS[conversion_dim])
+    if matrix.empty:
+        st.info("No deals at C0 for the current filters.")
+    else:
+        # Largest groups only, so long dimensions (brands) stay readable
+        shown = matrix if len(matrix) <= MATRIX_MAX_ROWS else matrix.nlargest(MATRIX_MAX_ROWS, 'Deals with C0', keep='first').sort_index()
+        show_chart(
+            build_conversion_heatmap(shown, RATE_COLUMNS), "Conversion Matrix",
+            use_container_width=True, config={'displayModeBar': False}
+        )
+        bottlenecks = matrix['Bottleneck'].value_counts()
+        st.caption(
+            f"▼ marks each row's bottleneck (lowest stage rate). Most common bottleneck: "
+            f"{bottlenecks.index[0]} ({bottlenecks.iloc[0]:,} of {len(matrix):,} {conversion_dim} rows)"
+            + (f" · showing the {MATRIX_MAX_ROWS} largest by deals at C0" if len(matrix) > MATRIX_MAX_ROWS else "")
+        )
+
+    st.markdown("<div style='margin-bottom: 2rem;'></div>", unsafe_allow_html=True)
     
-    # ROW 2: Team Performance Matrix
+    # ROW 3: Team Performance Matrix
     st.markdown('<div class="chart-header">Performance Matrix: Pipeline vs Conversion</div>', unsafe_allow_html=True)
     
-    # Calculate comprehensive AVP metrics
-    avp_perf = filtered_df.groupby('AVP').agg({
-        'C0': 'sum',
-        'C1': 'sum',
-        'C2': 'sum',
-        'C3': 'sum'
-    }).reset_index()
-    
-    avp_perf['Total Pipeline (Cr)'] = (avp_perf['C0'] + avp_perf['C1'] + avp_perf['C2']) / 10000000
-    avp_perf['Closed Revenue (Cr)'] = avp_perf['C3'] / 10000000
-    avp_perf['Conversion Rate (%)'] = (avp_perf['C3'] / avp_perf['C0'] * 100).fillna(0)
-    
-    # Count deals per AVP
-    avp_deal_counts = filtered_df.groupby('AVP').size().reset_index(name='Deal Count')
-    avp_perf = avp_perf.merge(avp_deal_counts, on='AVP')
-    avp_perf['Avg Deal Size (Cr)'] = (avp_perf['Closed Revenue (Cr)'] / avp_perf['Deal Count']).fillna(0)
-    
-    # Performance scatter plot - Full width
-    fig_perf = px.scatter(
-        avp_perf,
-        x='Total Pipeline (Cr)',
-        y='Conversion Rate (%)',
-        size='Closed Revenue (Cr)',
-        color='Closed Revenue (Cr)',
-        text='AVP',
-        color_continuous_scale='Viridis',
-        hover_data={'Total Pipeline (Cr)': ':.2f', 
-                   'Conversion Rate (%)': ':.1f',
-                   'Closed Revenue (Cr)': ':.2f',
-                   'Avg Deal Size (Cr)': ':.2f'}
+    # Per-AVP pipeline vs conversion (cached with the view, incl. binned plot points)
+    fig_perf, perf_plot_df = figures['fig_perf'], figures['perf_plot_df']
+    perf_event = show_chart(
+        fig_perf, "Performance Matrix", use_container_width=True, config={'displayModeBar': False},
+        on_select="rerun", selection_mode="points", key="perf_matrix"
     )
-    fig_perf.update_traces(textposition='top center', textfont=dict(size=11))
-    
-    # Calculate y-axis range with padding to prevent label clipping
-    if len(avp_perf) > 0:
-        max_conversion = avp_perf['Conversion Rate (%)'].max()
-        y_max_perf = max_conversion * 1.30  # Add 30% padding above max value
-    else:
-        y_max_perf = 100
-    
-    fig_perf.update_layout(
-        xaxis_title='Total Pipeline (₹ Cr)',
-        yaxis_title='Conversion Rate (%)',
-        height=250,
-        paper_bgcolor="rgba(0,0,0,0)",
-        plot_bgcolor="rgba(0,0,0,0)",
-        font=dict(color="#E7E9EA", size=10),
-        margin=dict(t=35, b=35, l=45, r=20),
-        xaxis=dict(showgrid=True, gridcolor='rgba(255,255,255,0.05)', fixedrange=True),
-        yaxis=dict(
-            showgrid=True, 
-            gridcolor='rgba(255,255,255,0.05)', 
-            fixedrange=True,
-            range=[0, y_max_perf]
-        ),
-        showlegend=False
-    )
-    st.plotly_chart(fig_perf, use_container_width=True, config={'displayModeBar': False})
+
+    # Clicking an AVP bubble opens it in the drill-down below
+    perf_points = perf_event.selection.points if perf_event else []
+    clicked_point = perf_plot_df.iloc[perf_points[0]['point_index']] if perf_points else None
+    # Binned points stand for several AVPs and are not drillable
+    if clicked_point is not None and clicked_point['Members'] == 1:
+        clicked_avp = clicked_point['AVP']
+        if st.session_state.get('last_perf_click') != clicked_avp:
+            st.session_state['last_perf_click'] = clicked_avp
+            st.session_state['drill_dim'] = 'AVP'
+            st.session_state['drill_entity_AVP'] = clicked_avp
     
     st.markdown("<div style='margin-bottom: 2rem;'></div>", unsafe_allow_html=True)
     
-    # ROW 3: Revenue Analysis
+    # ROW 4: Revenue Analysis
     rev_col1, rev_col2 = st.columns(2)
     
     with rev_col1:
         st.markdown('<div class="chart-header">Revenue Shares By Brands</div>', unsafe_allow_html=True)
         # Top brands revenue concentration + Others
-        brand_revenue = filtered_df.groupby('Brand Name')['C3'].sum().sort_values(ascending=False)
-        total_revenue = brand_revenue.sum()
+        fig_brands = figures['fig_brands']
         
-        if total_revenue > 0:
-            top_5 = brand_revenue.head(5)
-            others_sum = brand_revenue.iloc[5:].sum()
-            treemap_df = pd.DataFrame([
-                {'Brand': b, 'Revenue (Cr)': v / 10000000, 'Share': (v / total_revenue * 100)}
-                for b, v in top_5.items()
-            ])
-            
-            if others_sum > 0:
-                others_row = pd.DataFrame([{
-                    'Brand': 'Others',
-                    'Revenue (Cr)': others_sum / 10000000,
-                    'Share': (others_sum / total_revenue * 100)
-                }])
-                treemap_df = pd.concat([treemap_df, others_row], ignore_index=True)
-                
-            # Professional color palette - sophisticated gradient
-            color_palette = [
-                '#0A4D68',  # Deep teal (darkest)
-                '#088395',  # Ocean blue
-                '#05BFDB',  # Bright cyan
-                '#00D9FF',  # Vibrant cyan
-                '#7FDBFF',  # Light cyan
-                '#B8E6F0'   # Pale cyan (lightest - for Others)
-            ]
-            
-            # Assign colors based on revenue (highest to lowest)
-            treemap_df['Color'] = color_palette[:len(treemap_df)]
-            
-            # Determine text color based on background brightness
-            def get_text_color(hex_color):
-                # Convert hex to RGB
-                hex_color = hex_color.lstrip('#')
-                r, g, b = int(hex_color[0:2], 16), int(hex_color[2:4], 16), int(hex_color[4:6], 16)
-                # Calculate luminance
-                luminance = (0.299 * r + 0.587 * g + 0.114 * b) / 255
-                return '#FFFFFF' if luminance < 0.6 else '#1A1A1A'
-            
-            treemap_df['TextColor'] = treemap_df['Color'].apply(get_text_color)
-            
-            fig_brands = px.treemap(
-                treemap_df,
-                path=['Brand'],
-                values='Revenue (Cr)',
-                color='Color',
-                color_discrete_map={c: c for c in color_palette}
-            )
-            
-            fig_brands.update_traces(
-                textinfo="label+text",
-                text=[f"₹{r:.1f}Cr ({s:.1f}%)" for r, s in zip(treemap_df['Revenue (Cr)'], treemap_df['Share'])],
-                hovertemplate='<b>%{label}</b><br>Revenue: ₹%{value:.2f}Cr<extra></extra>',
-                textfont=dict(size=11),
-                marker=dict(
-                    colors=treemap_df['Color'].tolist(),
-                    line=dict(color='#2C2C2C', width=2)
-                )
-            )
-            
-            fig_brands.update_layout(
-                height=250,
-                margin=dict(t=5, b=5, l=5, r=5),
-                paper_bgcolor="rgba(0,0,0,0)",
-                plot_bgcolor="rgba(0,0,0,0)",
-                coloraxis_showscale=False
-            )
-            st.plotly_chart(fig_brands, use_container_width=True, config={'displayModeBar': False})
+        if fig_brands is not None:
+            show_chart(fig_brands, "Revenue Shares By Brands", use_container_width=True, config={'displayModeBar': False})
         else:
             st.info("No C3 revenue data available for current selection.")
     
     with rev_col2:
         st.markdown('<div class="chart-header">Pipeline vs Closed Revenue Trends (with Forecast)</div>', unsafe_allow_html=True)
         # Monthly trend with insights
-        monthly_trend = agg_df.copy()
-        monthly_trend['C0_Cr'] = monthly_trend['C0'] / 10000000
-        monthly_trend['C3_Cr'] = monthly_trend['C3'] / 10000000
-        monthly_trend['Pipeline Coverage'] = (monthly_trend['C0'] / monthly_trend['C3']).fillna(0)
-        
-        # Simple linear regression forecast for next 2 months (using numpy only)
-        import numpy as np
-        
-        # Prepare data for forecasting
-        n_months = len(monthly_trend)
-        X = np.arange(n_months)
-        
-        # Simple linear regression function
-        def simple_forecast(x, y, future_x):
-            # Calculate slope and intercept
-            x_mean = np.mean(x)
-            y_mean = np.mean(y)
-            slope = np.sum((x - x_mean) * (y - y_mean)) / np.sum((x - x_mean) ** 2)
-            intercept = y_mean - slope * x_mean
-            # Predict future values
-            return slope * future_x + intercept
-        
-        # Forecast Pipeline (C0) and Closed (C3)
-        y_c0 = monthly_trend['C0_Cr'].values
-        y_c3 = monthly_trend['C3_Cr'].values
-        
-        # Generate forecasts for next 2 months (Feb 2026, Mar 2026)
-        future_months = ['Feb 2026', 'Mar 2026']
-        forecast_c0 = [simple_forecast(X, y_c0, n_months), simple_forecast(X, y_c0, n_months + 1)]
-        forecast_c3 = [simple_forecast(X, y_c3, n_months), simple_forecast(X, y_c3, n_months + 1)]
+        fig_trend = figures['fig_trend']
+        show_chart(fig_trend, "Revenue Trends", use_container_width=True, config={'displayModeBar': False})
+    
+    
+    st.markdown("<div style='margin-bottom: 2rem;'></div>", unsafe_allow_html=True)
+    
+    # ROW 5: Per-AVP / per-brand detail, one page at a time (paging.py)
+    detail_head, detail_pick = st.columns([2, 1])
+    with detail_head:
+        st.markdown('<div class="chart-header">AVP & Brand Detail (₹ Cr)</div>', unsafe_allow_html=True)
+    with detail_pick:
+        detail_dim = st.radio("Detail by", ["Brand Name", "AVP"], horizontal=True, label_visibility="collapsed", key="detail_dim")
+    detail_rows, detail_total = detail_table(view, version, filter_key, detail_dim)
+    render_paged_table(
+        detail_rows, f"detail_{detail_dim}", version, (filter_key, detail_dim), totals=detail_total,
+        sort_by='C3',
+        column_config={
+            **{col: st.column_config.NumberColumn(format="₹%.2f") for col in cols_to_sum + ['Total Pipeline']},
+            'Conversion %': st.column_config.NumberColumn(format="%.1f%%"),
+            'Deals': st.column_config.NumberColumn(format="%d"),
+        },
+    )
 
-        
-        # Combine actual and forecast data
-        all_months = list(monthly_trend['Month_Year']) + future_months
-        
-        fig_trend = go.Figure()
-        
-        # Actual Pipeline (C0) - solid line
-        fig_trend.add_trace(go.Scatter(
-            x=monthly_trend['Month_Year'], 
-            y=monthly_trend['C0_Cr'], 
-            mode='lines+markers+text', 
-            name='Pipeline (C0)',
-            line=dict(color='#1565C0', width=2),
-            marker=dict(size=8),
-            text=[f'₹{val:.1f}Cr' for val in monthly_trend['C0_Cr']],
-            textposition='top center',
-            textfont=dict(size=7)
-        ))
-        
-        # Forecast Pipeline (C0) - dashed line
-        fig_trend.add_trace(go.Scatter(
-            x=[monthly_trend['Month_Year'].iloc[-1]] + future_months,
-            y=[monthly_trend['C0_Cr'].iloc[-1]] + list(forecast_c0),
-            mode='lines+markers+text',
-            name='Pipeline (Forecast)',
-            line=dict(color='#1565C0', width=2, dash='dash'),
-            marker=dict(size=8, symbol='diamond'),
-            text=[''] + [f'₹{val:.1f}Cr' for val in forecast_c0],
-            textposition='top center',
-            textfont=dict(size=7)
-        ))
-        
-        # Actual Closed (C3) - solid line
-        fig_trend.add_trace(go.Scatter(
-            x=monthly_trend['Month_Year'], 
-            y=monthly_trend['C3_Cr'], 
-            mode='lines+markers+text', 
-            name='Closed (C3)',
-            line=dict(color='#00BA7C', width=2),
-            marker=dict(size=8),
-            text=[f'₹{val:.1f}Cr' for val in monthly_trend['C3_Cr']],
-            textposition='bottom center',
-            textfont=dict(size=7)
-        ))
-        
-        # Forecast Closed (C3) - dashed line
-        fig_trend.add_trace(go.Scatter(
-            x=[monthly_trend['Month_Year'].iloc[-1]] + future_months,
-            y=[monthly_trend['C3_Cr'].iloc[-1]] + list(forecast_c3),
-            mode='lines+markers+text',
-            name='Closed (Forecast)',
-            line=dict(color='#00BA7C', width=2, dash='dash'),
-            marker=dict(size=8, symbol='diamond'),
-            text=[''] + [f'₹{val:.1f}Cr' for val in forecast_c3],
-            textposition='bottom center',
-            textfont=dict(size=7)
-        ))
-        
-        # Calculate y-axis range with padding to prevent label clipping
-        all_values = list(monthly_trend['C0_Cr']) + list(monthly_trend['C3_Cr']) + list(forecast_c0) + list(forecast_c3)
-        max_value = max(all_values)
-        y_max = max_value * 1.25  # Add 25% padding above max value
-        
-        fig_trend.update_layout(
-            yaxis_title='Value (₹ Cr)',
-            xaxis_title=None,
-            hovermode='x unified',
-            legend=dict(
-                orientation="h",
-                yanchor="bottom",
-                y=1.02,
-                xanchor="center",
-                x=0.5,
-                bgcolor='rgba(0,0,0,0)',
-                font=dict(size=9)
+    st.markdown("<div style='margin-bottom: 2rem;'></div>", unsafe_allow_html=True)
+
+    # ROW 6: Drill-down into a single AVP or Brand (row take via cached group indices)
+    st.markdown('<div class="chart-header">Drill-down</div>', unsafe_allow_html=True)
+    drill_col1, drill_col2 = st.columns([1, 2])
+    with drill_col1:
+        drill_dim = st.radio("Drill by", ["AVP", "Brand Name"], horizontal=True, label_visibility="collapsed", key="drill_dim")
+    with drill_col2:
+        # Options ordered by realized value under the current filters
+        drill_totals = avp_totals if drill_dim == 'AVP' else brand_totals
+        drill_options = drill_totals['C3'].sort_values(ascending=False).index.tolist()
+        drill_entity = st.selectbox(
+            drill_dim, options=drill_options, index=None, placeholder=f"Select {drill_dim}",
+            label_visibility="collapsed", key=f"drill_entity_{drill_dim}"
+        )
+
+    if drill_entity is not None:
+        drill_df = apply_filters(entity_rows(df, version, drill_dim, drill_entity))
+        if drill_df.empty:
+            st.info(f"No deals for {drill_entity} under the current filters.")
+        else:
+            drill_agg, drill_display, drill_total = prepare_shared_data(drill_df)
+            drill_table = pd.concat([drill_display, pd.DataFrame([drill_total])], ignore_index=True)
+            for col in cols_to_sum:
+                drill_table[col] = drill_table[col] / 10000000
+
+            drill_c1, drill_c2 = st.columns([1.5, 1])
+            with drill_c1:
+                st.markdown(f'<div class="chart-header">{drill_entity}: Monthly Pipeline (₹ Cr)</div>', unsafe_allow_html=True)
+                st.dataframe(
+                    drill_table.rename(columns={'Month_Year': 'Month'}),
+                    hide_index=True, use_container_width=True,
+                    column_config={col: st.column_config.NumberColumn(format="₹%.2f") for col in cols_to_sum}
+                )
+            from charts import build_funnel_figure
+            with drill_c2:
+                st.markdown(f'<div class="chart-header">{drill_entity}: Funnel</div>', unsafe_allow_html=True)
+                show_chart(build_funnel_figure(funnel_counts(drill_df)), "Drill-down Funnel", use_container_width=True, config={'displayModeBar': False})
+
+            st.markdown(f'<div class="chart-header">{drill_entity}: Deals ({len(drill_df):,})</div>', unsafe_allow_html=True)
+            deal_cols = [c for c in DEAL_COLUMNS if c in drill_df.columns]
+            deal_table = drill_df[deal_cols]
+            deal_total = deal_table[cols_to_sum].sum()
+            deal_total[deal_cols[0]] = 'TOTAL'
+            render_paged_table(
+                deal_table, "drill_deals", version, (filter_key, drill_dim, drill_entity),
+                totals=deal_total, sort_by='C3',
+            )
+
+else:
+    # ==========================================
+    # TAB 3: COMPARE (two or more selections side by side)
+    # ==========================================
+    st.markdown("<div style='margin-bottom: 1rem;'></div>", unsafe_allow_html=True)
+    from comparison import COMPARE_BY, comparison_selections, compare_selections, with_deltas
+    from charts import build_comparison_funnel_figure
+    cmp_col1, cmp_col2 = st.columns([1, 2])
+    with cmp_col1:
+        compare_by = st.radio("Compare by", COMPARE_BY, horizontal=True, label_visibility="collapsed", key="compare_by")
+    with cmp_col2:
+        if compare_by == 'Type':
+            compare_members = ["VAS", "Retainer"]
+            st.caption("VAS vs Retainer under the current Month and SBU filters")
+        else:
+            # The compared values replace that header filter; the others still apply
+            member_options = month_options if compare_by == 'Month' else sbu_options
+            compare_members = st.multiselect(
+                compare_by, options=member_options, default=member_options[:2],
+                placeholder=f"Pick {compare_by} to compare", label_visibility="collapsed",
+                key=f"compare_members_{compare_by}"
+            )
+
+    if len(compare_members) < 2:
+        st.info(f"Pick at least two {compare_by} values to compare.")
+    else:
+        # All selections in one grouped pass, cached per (data version, selections)
+        selections = comparison_selections(compare_by, compare_members, selected_type, selected_months, selected_sbu)
+        comparison = compare_selections(df, version, tuple(selections.items()))
+        summary = comparison['summary']
+        baseline = comparison['labels'][0]
+
+        # ROW 1: Headline numbers per selection, deltas against the first
+        kpi_cols = st.columns(len(comparison['labels']))
+        for kpi_col, label in zip(kpi_cols, comparison['labels']):
+            with kpi_col:
+                st.markdown(f'<div class="chart-header">{label}</div>', unsafe_allow_html=True)
+                for metric, row, unit in [
+                    ("Closed Revenue", 'C3 (₹ Cr)', 'Cr'),
+                    ("Total Pipeline", 'Total Pipeline (₹ Cr)', 'Cr'),
+                    ("Overall Conversion", 'Overall Conversion %', '%'),
+                ]:
+                    value = summary.loc[row, label]
+                    delta = None if label == baseline else value - summary.loc[row, baseline]
+                    if unit == 'Cr':
+                        st.metric(metric, f"₹{value:,.1f} Cr", None if delta is None else f"{delta:+,.1f} Cr")
+                    else:
+                        st.metric(metric, f"{value:.1f}%", None if delta is None else f"{delta:+.1f} pp")
+                st.caption(f"{comparison['deals'][label]:,} deals")
+
+        # ROW 2: Funnel side by side + full summary with deltas
+        cmp_c1, cmp_c2 = st.columns([1, 1.2])
+        with cmp_c1:
+            st.markdown('<div class="chart-header">Funnel by Selection</div>', unsafe_allow_html=True)
+            show_chart(build_comparison_funnel_figure(comparison['funnel']), "Comparison Funnel", use_container_width=True, config={'displayModeBar': False})
+        with cmp_c2:
+            st.markdown(f'<div class="chart-header">Summary (Δ vs {baseline})</div>', unsafe_allow_html=True)
+            summary_table = with_deltas(summary)
+            st.dataframe(summary_table, use_container_width=True, column_config={
+                col: st.column_config.NumberColumn(format="%.1f") for col in summary_table.columns
+            })
+
+        # ROW 3: Monthly closed revenue and AVP realized value, side by side
+        cmp_c3, cmp_c4 = st.columns(2)
+        with cmp_c3:
+            st.markdown(f'<div class="chart-header">Monthly Closed Revenue, ₹ Cr (Δ vs {baseline})</div>', unsafe_allow_html=True)
+            monthly_table = with_deltas(comparison['monthly_c3'])
+            st.dataframe(monthly_table, use_container_width=True, column_config={
+                col: st.column_config.NumberColumn(format="₹%.2f") for col in monthly_table.columns
+            })
+        with cmp_c4:
+            st.markdown(f'<div class="chart-header">AVP Realized Value, ₹ Cr (Δ vs {baseline})</div>', unsafe_allow_html=True)
+            avp_table = with_deltas(comparison['avp_realized'])
+            st.dataframe(avp_table, use_container_width=True, column_config={
+                col: st.column_config.NumberColumn(format="₹%.2f") for col in avp_table.columns
+            })
+
+
+# ==========================================
+# EXPORT (filtered data & aggregates behind the current view)
+# ==========================================
+with st.expander("Export data"):
+    export_sets = {
+        'Filtered Deals': lambda: apply_filters(df),
+        'Pipeline by Month': lambda: pd.concat([display_df, pd.DataFrame([total_data])], ignore_index=True),
+        'AVP Metrics': lambda: avp_metrics.copy(),
+        'Brand Rankings': lambda: brand_totals.sort_values('C3', ascending=False).reset_index(),
+    }
+    exp_col1, exp_col2, exp_col3 = st.columns([1.5, 1, 1])
+    with exp_col1:
+        export_name = st.selectbox("Dataset", list(export_sets.keys()), key="export_dataset")
+    with exp_col2:
+        export_fmt = st.selectbox("Format", list(EXPORT_FORMATS.keys()), key="export_format")
+    with exp_col3:
+        if st.button("Prepare export", use_container_width=True):
+            # Written off the rerun path; the download appears once the file is ready
+            st.session_state['export_job'] = start_export(export_sets[export_name](), export_fmt, export_name) + (export_fmt,)
+
+    export_job = st.session_state.get('export_job')
+    if export_job:
+        future, file_name, fmt = export_job
+        if not future.done():
+            st.caption(f"Preparing {file_name}…")
+            st.button("Refresh status")
+        elif future.exception() is not None:
+            st.error(f"Export failed: {future.exception()}")
+        elif not os.path.exists(future.result()):
+            # Pruned (export.prune_exports) after sitting unused
+            st.caption(f"{file_name} has expired; prepare the export again.")
+        else:
+            with open(future.result(), "rb") as f:
+                st.download_button(f"Download {file_name}", data=f, file_name=file_name, mime=EXPORT_FORMATS[fmt][1])
+
+
+# ==========================================
+# DEBUG (?debug=1): memory held by cached objects
+# ==========================================
+if debug_mode:
+    with st.expander("Debug: memory report", expanded=True):
+        mem_col1, mem_col2 = st.columns(2)
+        with mem_col1:
+            st.markdown('<div class="chart-header">Per cached object</div>', unsafe_allow_html=True)
+            # Only what this process already holds: calling the loaders here could
+            # trigger sheet fetches in every process of a shared-dataset deployment
+            st.dataframe(memory_report({
+                'Raw sheets (loader cache)': list(cached_base_sources().values()),
+                'Prepared sources (merge cache)': list(cached_prepared_sources().values()),
+                'Prepared frame (mapped snapshot)' if df.attrs.get('mapped') else 'Prepared frame': df,
+                'Filtered frame (this session)': apply_filters(df),
+                'Drill-down group indices': group_indices(df, version),
+                'Brand totals': brand_totals,
+                'AVP totals': avp_totals,
+            }), hide_index=True, use_container_width=True)
+        with mem_col2:
+            st.markdown('<div class="chart-header">Prepared frame, per column</div>', unsafe_allow_html=True)
+            st.dataframe(column_memory(df), hide_index=True, use_container_width=True)
+
+        st.markdown('<div class="chart-header">Serialized figure size (this rerun)</div>', unsafe_allow_html=True)
+        st.dataframe(
+            pd.DataFrame({'Chart': list(chart_sizes.keys()), 'Bytes': list(chart_sizes.values())}),
+            hide_index=True, use_container_width=True
+        )
+
+        # Insight rules for this filter state (insights.py)
+        st.markdown('<div class="chart-header">Insight rules</div>', unsafe_allow_html=True)
+        st.dataframe(
+            pd.DataFrame(
+                [(r.rule, r.message is not None, r.duration_ms) for r in evaluate_insights(view, anomalies, version, filter_key)],
+                columns=['Rule', 'Fired', 'ms (first evaluation)']
             ),
-            height=250,
-            paper_bgcolor="rgba(0,0,0,0)",
-            plot_bgcolor="rgba(0,0,0,0)",
-            font=dict(color="#E7E9EA", size=10),
-            margin=dict(t=45, b=30, l=45, r=45),
-            xaxis=dict(showgrid=True, gridcolor='rgba(255,255,255,0.05)', fixedrange=True),
-            yaxis=dict(
-                showgrid=True, 
-                gridcolor='rgba(255,255,255,0.05)', 
-                fixedrange=True,
-                range=[0, y_max]
+            hide_index=True, use_container_width=True
+        )
+
+        # Background pre-warm of the common filter views (prewarm.py)
+        st.markdown('<div class="chart-header">Cache pre-warm</div>', unsafe_allow_html=True)
+        if prewarm_report.get('duration_s') is not None:
+            st.caption(
+                f"{prewarm_report['warmed']}/{prewarm_report['total']} common views warmed in "
+                f"{prewarm_report['duration_s']:.2f}s with {prewarm_report['workers']} workers"
+                + (f" ({len(prewarm_report['failed'])} failed)" if prewarm_report['failed'] else "")
             )
+        else:
+            st.caption(f"Status: {prewarm_report['status']}")
+
+        # Which dataset snapshot this rerun is serving (snapshot.py)
+        st.markdown('<div class="chart-header">Dataset</div>', unsafe_allow_html=True)
+        st.caption(
+            f"Version {version}, fetched at {df.attrs.get('fetched_at') or 'unknown'}"
+            + (" (served from the disk snapshot)" if df.attrs.get('from_snapshot') else "")
         )
-        st.plotly_chart(fig_trend, use_container_width=True, config={'displayModeBar': False})
-    
+        # Rows and version per federated source (utils.SOURCES)
+        if 'Source' in df.columns:
+            source_versions = df.attrs.get('sources', {})
+            st.dataframe(
+                pd.DataFrame({
+                    'Source': df['Source'].cat.categories,
+                    'Rows': df['Source'].value_counts(sort=False).to_numpy(),
+                    'Version': [source_versions.get(name, '') for name in df['Source'].cat.categories],
+                }),
+                hide_index=True, use_container_width=True
+            )
 
 
+# ==========================================
+# PROFILING (?profile=<C0C3_PROFILE_KEY>): one sampled rerun on demand
+# ==========================================
+if profiling_enabled:
+    from charts import build_flame_figure
+    if rerun_sampler is not None:
+        st.session_state.pop("rerun_sampler", None)
+        st.session_state["last_profile"] = finish_profile(rerun_sampler)
+
+    with st.expander("Profiling", expanded=rerun_sampler is not None):
+        if st.button("Profile next rerun", key="profile_arm"):
+            st.session_state["profile_next_rerun"] = True
+        if st.session_state.get("profile_next_rerun"):
+            st.caption("Armed: the next rerun (filter change, tab switch, ...) will be profiled.")
+
+        last_profile = st.session_state.get("last_profile")
+        if last_profile:
+            profiled_type, profiled_months, profiled_sbu = last_profile['filter_key']
+            st.caption(
+                f"{last_profile['tab']} rerun in {last_profile['duration_s']:.2f}s "
+                f"({last_profile['samples']} samples), Type {profiled_type}, "
+                f"months {', '.join(profiled_months) or 'all'}, SBUs {', '.join(profiled_sbu) or 'all'}, "
+                f"data version {last_profile['version']}. Saved to {last_profile['saved_to']}"
+            )
+            if not last_profile['nodes'].empty:
+                st.plotly_chart(build_flame_figure(last_profile['nodes']), use_container_width=True,
+                                config={'displayModeBar': False})
+            st.dataframe(last_profile['top'], hide_index=True, use_container_width=True)
@@ -0,0 +1,96 @@
+"""
+Dimension catalog: the ordered distinct values of every filterable dimension
+plus a small pre-aggregated cube, built once per data version.
+
+The filter widgets take their options from the catalog instead of scanning the
+frame on each rerun, and label each option with its deal count and C3 under the
+other current filters. Those counts come from the cube (deals and C3 per Type x
+SBU x month, a few hundred cells), so they cost a slice and a sum however many
+deal rows there are.
+"""
+import numpy as np
+import pandas as pd
+import streamlit as st
+
+from pipeline import month_dimension
+
+# Dimensions the cube is keyed on, as (catalog name, frame column)
+FACETS = [('Type', 'Type'), ('SBUs', 'SBUs'), ('Month', 'Month_Year')]
+CATALOG_DIMENSIONS = ['Month', 'SBUs', 'Type', 'AVP', 'Brand Name']
+
+
+def _facet_codes(column, values):
+    # Category codes of `column` remapped to positions in `values` (blank: -1)
+    position = pd.Index(values).get_indexer(column.cat.categories)
+    codes = column.cat.codes.to_numpy()
+    return np.where(codes >= 0, position[codes], -1)
+
+
+def build_catalog(df):
+    """
+    {'values': {dimension: ordered distinct values}, 'deals' / 'c3': arrays of
+    shape (types, SBUs, months)}. Months are in calendar order, the rest sorted;
+    blank values are left out of both.
+    """
+    values = {
+        'Month': month_dimension(df)['Month_Year'].tolist(),
+        **{
+            name: sorted(df[name].dropna().unique().tolist())
+            for name in CATALOG_DIMENSIONS[1:] if name in df.columns
+        },
+    }
+    codes = [_facet_codes(df[column], values[name]) for name, column in FACETS]
+    shape = tuple(len(values[name]) for name, _ in FACETS)
+    keep = np.logical_and.reduce([c >= 0 for c in codes])
+    cell = np.ravel_multi_index([c[keep] for c in codes], shape)
+    size = int(np.prod(shape))
+    return {
+        'values': values,
+        'deals': np.bincount(cell, minlength=size).reshape(shape),
+        'c3': np.bincount(cell, weights=df['C3'].to_numpy(dtype='float64')[keep], minlength=size).reshape(shape),
+    }
+
+
+@st.cache_data(max_entries=2)
+def dimension_catalog(_df, data_version):
+    """
+    build_catalog, once per data version.
+    """
+    return build_catalog(_df)
+
+
+def facet_counts(catalog, dimension, selected_type=None, selected_months=(), selected_sbu=()):
+    """
+    Deals and C3 per value of `dimension` ('Type', 'SBUs' or 'Month') under the
+    other filters (its own selection is ignored), as a frame indexed by value.
+    """
+    values = catalog['values']
+    selections = {
+        'Type': [selected_type] if selected_type is not None else [],
+        'SBUs': list(selected_sbu),
+        'Month': list(selected_months),
+    }
+    # Slice one axis at a time: several index arrays at once would be paired up, not crossed
+    deals, c3 = catalog['deals'], catalog['c3']
+    for axis, (name, _) in enumerate(FACETS):
+        if name == dimension or not selections[name]:
+            continue
+        idx = pd.Index(values[name]).get_indexer(selections[name])
+        idx = idx[idx >= 0]
+        deals, c3 = deals.take(idx, axis=axis), c3.take(idx, axis=axis)
+    axis = [name for name, _ in FACETS].index(dimension)
+    other = tuple(a for a in range(len(FACETS)) if a != axis)
+    return pd.DataFrame(
+        {'Deals': deals.sum(axis=other), 'C3': c3.sum(axis=other)},
+        index=pd.Index(values[dimension], name=dimension),
+    )
+
+
+def option_label(value, counts):
+    """
+    '<value> · <deals> · ₹<C3> Cr' for a filter option.
+    """
+    if value not in counts.index:
+        return str(value)
+    row = counts.loc[value]
+    return f"{value} · {int(row['Deals']):,} · ₹{row['C3'] / 10000000:,.1f} Cr"
@@ -0,0 +1,497 @@
+import numpy as np
+import pandas as pd
+import plotly.graph_objects as go  # Already loaded by streamlit's plotly theme
+
+from pipeline import forecast_trend
+
+# Above this many points scatter charts render with WebGL (Scattergl) instead of SVG
+WEBGL_THRESHOLD = 300
+# Above this many points, points are binned on the server before being sent
+MAX_SCATTER_POINTS = 1000
+# Text labels are drawn for at most this many points (largest first)
+MAX_LABELS = 15
+
+
+def render_mode(n_points, threshold=WEBGL_THRESHOLD):
+    """
+    'webgl' once a chart has more points than SVG markers + labels handle well.
+    """
+    return 'webgl' if n_points > threshold else 'svg'
+
+
+def bin_points(frame, x, y, label_col, sum_cols=(), max_points=MAX_SCATTER_POINTS):
+    """
+    Server-side aggregation for scatter charts: when `frame` has more than
+    `max_points` rows, points are snapped to a grid over (x, y) and each occupied
+    cell becomes one point (mean position, summed `sum_cols`, mean of other
+    numeric columns). Adds a 'Members' column; a binned point is labelled
+    "<n> <label_col>s".
+    """
+    if len(frame) <= max_points:
+        return frame.assign(Members=1)
+
+    bins = max(int(np.sqrt(max_points)), 1)
+    # inf (e.g. conversion with zero C0) cannot be binned; those rows share a NaN cell
+    x_bin = pd.cut(frame[x].replace([np.inf, -np.inf], np.nan), bins, labels=False)
+    y_bin = pd.cut(frame[y].replace([np.inf, -np.inf], np.nan), bins, labels=False)
+
+    numeric_cols = frame.select_dtypes('number').columns
+    agg = {c: ('sum' if c in sum_cols else 'mean') for c in numeric_cols}
+    agg[label_col] = 'first'
+    grouped = frame.groupby([x_bin.rename('_xb'), y_bin.rename('_yb')], dropna=False, observed=True)
+    binned = grouped.agg(agg).reset_index(drop=True)
+    binned['Members'] = grouped.size().values
+
+    multi = binned['Members'] > 1
+    binned[label_col] = binned[label_col].astype(object)
+    binned.loc[multi, label_col] = binned.loc[multi, 'Members'].astype(str) + f" {label_col}s"
+    return binned
+
+
+def top_n_labels(labels, values, n=MAX_LABELS):
+    """
+    Keeps the text label for the `n` largest `values` and blanks the rest, so label
+    count (and overlap) stays bounded however many points are drawn.
+    """
+    labels = pd.Series(labels, index=values.index).astype(object)
+    if len(values) <= n:
+        return labels
+    keep = values.nlargest(n).index
+    return labels.where(labels.index.isin(keep), '')
+
+
+def figure_payload_bytes(fig):
+    """
+    Size of the serialized figure as sent to the browser.
+    """
+    return len(fig.to_json().encode())
+
+
+def build_funnel_figure(funnel_data):
+    fig = go.Figure(go.Funnel(
+        y = funnel_data['Stage'],
+        x = funnel_data['Count'],
+        textposition = "inside",
+        textinfo = "value+percent initial",
+        opacity = 0.9, 
+        marker = {"color": ["#1565C0", "#1976D2", "#42A5F5", "#90CAF9"]}, 
+        connector = {"fillcolor": "#E0E0E0"}
+    ))
+    fig.update_layout(
+        margin=dict(t=8, b=18, l=135, r=10),
+        paper_bgcolor="rgba(0,0,0,0)",
+        plot_bgcolor="rgba(0,0,0,0)",
+        font=dict(color="#E7E9EA", size=10),
+        height=207,
+        showlegend=False,
+        yaxis=dict(
+            showticklabels=False,
+            automargin=False
+        ),
+        hoverlabel=dict(
+            bgcolor="#16181C",
+            bordercolor="#2F3336",
+            font_size=11,
+            font_family="-apple-system, BlinkMacSystemFont, Segoe UI, Roboto, Helvetica, Arial, sans-serif",
+            font_color="white",
+            align="left"
+        )
+    )
+
+    # Add manual left-aligned annotations for stage names
+    for i, row in funnel_data.iterrows():
+        fig.add_annotation(
+            x=-0.3,
+            y=row['Stage'],
+            text=f"<b>{row['Stage']}</b>",
+            showarrow=False,
+            xref="paper",
+            yref="y",
+            xanchor="left",
+            font=dict(color="#E7E9EA", size=11),
+        )
+    fig.update_traces(
+        textfont=dict(size=10),
+        textinfo="value+percent initial",
+        texttemplate="%{value}<br>%{percentInitial:.0%}",
+        hovertemplate=(
+            "<b>%{y}</b><br><br>"
+            "Initial: <b>%{percentInitial:.0%}</b><br>"
+            "Previous: <b>%{percentPrevious:.0%}</b>"
+            "<extra></extra>"
+        )
+    )
+    return fig
+
+
+def build_conversion_figure(conversion_data):
+    fig_conv = go.Figure(data=[
+        go.Bar(
+            x=conversion_data['Conversion Rate'],
+            y=conversion_data['Stage'],
+            orientation='h',
+            text=[f'{x:.1f}%' for x in conversion_data['Conversion Rate']],
+            textposition='outside',
+            marker=dict(color=conversion_data['Color']),
+            hovertemplate='<b>%{y}</b><br>Conversion: %{x:.1f}%<extra></extra>'
+        )
+    ])
+    fig_conv.update_layout(
+        xaxis_title='Conversion Rate (%)',
+        yaxis_title=None,
+        height=250,
+        paper_bgcolor="rgba(0,0,0,0)",
+        plot_bgcolor="rgba(0,0,0,0)",
+        font=dict(color="#E7E9EA", size=10),
+        margin=dict(t=10, b=35, l=10, r=40),
+        showlegend=False,
+        bargap=0.4,
+        xaxis=dict(fixedrange=True, range=[0, 100]),
+        yaxis=dict(fixedrange=True)
+    )
+    return fig_conv
+
+
+# One color per compared selection (cycled beyond six)
+COMPARISON_COLORS = ['#1565C0', '#00BA7C', '#FFA726', '#AB47BC', '#EF5350', '#26C6DA']
+
+
+def build_comparison_funnel_figure(funnel):
+    """
+    Funnel stage counts (stages × selections frame) as grouped bars, one color per
+    compared selection.
+    """
+    fig = go.Figure([
+        go.Bar(
+            name=str(label),
+            x=funnel.index,
+            y=funnel[label],
+            marker_color=COMPARISON_COLORS[i % len(COMPARISON_COLORS)],
+            hovertemplate=f'<b>{label}</b><br>%{{x}}: %{{y:,.0f}} deals<extra></extra>'
+        )
+        for i, label in enumerate(funnel.columns)
+    ])
+    fig.update_layout(
+        barmode='group',
+        height=280,
+        paper_bgcolor="rgba(0,0,0,0)",
+        plot_bgcolor="rgba(0,0,0,0)",
+        font=dict(color="#E7E9EA", size=10),
+        margin=dict(t=30, b=30, l=10, r=10),
+        legend=dict(orientation='h', yanchor='bottom', y=1.02, x=0),
+        bargap=0.25,
+        xaxis=dict(fixedrange=True),
+        yaxis=dict(fixedrange=True, title='Deals')
+    )
+    return fig
+
+
+def build_conversion_heatmap(matrix, rate_columns):
+    """
+    Conversion-rate matrix (one row per group) as a heatmap of `rate_columns`,
+    with each row's Bottleneck cell marked ▼.
+    """
+    rates = matrix[rate_columns].to_numpy()
+    is_bottleneck = np.array([[col == b for col in rate_columns] for b in matrix['Bottleneck']])
+    text = np.where(is_bottleneck, np.char.add(np.char.mod('%.1f%%', rates), ' ▼'), np.char.mod('%.1f%%', rates))
+    labels = [str(v) for v in matrix.index]
+    fig = go.Figure(go.Heatmap(
+        z=rates,
+        x=rate_columns,
+        y=labels,
+        text=text,
+        texttemplate='%{text}',
+        customdata=matrix[['Deals with C0', 'Bottleneck']].to_numpy(),
+        colorscale=[[0, '#F4212E'], [0.5, '#FFA726'], [1, '#00BA7C']],
+        zmin=0,
+        zmax=100,
+        xgap=2,
+        ygap=2,
+        colorbar=dict(title='%', thickness=10),
+        hovertemplate='<b>%{y}</b> %{x}: %{z:.1f}%<br>%{customdata[0]:,} deals at C0, bottleneck %{customdata[1]}<extra></extra>',
+    ))
+    fig.update_layout(
+        height=max(260, 28 * len(labels) + 80),
+        paper_bgcolor="rgba(0,0,0,0)",
+        plot_bgcolor="rgba(0,0,0,0)",
+        font=dict(color="#E7E9EA", size=10),
+        margin=dict(t=30, b=10, l=10, r=10),
+        xaxis=dict(side='top', fixedrange=True),
+        yaxis=dict(autorange='reversed', fixedrange=True, type='category'),
+    )
+    return fig
+
+
+def build_performance_figure(avp_perf):
+    """
+    Performance Matrix scatter. Returns (figure, plotted frame); the plotted frame
+    maps selected point indices back to AVPs (or bins).
+    """
+    # Bounded payload: bin AVPs beyond MAX_SCATTER_POINTS, label only the top earners
+    perf_plot_df = bin_points(
+        avp_perf, 'Total Pipeline (Cr)', 'Conversion Rate (%)', 'AVP',
+        sum_cols=['C0', 'C1', 'C2', 'C3', 'Closed Revenue (Cr)', 'Deal Count']
+    )
+    perf_plot_df['Label'] = top_n_labels(perf_plot_df['AVP'], perf_plot_df['Closed Revenue (Cr)'])
+
+    # Deferred: plotly.express is only needed once the Deep Dive tab renders
+    import plotly.express as px
+
+    # Performance scatter plot - Full width (WebGL above WEBGL_THRESHOLD points)
+    fig_perf = px.scatter(
+        perf_plot_df,
+        x='Total Pipeline (Cr)',
+        y='Conversion Rate (%)',
+        size='Closed Revenue (Cr)',
+        color='Closed Revenue (Cr)',
+        text='Label',
+        hover_name='AVP',
+        render_mode=render_mode(len(perf_plot_df)),
+        color_continuous_scale='Viridis',
+        hover_data={'Label': False,
+                   'Total Pipeline (Cr)': ':.2f', 
+                   'Conversion Rate (%)': ':.1f',
+                   'Closed Revenue (Cr)': ':.2f',
+                   'Avg Deal Size (Cr)': ':.2f'}
+    )
+    fig_perf.update_traces(textposition='top center', textfont=dict(size=11))
+
+    # Calculate y-axis range with padding to prevent label clipping
+    if len(avp_perf) > 0:
+        max_conversion = avp_perf['Conversion Rate (%)'].max()
+        y_max_perf = max_conversion * 1.30  # Add 30% padding above max value
+    else:
+        y_max_perf = 100
+
+    fig_perf.update_layout(
+        xaxis_title='Total Pipeline (₹ Cr)',
+        yaxis_title='Conversion Rate (%)',
+        height=250,
+        paper_bgcolor="rgba(0,0,0,0)",
+        plot_bgcolor="rgba(0,0,0,0)",
+        font=dict(color="#E7E9EA", size=10),
+        margin=dict(t=35, b=35, l=45, r=20),
+        xaxis=dict(showgrid=True, gridcolor='rgba(255,255,255,0.05)', fixedrange=True),
+        yaxis=dict(
+            showgrid=True, 
+            gridcolor='rgba(255,255,255,0.05)', 
+            fixedrange=True,
+            range=[0, y_max_perf]
+        ),
+        showlegend=False
+    )
+    return fig_perf, perf_plot_df
+
+
+def build_brand_treemap(brand_ranking):
+    """
+    Top-5 brands + Others treemap of C3 revenue; None when there is no revenue.
+    """
+    total_revenue = brand_ranking.total
+    if total_revenue <= 0:
+        return None
+
+    top_5 = brand_ranking.top
+    others_sum = brand_ranking.others
+    treemap_df = pd.DataFrame([
+        {'Brand': b, 'Revenue (Cr)': v / 10000000, 'Share': (v / total_revenue * 100)}
+        for b, v in top_5.items()
+    ])
+
+    if others_sum > 0:
+        others_row = pd.DataFrame([{
+            'Brand': 'Others',
+            'Revenue (Cr)': others_sum / 10000000,
+            'Share': (others_sum / total_revenue * 100)
+        }])
+        treemap_df = pd.concat([treemap_df, others_row], ignore_index=True)
+
+    # Professional color palette - sophisticated gradient
+    color_palette = [
+        '#0A4D68',  # Deep teal (darkest)
+        '#088395',  # Ocean blue
+        '#05BFDB',  # Bright cyan
+        '#00D9FF',  # Vibrant cyan
+        '#7FDBFF',  # Light cyan
+        '#B8E6F0'   # Pale cyan (lightest - for Others)
+    ]
+
+    # Assign colors based on revenue (highest to lowest)
+    treemap_df['Color'] = color_palette[:len(treemap_df)]
+
+    # Determine text color based on background brightness
+    def get_text_color(hex_color):
+        # Convert hex to RGB
+        hex_color = hex_color.lstrip('#')
+        r, g, b = int(hex_color[0:2], 16), int(hex_color[2:4], 16), int(hex_color[4:6], 16)
+        # Calculate luminance
+        luminance = (0.299 * r + 0.587 * g + 0.114 * b) / 255
+        return '#FFFFFF' if luminance < 0.6 else '#1A1A1A'
+
+    treemap_df['TextColor'] = treemap_df['Color'].apply(get_text_color)
+
+    import plotly.express as px  # Deferred, see build_performance_figure
+
+    fig_brands = px.treemap(
+        treemap_df,
+        path=['Brand'],
+        values='Revenue (Cr)',
+        color='Color',
+        color_discrete_map={c: c for c in color_palette}
+    )
+
+    fig_brands.update_traces(
+        textinfo="label+text",
+        text=[f"₹{r:.1f}Cr ({s:.1f}%)" for r, s in zip(treemap_df['Revenue (Cr)'], treemap_df['Share'])],
+        hovertemplate='<b>%{label}</b><br>Revenue: ₹%{value:.2f}Cr<extra></extra>',
+        textfont=dict(size=11),
+        marker=dict(
+            colors=treemap_df['Color'].tolist(),
+            line=dict(color='#2C2C2C', width=2)
+        )
+    )
+
+    fig_brands.update_layout(
+        height=250,
+        margin=dict(t=5, b=5, l=5, r=5),
+        paper_bgcolor="rgba(0,0,0,0)",
+        plot_bgcolor="rgba(0,0,0,0)",
+        coloraxis_showscale=False
+    )
+    return fig_brands
+
+
+def build_trend_figure(agg_df, ts_metrics):
+    """
+    Monthly Pipeline (C0) vs Closed (C3) lines with a 2-month linear forecast.
+    """
+    monthly_trend = agg_df.copy()
+    monthly_trend['C0_Cr'] = monthly_trend['C0'] / 10000000
+    monthly_trend['C3_Cr'] = monthly_trend['C3'] / 10000000
+    monthly_trend['Pipeline Coverage'] = ts_metrics['Pipeline Coverage'].values
+    # MoM % and 3-month average shown on hover
+    trend_hover = '<b>%{x}</b><br>₹%{y:.1f}Cr<br>MoM: %{customdata[0]:.0f}%<br>3M Avg: ₹%{customdata[1]:.1f}Cr<extra>%{fullData.name}</extra>'
+
+    # Simple linear regression forecast for next 2 months
+    future_months, forecast_c0, forecast_c3 = forecast_trend(agg_df, periods=2)
+
+    # Combine actual and forecast data
+    all_months = list(monthly_trend['Month_Year']) + future_months
+    # Forecast lines start from the last actual point (none for a selection without deals)
+    last = monthly_trend.iloc[-1:]
+    last_month = list(last['Month_Year'])
+
+    fig_trend = go.Figure()
+
+    # Actual Pipeline (C0) - solid line
+    fig_trend.add_trace(go.Scatter(
+        x=monthly_trend['Month_Year'], 
+        y=monthly_trend['C0_Cr'], 
+        mode='lines+markers+text', 
+        name='Pipeline (C0)',
+        line=dict(color='#1565C0', width=2),
+        marker=dict(size=8),
+        text=top_n_labels([f'₹{val:.1f}Cr' for val in monthly_trend['C0_Cr']], monthly_trend['C0_Cr']),
+        customdata=list(zip(ts_metrics['C0 MoM %'], ts_metrics['C0 Roll3 Avg'] / 10000000)),
+        hovertemplate=trend_hover,
+        textposition='top center',
+        textfont=dict(size=7)
+    ))
+
+    # Forecast Pipeline (C0) - dashed line
+    fig_trend.add_trace(go.Scatter(
+        x=last_month + future_months,
+        y=list(last['C0_Cr']) + list(forecast_c0),
+        mode='lines+markers+text',
+        name='Pipeline (Forecast)',
+        line=dict(color='#1565C0', width=2, dash='dash'),
+        marker=dict(size=8, symbol='diamond'),
+        text=[''] * len(last) + [f'₹{val:.1f}Cr' for val in forecast_c0],
+        textposition='top center',
+        textfont=dict(size=7)
+    ))
+
+    # Actual Closed (C3) - solid line
+    fig_trend.add_trace(go.Scatter(
+        x=monthly_trend['Month_Year'], 
+        y=monthly_trend['C3_Cr'], 
+        mode='lines+markers+text', 
+        name='Closed (C3)',
+        line=dict(color='#00BA7C', width=2),
+        marker=dict(size=8),
+        text=top_n_labels([f'₹{val:.1f}Cr' for val in monthly_trend['C3_Cr']], monthly_trend['C3_Cr']),
+        customdata=list(zip(ts_metrics['C3 MoM %'], ts_metrics['C3 Roll3 Avg'] / 10000000)),
+        hovertemplate=trend_hover,
+        textposition='bottom center',
+        textfont=dict(size=7)
+    ))
+
+    # Forecast Closed (C3) - dashed line
+    fig_trend.add_trace(go.Scatter(
+        x=last_month + future_months,
+        y=list(last['C3_Cr']) + list(forecast_c3),
+        mode='lines+markers+text',
+        name='Closed (Forecast)',
+        line=dict(color='#00BA7C', width=2, dash='dash'),
+        marker=dict(size=8, symbol='diamond'),
+        text=[''] * len(last) + [f'₹{val:.1f}Cr' for val in forecast_c3],
+        textposition='bottom center',
+        textfont=dict(size=7)
+    ))
+
+    # Calculate y-axis range with padding to prevent label clipping
+    all_values = list(monthly_trend['C0_Cr']) + list(monthly_trend['C3_Cr']) + list(forecast_c0) + list(forecast_c3)
+    max_value = max(all_values, default=0)
+    y_max = max_value * 1.25  # Add 25% padding above max value
+
+    fig_trend.update_layout(
+        yaxis_title='Value (₹ Cr)',
+        xaxis_title=None,
+        hovermode='x unified',
+        legend=dict(
+            orientation="h",
+            yanchor="bottom",
+            y=1.02,
+            xanchor="center",
+            x=0.5,
+            bgcolor='rgba(0,0,0,0)',
+            font=dict(size=9)
+        ),
+        height=250,
+        paper_bgcolor="rgba(0,0,0,0)",
+        plot_bgcolor="rgba(0,0,0,0)",
+        font=dict(color="#E7E9EA", size=10),
+        margin=dict(t=45, b=30, l=45, r=45),
+        xaxis=dict(showgrid=True, gridcolor='rgba(255,255,255,0.05)', fixedrange=True),
+        yaxis=dict(
+            showgrid=True, 
+            gridcolor='rgba(255,255,255,0.05)', 
+            fixedrange=True,
+            range=[0, y_max]
+        )
+    )
+    return fig_trend
+
+
+def build_flame_figure(nodes):
+    """
+    Profiler call tree (profiling.flame_nodes) as an icicle chart: callers above
+    callees, widths proportional to samples.
+    """
+    fig = go.Figure(go.Icicle(
+        ids=nodes['id'],
+        parents=nodes['parent'],
+        labels=nodes['label'],
+        values=nodes['samples'],
+        branchvalues='total',
+        tiling=dict(orientation='v'),
+        root_color='rgba(0,0,0,0)',
+        hovertemplate='<b>%{label}</b><br>%{value} samples (%{percentRoot:.1%} of the rerun)<extra></extra>',
+    ))
+    fig.update_layout(
+        height=520,
+        paper_bgcolor="rgba(0,0,0,0)",
+        font=dict(color="#E7E9EA", size=10),
+        margin=dict(t=10, b=10, l=10, r=10),
+    )
+    return fig
@@ -0,0 +1,133 @@
+"""
+Side-by-side comparison of two or more filter selections (VAS vs Retainer, one SBU
+against another, month against month).
+
+Each selection is an ordinary filter key. compute_comparison takes the matching
+rows of every selection from the shared frame in one take, each tagged with its
+selection (a deal in two selections appears once per selection). One grouped
+pass keyed on (selection, month) codes then yields the pipeline tables, funnel and
+conversion counts, and one keyed on (selection, AVP) the AVP metrics, however
+many selections there are.
+"""
+import numpy as np
+import pandas as pd
+import streamlit as st
+
+from pipeline import (
+    cols_to_sum, STAGE_STATUS_COLUMNS, FUNNEL_STAGES, filter_positions, funnel_flags,
+    conversion_flags, conversion_from_counts,
+)
+
+COMPARE_BY = ['Type', 'SBUs', 'Month']
+CONVERSION_ROWS = {'C0→C1': 'C0→C1 %', 'C1→C2': 'C1→C2 %', 'C2→C3': 'C2→C3 %', 'Overall': 'Overall Conversion %'}
+
+
+def comparison_selections(compare_by, members, selected_type, selected_months=(), selected_sbu=()):
+    """
+    One filter key per compared member, keeping the other filters as currently set.
+    """
+    selected_months, selected_sbu = tuple(selected_months), tuple(selected_sbu)
+    if compare_by == 'Type':
+        return {m: (m, selected_months, selected_sbu) for m in members}
+    if compare_by == 'SBUs':
+        return {m: (selected_type, selected_months, (m,)) for m in members}
+    return {m: (selected_type, (m,), selected_sbu) for m in members}
+
+
+def _grouped_sums(codes, n_groups, selection, n_selections, values):
+    """
+    Sums each column of `values` per (selection, code) with one bincount per column,
+    as an array of shape (selections, groups, columns). Rows with code -1 (blank
+    dimension) are left out.
+    """
+    group = selection * n_groups + codes
+    keep = codes >= 0
+    if not keep.all():
+        group, values = group[keep], values[keep]
+    values = np.asfortranarray(values)  # Contiguous columns for bincount's weights
+    sums = [
+        np.bincount(group, weights=values[:, j], minlength=n_selections * n_groups)
+        for j in range(values.shape[1])
+    ]
+    return np.stack(sums, axis=1).reshape(n_selections, n_groups, values.shape[1])
+
+
+def compute_comparison(df, selections):
+    """
+    Pipeline, funnel, conversion and AVP figures for each of `selections`
+    ({label: filter key}), as a dict of frames with one column per label.
+    """
+    labels = list(selections)
+    positions = [filter_positions(df, *selections[label]) for label in labels]
+    selection = np.repeat(np.arange(len(labels)), [len(p) for p in positions])
+    needed = ['Month_Year', 'AVP'] + cols_to_sum + STAGE_STATUS_COLUMNS
+    subset = df.iloc[np.concatenate(positions), df.columns.get_indexer(needed)]
+
+    # Per deal: amounts, funnel stage flags, conversion stage flags, and a 1 to count rows
+    conversion_cols = [f'Reached {c}' for c in cols_to_sum]
+    value_cols = cols_to_sum + FUNNEL_STAGES + conversion_cols + ['Deals']
+    values = np.column_stack([
+        subset[cols_to_sum].to_numpy(dtype='float64'),
+        funnel_flags(subset).to_numpy(dtype='float64'),
+        conversion_flags(subset).to_numpy(dtype='float64'),
+        np.ones(len(subset)),
+    ])
+
+    # Selection × month: pipeline tables plus every stage count
+    months = subset['Month_Year'].cat.categories
+    by_month = _grouped_sums(subset['Month_Year'].cat.codes.to_numpy(), len(months), selection, len(labels), values)
+    totals = pd.DataFrame(by_month.sum(axis=1), index=labels, columns=value_cols)
+
+    summary = {}
+    for label in labels:
+        row = totals.loc[label]
+        conversion = conversion_from_counts(*(int(row[c]) for c in conversion_cols))
+        rates = conversion['conversion_data'].set_index('Stage')['Conversion Rate']
+        summary[label] = pd.concat([
+            row[cols_to_sum] / 10000000,
+            pd.Series({'Total Pipeline': (row['C0'] + row['C1'] + row['C2']) / 10000000}),
+            row[FUNNEL_STAGES],
+            rates.rename(CONVERSION_ROWS)[list(CONVERSION_ROWS.values())],
+        ])
+    summary = pd.DataFrame(summary)
+    summary.index = [f'{m} (₹ Cr)' for m in cols_to_sum + ['Total Pipeline']] + FUNNEL_STAGES + list(CONVERSION_ROWS.values())
+
+    # Month_Year categories are in calendar order; keep months any selection has deals in
+    month_has_deals = by_month[:, :, value_cols.index('Deals')].sum(axis=0) > 0
+    monthly_c3 = pd.DataFrame(
+        by_month[:, :, value_cols.index('C3')].T / 10000000, index=pd.Index(months, name='Month_Year'), columns=labels
+    )[month_has_deals]
+
+    # Selection × AVP
+    avps = subset['AVP'].cat.categories
+    by_avp = _grouped_sums(subset['AVP'].cat.codes.to_numpy(), len(avps), selection, len(labels), values[:, :4])
+    avp_has_deals = by_avp.any(axis=(0, 2))
+    avp_index = pd.Index(avps, name='AVP')
+    avp_realized = pd.DataFrame(by_avp[:, :, 3].T / 10000000, index=avp_index, columns=labels)[avp_has_deals]
+
+    return {
+        'labels': labels,
+        'deals': dict(zip(labels, (len(p) for p in positions))),
+        'summary': summary,
+        'funnel': summary.loc[FUNNEL_STAGES],
+        'monthly_c3': monthly_c3,
+        'avp_realized': avp_realized.sort_values(labels[0], ascending=False),
+    }
+
+
+def with_deltas(table):
+    """
+    Adds 'Δ <label>' columns: each selection minus the first (the baseline).
+    """
+    baseline = table.columns[0]
+    deltas = {f'Δ {label}': table[label] - table[baseline] for label in table.columns[1:]}
+    return table.assign(**deltas)
+
+
+@st.cache_data(max_entries=64)
+def compare_selections(_df, data_version, selections):
+    """
+    compute_comparison, cached per (data version, selections) where `selections`
+    is a tuple of (label, filter key) pairs.
+    """
+    return compute_comparison(_df, dict(selections))
@@ -0,0 +1,63 @@
+"""
+Stage conversion rates per member of a dimension (AVP, SBU, month, ...), as a
+matrix.
+
+compute_conversion_matrix evaluates the Deep Dive stage flags once for the
+filtered deals (pipeline.conversion_flags) and counts them per group with one
+bincount per stage over the dimension's category codes, so the rates for every
+group come out of a single pass instead of a per-group loop. Each group's
+bottleneck is its lowest stage-to-stage rate, as in the overview's Bottleneck
+Alert.
+"""
+import numpy as np
+import pandas as pd
+import streamlit as st
+
+from pipeline import STAGE_STATUS_COLUMNS, filter_positions, conversion_flags
+
+# Dimensions offered on the Deep Dive, as {label: column}
+CONVERSION_DIMENSIONS = {'AVP': 'AVP', 'SBU': 'SBUs', 'Month': 'Month_Year', 'Brand': 'Brand Name'}
+STAGE_RATES = ['C0→C1', 'C1→C2', 'C2→C3']
+RATE_COLUMNS = STAGE_RATES + ['Overall']
+MATRIX_MAX_ROWS = 25  # Heatmap rows shown; larger dimensions keep their groups with the most C0 deals
+
+
+def _rate(numerator, denominator):
+    # 0 where nothing reached the earlier stage, as in conversion_from_counts
+    with np.errstate(divide='ignore', invalid='ignore'):
+        return np.where(denominator > 0, numerator / denominator * 100, 0.0)
+
+
+def compute_conversion_matrix(df, filter_key, column):
+    """
+    One row per value of `column` with deals under the filters: deals reaching
+    C0-C3, the C0→C1 / C1→C2 / C2→C3 / Overall rates (%) and the Bottleneck
+    stage. Groups with no C0 deals are left out. Rows follow the column's
+    category order (calendar order for months).
+    """
+    positions = filter_positions(df, *filter_key)
+    subset = df.iloc[positions, df.columns.get_indexer([column] + STAGE_STATUS_COLUMNS)]
+    groups = subset[column].cat.categories
+    codes = subset[column].cat.codes.to_numpy()
+
+    flags = conversion_flags(subset).to_numpy()
+    keep = codes >= 0
+    counts = np.stack([
+        np.bincount(codes[keep], weights=flags[keep, j], minlength=len(groups))
+        for j in range(flags.shape[1])
+    ], axis=1).astype('int64')
+    c0, c1, c2, c3 = counts.T
+    rates = np.column_stack([_rate(c1, c0), _rate(c2, c1), _rate(c3, c2), _rate(c3, c0)])
+
+    matrix = pd.DataFrame(counts, index=pd.Index(groups, name=column), columns=[f'Deals with {c}' for c in ['C0', 'C1', 'C2', 'C3']])
+    matrix[RATE_COLUMNS] = rates
+    matrix['Bottleneck'] = np.array(STAGE_RATES)[rates[:, :3].argmin(axis=1)]
+    return matrix[c0 > 0]
+
+
+@st.cache_data(max_entries=128)
+def conversion_matrix(_df, data_version, filter_key, column):
+    """
+    compute_conversion_matrix, cached per (data version, filter state, dimension).
+    """
+    return compute_conversion_matrix(_df, filter_key, column)
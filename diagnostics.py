@@ -0,0 +1,47 @@
+import numpy as np
+import pandas as pd
+
+
+def object_nbytes(obj):
+    """
+    Approximate in-memory size of a cached object: DataFrames/Series with deep
+    (string-inclusive) accounting, numpy arrays, and containers of those.
+    """
+    if isinstance(obj, pd.DataFrame):
+        return int(obj.memory_usage(deep=True, index=True).sum())
+    if isinstance(obj, (pd.Series, pd.Index)):
+        return int(obj.memory_usage(deep=True))
+    if isinstance(obj, np.ndarray):
+        return int(obj.nbytes)
+    if isinstance(obj, dict):
+        return sum(object_nbytes(k) + object_nbytes(v) for k, v in obj.items())
+    if isinstance(obj, (list, tuple)):
+        return sum(object_nbytes(v) for v in obj)
+    if isinstance(obj, str):
+        return len(obj.encode())
+    return 8  # scalars
+
+
+def column_memory(df):
+    """
+    Bytes per column (deep), largest first.
+    """
+    usage = df.memory_usage(deep=True, index=False)
+    report = pd.DataFrame({
+        'Column': usage.index,
+        'Dtype': [str(df[c].dtype) for c in usage.index],
+        'Bytes': usage.values,
+    })
+    return report.sort_values('Bytes', ascending=False, ignore_index=True)
+
+
+def memory_report(objects):
+    """
+    Bytes per named cached object, e.g. {'Prepared frame': df, 'Group indices': idx}.
+    """
+    report = pd.DataFrame({
+        'Object': list(objects.keys()),
+        'Bytes': [object_nbytes(obj) for obj in objects.values()],
+    })
+    report['MB'] = report['Bytes'] / 1024 ** 2
+    return report
@@ -0,0 +1,30 @@
+import streamlit as st
+
+# Dimensions that can be drilled into from the Performance Matrix / treemap
+DRILL_DIMENSIONS = ['AVP', 'Brand Name']
+
+# Columns shown in the drill-down deal list
+DEAL_COLUMNS = [
+    'Month_Year', 'Brand Name', 'AVP', 'SBUs', 'Type',
+    'C0', 'C1', 'C2', 'C3',
+    'C1 (Pitch Stage)', 'C2 (Negotiation Stage)', 'C3 (Deal Closed Stage)',
+]
+
+
+@st.cache_data(max_entries=2)
+def group_indices(_df, data_version):
+    """
+    Maps every AVP and Brand Name to its row positions in the prepared frame.
+    Built once per data version so opening an entity is a direct row take.
+    """
+    return {dim: _df.groupby(dim, observed=True).indices for dim in DRILL_DIMENSIONS if dim in _df.columns}
+
+
+def entity_rows(df, data_version, dimension, entity):
+    """
+    Returns the rows of `df` belonging to one AVP / brand without scanning the frame.
+    """
+    positions = group_indices(df, data_version).get(dimension, {}).get(entity)
+    if positions is None:
+        return df.iloc[:0]
+    return df.take(positions)
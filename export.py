@@ -0,0 +1,143 @@
+import os
+import tempfile
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+
+import pandas as pd
+import streamlit as st
+
+EXPORT_FORMATS = {
+    'CSV': ('csv', 'text/csv'),
+    'Parquet': ('parquet', 'application/vnd.apache.parquet'),
+    'XLSX': ('xlsx', 'application/vnd.openxmlformats-officedocument.spreadsheetml.sheet'),
+}
+BATCH_ROWS = 50000  # Rows handed to a writer at a time
+EXPORT_DIR = os.path.join(tempfile.gettempdir(), "c0c3_exports")
+EXPORT_MAX_AGE = 3600  # Seconds an export file is kept for its download button
+EXPORT_KEEP = 50       # Newest files kept at most, whatever their age
+
+
+def iter_batches(frame, batch_rows=BATCH_ROWS):
+    """
+    Yields `frame` in row batches, with Period columns (Month_Sort) rendered as text
+    so every writer can handle them.
+    """
+    period_cols = [c for c in frame.columns if isinstance(frame[c].dtype, pd.PeriodDtype)]
+    # An empty frame still yields one (empty) batch so headers/schema get written
+    for start in range(0, max(len(frame), 1), batch_rows):
+        batch = frame.iloc[start:start + batch_rows]
+        if period_cols:
+            batch = batch.astype({c: str for c in period_cols})
+        yield batch
+
+
+def write_csv(batches, path):
+    with open(path, 'w', newline='', encoding='utf-8') as f:
+        for i, batch in enumerate(batches):
+            batch.to_csv(f, header=(i == 0), index=False)
+
+
+def arrow_schema(frame):
+    """
+    Infers the Parquet schema once from the full frame so sparse batches (e.g. a
+    batch where a stage column is all blank) still match it.
+    """
+    import pyarrow as pa
+
+    fields = []
+    for col in frame.columns:
+        if isinstance(frame[col].dtype, pd.PeriodDtype):
+            fields.append(pa.field(str(col), pa.string()))
+        else:
+            fields.append(pa.Schema.from_pandas(frame[[col]], preserve_index=False).field(0))
+    return pa.schema(fields)
+
+
+def write_parquet(batches, path, schema=None):
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+
+    writer = None
+    try:
+        for batch in batches:
+            table = pa.Table.from_pandas(batch, schema=schema, preserve_index=False)
+            if writer is None:
+                writer = pq.ParquetWriter(path, table.schema)
+            writer.write_table(table)
+    finally:
+        if writer is not None:
+            writer.close()
+
+
+def write_xlsx(batches, path, sheet_name="Data"):
+    from openpyxl import Workbook
+
+    # write_only mode streams rows to disk instead of holding the sheet in memory
+    wb = Workbook(write_only=True)
+    ws = wb.create_sheet(sheet_name[:31])
+    for i, batch in enumerate(batches):
+        if i == 0:
+            ws.append([str(c) for c in batch.columns])
+        batch = batch.astype(object).where(batch.notna(), None)
+        for row in batch.itertuples(index=False, name=None):
+            ws.append(row)
+    wb.save(path)
+
+
+def write_export(frame, fmt, path, sheet_name="Data"):
+    """
+    Streams `frame` to `path` in the given format (one of EXPORT_FORMATS).
+    """
+    batches = iter_batches(frame)
+    if fmt == 'CSV':
+        write_csv(batches, path)
+    elif fmt == 'Parquet':
+        write_parquet(batches, path, schema=arrow_schema(frame))
+    elif fmt == 'XLSX':
+        write_xlsx(batches, path, sheet_name=sheet_name)
+    else:
+        raise ValueError(f"Unsupported export format: {fmt}")
+    return path
+
+
+@st.cache_resource
+def _export_executor():
+    # Shared by all sessions; exports run here instead of on the rerun thread
+    return ThreadPoolExecutor(max_workers=2, thread_name_prefix="export")
+
+
+def prune_exports(max_age=EXPORT_MAX_AGE, keep=EXPORT_KEEP):
+    """
+    Deletes export files older than `max_age` seconds, and all but the newest
+    `keep`, from EXPORT_DIR.
+    """
+    try:
+        entries = [e for e in os.scandir(EXPORT_DIR) if e.is_file()]
+    except FileNotFoundError:
+        return
+    entries.sort(key=lambda e: e.stat().st_mtime, reverse=True)
+    cutoff = time.time() - max_age
+    for i, entry in enumerate(entries):
+        if i >= keep or entry.stat().st_mtime < cutoff:
+            try:
+                os.remove(entry.path)
+            except OSError:
+                pass  # Already gone, or still open on Windows; the next prune retries
+
+
+def start_export(frame, fmt, name):
+    """
+    Queues an export in the background. Returns (future, file_name); the future
+    resolves to the path of the written file. file_name is the download name; the
+    file on disk carries a random prefix so concurrent sessions never share one.
+    """
+    ext = EXPORT_FORMATS[fmt][0]
+    os.makedirs(EXPORT_DIR, exist_ok=True)
+    prune_exports()
+    stamp = datetime.now().strftime('%Y%m%d_%H%M%S')
+    file_name = f"{name.lower().replace(' ', '_')}_{stamp}.{ext}"
+    path = os.path.join(EXPORT_DIR, f"{uuid.uuid4().hex}_{file_name}")
+    future = _export_executor().submit(write_export, frame, fmt, path, name)
+    return future, file_name
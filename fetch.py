@@ -0,0 +1,125 @@
+"""
+Shared HTTP client for the Google Sheets CSV exports.
+
+One pooled keep-alive session for every sheet fetch, with gzip negotiation,
+connect/read timeouts, bounded retries with jittered exponential backoff and a
+circuit breaker. When the breaker is open callers fail fast, and utils.py falls
+back to the last good snapshot instead of hanging the rerun.
+"""
+import logging
+import random
+import threading
+import time
+
+import requests
+from requests.adapters import HTTPAdapter
+
+logger = logging.getLogger("c0c3.fetch")
+
+CONNECT_TIMEOUT = 5     # seconds
+READ_TIMEOUT = 20       # seconds
+MAX_ATTEMPTS = 3        # first try + retries
+BACKOFF_BASE = 0.5      # seconds, doubled per attempt, full jitter
+BREAKER_THRESHOLD = 3   # consecutive failed fetches before the breaker opens
+BREAKER_COOLDOWN = 60   # seconds before a half-open trial request
+
+RETRY_STATUSES = {429, 500, 502, 503, 504}
+
+
+class FetchError(Exception):
+    """Raised when a sheet could not be fetched after all retries."""
+
+
+class CircuitOpenError(FetchError):
+    """Raised without touching the network while the circuit breaker is open."""
+
+
+class CircuitBreaker:
+    def __init__(self, threshold=BREAKER_THRESHOLD, cooldown=BREAKER_COOLDOWN):
+        self.threshold = threshold
+        self.cooldown = cooldown
+        self.failures = 0
+        self.opened_at = None
+        self._lock = threading.Lock()
+
+    def allow(self):
+        with self._lock:
+            if self.opened_at is None:
+                return True
+            # Half-open: let one trial through once the cooldown has passed
+            if time.monotonic() - self.opened_at >= self.cooldown:
+                self.opened_at = time.monotonic()
+                return True
+            return False
+
+    def record_success(self):
+        with self._lock:
+            self.failures = 0
+            self.opened_at = None
+
+    def record_failure(self):
+        with self._lock:
+            self.failures += 1
+            if self.failures >= self.threshold:
+                if self.opened_at is None:
+                    logger.warning("circuit breaker open after %d failures", self.failures)
+                self.opened_at = time.monotonic()
+
+    @property
+    def is_open(self):
+        return self.opened_at is not None
+
+
+class SheetClient:
+    def __init__(self, connect_timeout=CONNECT_TIMEOUT, read_timeout=READ_TIMEOUT,
+                 max_attempts=MAX_ATTEMPTS, backoff_base=BACKOFF_BASE, breaker=None, pool_size=8):
+        self.timeout = (connect_timeout, read_timeout)
+        self.max_attempts = max_attempts
+        self.backoff_base = backoff_base
+        self.breaker = breaker or CircuitBreaker()
+
+        self.session = requests.Session()
+        # Retries are handled here (with jitter), not by urllib3
+        adapter = HTTPAdapter(pool_connections=4, pool_maxsize=pool_size, max_retries=0)
+        self.session.mount("https://", adapter)
+        self.session.mount("http://", adapter)
+        self.session.headers.update({"Accept-Encoding": "gzip, deflate"})
+
+    def _backoff(self, attempt):
+        return random.uniform(0, self.backoff_base * (2 ** attempt))
+
+    def get(self, url, headers=None):
+        """
+        GETs `url` and returns the response (200 or 304). Connection errors,
+        timeouts and 429/5xx are retried; anything else is returned as-is
+        via raise_for_status.
+        """
+        if not self.breaker.allow():
+            raise CircuitOpenError(f"circuit open, skipping fetch of {url}")
+
+        last_error = None
+        for attempt in range(self.max_attempts):
+            if attempt:
+                time.sleep(self._backoff(attempt - 1))
+            try:
+                resp = self.session.get(url, headers=headers, timeout=self.timeout)
+            except (requests.ConnectionError, requests.Timeout) as e:
+                last_error = e
+                logger.warning("fetch attempt %d/%d failed: %s", attempt + 1, self.max_attempts, e)
+                continue
+            if resp.status_code in RETRY_STATUSES:
+                last_error = FetchError(f"HTTP {resp.status_code}")
+                logger.warning("fetch attempt %d/%d got HTTP %d", attempt + 1, self.max_attempts, resp.status_code)
+                resp.close()
+                continue
+            if resp.status_code != 304:
+                try:
+                    resp.raise_for_status()
+                except requests.HTTPError as e:
+                    self.breaker.record_failure()
+                    raise FetchError(str(e)) from e
+            self.breaker.record_success()
+            return resp
+
+        self.breaker.record_failure()
+        raise FetchError(f"giving up on {url} after {self.max_attempts} attempts: {last_error}")
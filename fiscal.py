@@ -0,0 +1,175 @@
+"""
+Fiscal calendar (month → quarter → half → FY) with rollups precomputed per data
+version.
+
+fiscal_calendar maps every month of the data to its fiscal quarter, half and
+year for a financial year starting in FY_START_MONTH (April by default, set
+C0C3_FY_START_MONTH to change it). compute_fiscal_rollups scans the deals once:
+C0-C3, deal count and funnel stage counts per (Type, SBU, month), rolled up to
+every level of the hierarchy, with an 'All' SBU row per Type. A quarter, half or
+FY view for a filter state is then an index lookup (a sum over the few selected
+SBU rows when several are picked), and the Revenue_Summary targets are joined
+onto it by period.
+"""
+import os
+import re
+
+import numpy as np
+import pandas as pd
+import streamlit as st
+
+from pipeline import cols_to_sum, FUNNEL_STAGES, funnel_flags
+
+FY_START_MONTH = int(os.environ.get("C0C3_FY_START_MONTH", "4"))  # April-March financial year
+if not 1 <= FY_START_MONTH <= 12:
+    raise ValueError("C0C3_FY_START_MONTH must be a month number, 1-12")
+LEVELS = ['Month', 'Quarter', 'Half', 'FY']
+MONTHS_PER_PERIOD = {'Month': 1, 'Quarter': 3, 'Half': 6, 'FY': 12}
+ALL_SBUS = 'All'
+ROLLUP_COLUMNS = cols_to_sum + ['Deals'] + FUNNEL_STAGES
+
+
+def fy_label(start_year):
+    # FY25-26 for April 2025 - March 2026; a calendar-year FY is just FY2025
+    start_year = np.asarray(start_year)
+    if FY_START_MONTH == 1:
+        return pd.Index([f"FY{y}" for y in start_year])
+    return pd.Index([f"FY{y % 100:02d}-{(y + 1) % 100:02d}" for y in start_year])
+
+
+def fiscal_calendar(months):
+    """
+    One row per month (PeriodIndex) with its Month label, fiscal Quarter, Half
+    and FY labels (e.g. 'FY25-26 Q3') and its position in the fiscal year.
+    """
+    months = pd.PeriodIndex(months, freq='M').unique().sort_values()
+    offset = (months.month - FY_START_MONTH) % 12
+    fy = fy_label(months.year - (months.month < FY_START_MONTH))
+    return pd.DataFrame({
+        'Month': months.strftime('%b %Y'),
+        'Quarter': fy + ' Q' + (offset // 3 + 1).astype(str),
+        'Half': fy + ' H' + (offset // 6 + 1).astype(str),
+        'FY': fy,
+        'Month in FY': offset + 1,
+    }, index=months)
+
+
+def compute_fiscal_rollups(df):
+    """
+    {level: frame indexed by (Type, SBUs, Period)} with ROLLUP_COLUMNS and the
+    number of months with deals, for every level in LEVELS, plus the fiscal
+    'calendar' of the months in the data. Periods are in calendar order within
+    each (Type, SBUs); deals with a blank Type or SBU are kept.
+    """
+    values = pd.concat([
+        df[cols_to_sum].astype('float64'),
+        pd.Series(1, index=df.index, name='Deals'),
+        funnel_flags(df).astype('int64'),
+    ], axis=1)
+    by_month = values.groupby([df['Type'], df['SBUs'], df['Month_Sort']], observed=True, dropna=False).sum()
+    by_month['Months'] = 1
+    by_month.index = by_month.index.set_levels(by_month.index.levels[1].astype(str), level='SBUs')
+
+    # 'All' SBUs per Type, so the unfiltered view is a lookup too
+    all_sbus = by_month.groupby(level=['Type', 'Month_Sort']).sum().assign(Months=1)
+    all_sbus = pd.concat({ALL_SBUS: all_sbus}, names=['SBUs']).reorder_levels(['Type', 'SBUs', 'Month_Sort'])
+    by_month = pd.concat([by_month, all_sbus])
+
+    calendar = fiscal_calendar(by_month.index.get_level_values('Month_Sort'))
+    month_periods = by_month.index.get_level_values('Month_Sort')
+    rollups = {'calendar': calendar}
+    for level in LEVELS:
+        period = pd.Categorical(
+            calendar[level].reindex(month_periods).to_numpy(),
+            categories=calendar[level].unique(), ordered=True,
+        )
+        rolled = by_month.groupby(
+            [by_month.index.get_level_values('Type'), by_month.index.get_level_values('SBUs'), period],
+            observed=True,
+        ).sum()
+        rolled.index.names = ['Type', 'SBUs', 'Period']
+        rollups[level] = rolled[ROLLUP_COLUMNS + ['Months']]
+    return rollups
+
+
+@st.cache_data(max_entries=2)
+def fiscal_rollups(_df, data_version):
+    """
+    compute_fiscal_rollups, once per data version.
+    """
+    return compute_fiscal_rollups(_df)
+
+
+def fiscal_view(rollups, level, selected_type, selected_sbu=()):
+    """
+    Rollup rows for one Type and SBU selection at `level`, indexed by Period,
+    with 'Coverage' (months with deals / months in the period).
+    """
+    table = rollups[level]
+    if not selected_sbu:
+        try:
+            view = table.loc[(selected_type, ALL_SBUS)].copy()
+        except KeyError:
+            view = table.iloc[:0].droplevel(['Type', 'SBUs'])
+    else:
+        def selected(frame):
+            return frame[
+                (frame.index.get_level_values('Type') == selected_type)
+                & frame.index.get_level_values('SBUs').isin(selected_sbu)
+            ]
+        view = selected(table).groupby(level='Period', observed=True, sort=True).sum()
+        # Months with deals in any selected SBU (summing per-SBU counts would double count)
+        months = selected(rollups['Month']).index.get_level_values('Period').unique()
+        calendar = rollups['calendar']
+        month_level = calendar[level].set_axis(calendar['Month'])  # Month level: each month maps to itself
+        view['Months'] = month_level.reindex(months.astype(str)).value_counts().reindex(view.index.astype(str)).to_numpy()
+    view['Coverage'] = view.pop('Months') / MONTHS_PER_PERIOD[level]
+    return view
+
+
+def revenue_targets(rev_df):
+    """
+    Targets from Revenue_Summary as {'Q1'..'Q4' | 'H1' | 'H2' | 'FY': rupees},
+    read from '<period> Target' columns on the Revenue row (or the first row).
+    Amounts may carry ₹ signs and thousands separators; missing sheets give {}.
+    """
+    if rev_df is None or rev_df.empty:
+        return {}
+    row = rev_df.iloc[0]
+    if 'Metric' in rev_df.columns:
+        revenue = rev_df[rev_df['Metric'].astype(str).str.contains('Revenue', case=False, na=False)]
+        if not revenue.empty:
+            row = revenue.iloc[0]
+    targets = {}
+    for col, value in row.items():
+        match = re.fullmatch(r'\s*(Q[1-4]|H[12]|FY)\s+Target\s*', str(col), flags=re.IGNORECASE)
+        if match is None:
+            continue
+        amount = pd.to_numeric(re.sub(r'[^0-9.\-]', '', str(value)), errors='coerce')
+        if pd.notna(amount):
+            targets[match.group(1).upper()] = float(amount)
+    return targets
+
+
+def with_targets(view, targets, fiscal_year):
+    """
+    Adds Target and Attainment % (C3 / target) for the periods of `fiscal_year`
+    that Revenue_Summary has a target for; other periods are left blank.
+    """
+    view = view.copy()
+    period_target = {f"{fiscal_year} {p}" if p != 'FY' else fiscal_year: v for p, v in targets.items()}
+    view['Target'] = view.index.map(lambda p: period_target.get(str(p), np.nan)).astype('float64')
+    view['Attainment %'] = view['C3'] / view['Target'].where(view['Target'] > 0) * 100
+    return view
+
+
+def target_fiscal_year(today=None):
+    """
+    The FY the Revenue_Summary targets belong to: C0C3_TARGET_FY (e.g. 'FY25-26')
+    when set, else the FY containing today.
+    """
+    configured = os.environ.get("C0C3_TARGET_FY", "").strip()
+    if configured:
+        return configured
+    today = pd.Timestamp.today() if today is None else pd.Timestamp(today)
+    return fiscal_calendar([today.to_period('M')])['FY'].iloc[0]
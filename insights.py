@@ -0,0 +1,176 @@
+"""
+Executive Overview insights as declarative rules.
+
+Each rule is a function of the view bundle (views.compute_view: totals, per-AVP and
+per-brand aggregates, time-series metrics, stage counts, plus the filter key and
+the per-version anomaly scores from anomalies.py) and its own thresholds, declared
+with @rule. Rules only read those shared aggregates, so adding one costs no extra
+scan of the deal rows. evaluate_insights runs every rule in one batch,
+memoized per (data version, filter state), and records how long each rule took.
+"""
+import logging
+import time
+from typing import Callable, NamedTuple, Optional
+
+import pandas as pd
+import streamlit as st
+
+from anomalies import ALL_SBUS
+from ranking import measure_values, rank_values
+
+logger = logging.getLogger("c0c3.insights")
+
+CRORE = 10000000
+
+
+class Rule(NamedTuple):
+    name: str
+    evaluate: Callable   # evaluate(view, **params) -> message or None
+    params: dict         # Thresholds, passed to evaluate as keyword arguments
+
+
+class Insight(NamedTuple):
+    rule: str
+    message: Optional[str]   # None when the rule has nothing to say
+    duration_ms: float
+
+
+RULES = []
+
+
+def rule(name, **params):
+    """
+    Registers the decorated function as an insight rule with the given thresholds.
+    Rules are shown in registration order.
+    """
+    def register(evaluate):
+        RULES.append(Rule(name, evaluate, params))
+        return evaluate
+    return register
+
+
+@rule('Revenue Forecast', c2_closure_rate=0.5)
+def revenue_forecast(view, c2_closure_rate):
+    c2_potential = (view['total_data']['C2'] * c2_closure_rate) / CRORE
+    if c2_potential > 0:
+        return (
+            f"🔮 **Revenue Forecast**: Pipeline data suggests a potential unlock of **₹{c2_potential:.2f} Cr** "
+            f"from deals currently in 'Negotiation' (assuming {c2_closure_rate * 100:.0f}% closure probability). "
+            "Focus on closing these C2 deals."
+        )
+
+
+@rule('Bottleneck Alert')
+def bottleneck_alert(view):
+    deals_with_c0, deals_with_c1, deals_with_c2, deals_with_c3 = view['bottleneck_counts']
+    conv_data = pd.Series({
+        'C0→C1': (deals_with_c1 / deals_with_c0 * 100) if deals_with_c0 > 0 else 0,
+        'C1→C2': (deals_with_c2 / deals_with_c1 * 100) if deals_with_c1 > 0 else 0,
+        'C2→C3': (deals_with_c3 / deals_with_c2 * 100) if deals_with_c2 > 0 else 0,
+    })
+    return (
+        f"⚠️ **Bottleneck Alert**: The lowest conversion rate is at **{conv_data.idxmin()}** stage "
+        f"(**{conv_data.min():.1f}%**). Focus on improving this transition to unlock pipeline potential."
+    )
+
+
+@rule('Top Performer')
+def top_performer(view):
+    avp_metrics = view['avp_metrics']
+    if avp_metrics.empty:
+        return None
+    conv = (avp_metrics['Realized Value'] / avp_metrics['Total Pipeline']).fillna(0)
+    avp_leader = rank_values(measure_values(view['avp_totals'], 'C3'), k=1).top.index[0]
+    is_leader = avp_metrics['AVP'] == avp_leader
+    top_avp = avp_metrics[is_leader].iloc[0]
+    return (
+        f"🏆 **Top Performer**: **{top_avp['AVP']}** is leading with **₹{top_avp['Realized Value']:.1f} Cr** "
+        f"realized value and **{conv[is_leader].iloc[0] * 100:.1f}%** conversion rate."
+    )
+
+
+@rule('Concentration Risk', top_n=3, medium_pct=30, high_pct=50)
+def concentration_risk(view, top_n, medium_pct, high_pct):
+    brand_c3 = measure_values(view['brand_totals'], 'C3')
+    total_brands_val = brand_c3.sum()
+    if total_brands_val <= 0:
+        return None
+    conc_ratio = (brand_c3.nlargest(top_n).sum() / total_brands_val) * 100
+    risk_level = "HIGH" if conc_ratio > high_pct else "MEDIUM" if conc_ratio > medium_pct else "LOW"
+    advice = {
+        'HIGH': 'Consider diversifying client base.',
+        'MEDIUM': 'Monitor closely.',
+        'LOW': 'Healthy distribution.',
+    }[risk_level]
+    return (
+        f"⚖️ **Concentration Risk ({risk_level})**: The top {top_n} brands contribute "
+        f"**{conc_ratio:.1f}%** of revenue. {advice}"
+    )
+
+
+@rule('Stalled Opportunities', min_pipeline=50000000)
+def stalled_opportunities(view, min_pipeline):
+    brand_totals = view['brand_totals']
+    stalled_brands = brand_totals[
+        (brand_totals['C1'] + brand_totals['C2'] > min_pipeline) & (brand_totals['C3'] == 0)
+    ]
+    if stalled_brands.empty:
+        return None
+    return (
+        f"🐢 **Stalled Opportunities**: There are **{len(stalled_brands)}** brands "
+        f"(e.g., **{stalled_brands.index[0]}**) with significant pipeline value (>₹{min_pipeline / CRORE:g} Cr) "
+        "but zero closures. Immediate review required."
+    )
+
+
+@rule('Anomalies', top_n=3)
+def anomalies(view, top_n):
+    # Strongest AVP / brand month anomalies within the selected Type, SBUs and months
+    found = view.get('anomalies')
+    if found is None or found.empty:
+        return None
+    selected_type, selected_months, selected_sbu = view['filter_key']
+    in_view = found['Type'] == selected_type
+    if selected_months:
+        in_view = in_view & found['Month_Year'].isin(selected_months)
+    # One SBU's own series when SBUs are picked, else the series across all SBUs
+    in_view = in_view & (found['SBUs'].isin(selected_sbu) if selected_sbu else found['SBUs'] == ALL_SBUS)
+    top = found[in_view].head(top_n)
+    if top.empty:
+        return None
+    details = "; ".join(
+        f"**{row['Member']}**{'' if row['SBUs'] == ALL_SBUS else ' (' + row['SBUs'] + ')'} {row['Measure']} in {row['Month_Year']} was ₹{row['Value'] / CRORE:.1f} Cr "
+        f"vs a typical ₹{row['Median'] / CRORE:.1f} Cr ({'spike' if row['Robust Z'] > 0 else 'drop'}, "
+        f"robust z {row['Robust Z']:+.1f})"
+        for _, row in top.iterrows()
+    )
+    return f"🚨 **Anomalies**: {details}. Check whether these reflect real movement or data entry issues."
+
+
+def run_rules(view, rules=None):
+    """
+    Evaluates `rules` (default: every registered rule) over one view bundle.
+    A failing rule is logged and reported without a message; the others still run.
+    """
+    results = []
+    for r in RULES if rules is None else rules:
+        started = time.perf_counter()
+        try:
+            message = r.evaluate(view, **r.params)
+        except Exception as e:
+            logger.warning("insight rule %s failed: %s", r.name, e)
+            message = None
+        results.append(Insight(r.name, message, (time.perf_counter() - started) * 1000))
+    return results
+
+
+@st.cache_data(max_entries=256)
+def evaluate_insights(_view, _anomalies, data_version, filter_key, _precomputed=None):
+    """
+    run_rules for one filter state, cached like the view it reads (and seeded by
+    the pre-warmer the same way). The timings are from the evaluation that filled
+    the cache.
+    """
+    if _precomputed is not None:
+        return _precomputed
+    return run_rules(dict(_view, anomalies=_anomalies, filter_key=filter_key))
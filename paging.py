@@ -0,0 +1,86 @@
+"""
+Paginated tables with server-side sort for aggregates with thousands of rows.
+
+render_paged_table sends the browser only the visible page plus an optional
+totals row, so the payload is the same size whether the table has 50 rows or
+50,000. Sorting happens here: the sorted row order is cached per (data version,
+table key, column, direction), so turning pages of a sorted table is a
+positional take of page_size rows.
+"""
+import math
+
+import pandas as pd
+import streamlit as st
+
+PAGE_SIZES = [25, 50, 100]
+
+
+def sort_positions(table, sort_by, ascending):
+    """
+    Row positions of `table` ordered by `sort_by` (stable, blanks last).
+    """
+    values = table[sort_by].reset_index(drop=True)
+    return values.sort_values(ascending=ascending, kind='stable', na_position='last').index.to_numpy()
+
+
+@st.cache_data(max_entries=256)
+def sorted_positions(_table, data_version, table_key, sort_by, ascending):
+    """
+    sort_positions, cached. `table_key` identifies the table's contents within a
+    data version (its filter key, dimension, ...).
+    """
+    return sort_positions(_table, sort_by, ascending)
+
+
+def page_window(table, positions, page, page_size):
+    """
+    Rows of page `page` (1-based) in `positions` order.
+    """
+    start = (page - 1) * page_size
+    return table.iloc[positions[start:start + page_size]]
+
+
+def render_paged_table(table, key, data_version, table_key, totals=None, sort_by=None,
+                       ascending=False, column_config=None):
+    """
+    Sort / page-size / page controls and one page of `table`, with `totals` (a
+    row as a Series) appended. Widget state lives under `key`; changing the sort
+    or page size returns to page 1, as does a table that shrank under the
+    current page.
+    """
+    sort_key, order_key, size_key, page_key = (f"{key}_{part}" for part in ("sort", "order", "size", "page"))
+    columns = list(table.columns)
+
+    def first_page():
+        st.session_state[page_key] = 1
+
+    ctrl_sort, ctrl_order, ctrl_size, ctrl_page = st.columns([2, 1, 1, 1])
+    with ctrl_sort:
+        sort_by = st.selectbox(
+            "Sort by", columns, index=columns.index(sort_by) if sort_by in columns else 0,
+            key=sort_key, on_change=first_page,
+        )
+    with ctrl_order:
+        order = st.selectbox(
+            "Order", ["Ascending", "Descending"], index=0 if ascending else 1,
+            key=order_key, on_change=first_page,
+        )
+    with ctrl_size:
+        page_size = st.selectbox("Rows per page", PAGE_SIZES, key=size_key, on_change=first_page)
+    n_pages = max(1, math.ceil(len(table) / page_size))
+    if st.session_state.get(page_key, 1) > n_pages:
+        st.session_state[page_key] = 1
+    with ctrl_page:
+        page = st.number_input("Page", min_value=1, max_value=n_pages, step=1, key=page_key)
+
+    positions = sorted_positions(table, data_version, table_key, sort_by, order == "Ascending")
+    window = page_window(table, positions, page, page_size)
+    if totals is not None:
+        window = pd.concat([window, pd.DataFrame([totals]).infer_objects()], ignore_index=True)
+    st.dataframe(window, hide_index=True, use_container_width=True, column_config=column_config)
+
+    start = (page - 1) * page_size
+    st.caption(
+        f"Rows {min(start + 1, len(table)):,}–{min(start + page_size, len(table)):,} of {len(table):,} "
+        f"(page {page:,} of {n_pages:,})"
+    )
@@ -0,0 +1,409 @@
+import hashlib
+import os
+import threading
+
+import numpy as np
+import pandas as pd
+import streamlit as st
+
+from utils import load_base_sources
+from snapshot import snapshot_backed
+
+# Sessions share one cached frame and filter it without copying it first; under
+# copy-on-write (always on from pandas 3) nothing derived from it can write back
+if int(pd.__version__.split('.')[0]) < 3:
+    pd.set_option('mode.copy_on_write', True)
+
+cols_to_sum = ['C0', 'C1', 'C2', 'C3']
+
+# Snapshot name of the prepared Base_Data frame (snapshot.py)
+BASE_DATA_SNAPSHOT = 'base_data'
+
+# Default filter: Start from October 2025 onwards (set to the FY start, e.g.
+# 2025-04-01, for complete H1 / full-year rollups in fiscal.py)
+START_DATE = os.environ.get("C0C3_START_DATE", "2025-10-01")
+
+FUNNEL_STAGES = ['C0 - Ideation', 'C1 - Pitch', 'C2 - Negotiation', 'C3 - Closed']
+
+# Low-cardinality text columns stored as categorical codes in the prepared frame
+DIMENSION_COLUMNS = ['AVP', 'SBUs', 'Brand Name', 'Type']
+STAGE_STATUS_COLUMNS = [
+    'C0 (Ideation/ Brainstorming Stage)', 'C1 (Pitch Stage)',
+    'C2 (Negotiation Stage)', 'C3 (Deal Closed Stage)',
+]
+# Columns the per-filter aggregates read (views.compute_view and the JSON API)
+VIEW_COLUMNS = ['Month_Sort', 'Month_Year', 'Brand Name', 'AVP'] + cols_to_sum + STAGE_STATUS_COLUMNS
+
+
+def _downcast_lossless(values):
+    """
+    Shrinks a numeric column only when no value changes: whole-rupee columns become
+    the smallest integer type that fits, others float32 if it round-trips exactly.
+    """
+    if (values % 1 == 0).all():
+        return pd.to_numeric(values, downcast='integer')
+    as_f32 = values.astype('float32')
+    if (as_f32.astype('float64') == values).all():
+        return as_f32
+    return values
+
+
+def _prepare_base_data(_raw_df, data_version):
+    df = _raw_df[_raw_df['Month222'] >= START_DATE].copy()
+
+    # --- Prepare Pipeline Data (for Filters) ---
+    df['Month_Sort'] = df['Month222'].dt.to_period('M')
+    # Month labels as ordered codes into the month dimension (one string per month, not per row)
+    df['Month_Year'] = (
+        df['Month_Sort'].astype('category').cat
+        .rename_categories(lambda p: p.strftime('%b %Y')).cat.as_ordered()
+    )
+
+    # Ensure C columns are numeric
+    for col in cols_to_sum:
+        df[col] = _downcast_lossless(pd.to_numeric(df[col], errors='coerce').fillna(0))
+
+    for col in DIMENSION_COLUMNS + STAGE_STATUS_COLUMNS:
+        if col in df.columns:
+            df[col] = df[col].astype('category')
+
+    df.attrs['data_version'] = data_version
+    return df
+
+
+@st.cache_resource
+def _federation():
+    # Prepared frame per source (with its version) and the last merge of them
+    return {'lock': threading.Lock(), 'parts': {}, 'merged': None}
+
+
+def cached_prepared_sources():
+    """
+    The per-source prepared frames held for the next merge, as {source name:
+    frame}, without loading anything. For diagnostics.
+    """
+    state = _federation()
+    with state['lock']:
+        return dict(state['parts'])
+
+
+def _prepared_source(name, raw_df):
+    """
+    One source's prepared frame with a categorical Source column, re-prepared only
+    when the source's data_version changed.
+    """
+    state = _federation()
+    version = raw_df.attrs.get('data_version', '')
+    with state['lock']:
+        part = state['parts'].get(name)
+    if part is not None and part.attrs['data_version'] == version:
+        return part
+    part = _prepare_base_data(raw_df, version)
+    part['Source'] = pd.Categorical.from_codes(np.zeros(len(part), dtype='int8'), categories=[name])
+    with state['lock']:
+        state['parts'][name] = part
+    return part
+
+
+def _union_dtype(parts, col):
+    # Categories of every part, first-seen order; Month_Year stays in calendar order
+    categories = pd.Index([])
+    for part in parts:
+        categories = categories.append(part[col].cat.categories.difference(categories, sort=False))
+    if col == 'Month_Year':
+        categories = categories[np.argsort(pd.to_datetime(categories, format='%b %Y'))]
+    return pd.CategoricalDtype(categories, ordered=parts[0][col].cat.ordered)
+
+
+def merge_sources(parts):
+    """
+    Stacks prepared source frames into one. Each part's categoricals are recoded
+    onto the union of categories first (a code remap, no string work), so the
+    dimension columns stay categorical and filters and aggregates run on the
+    merged frame unchanged.
+    """
+    parts = list(parts)
+    if len(parts) == 1:
+        return parts[0]
+    categorical = [
+        col for col in parts[0].columns
+        if all(col in p.columns and isinstance(p[col].dtype, pd.CategoricalDtype) for p in parts)
+    ]
+    dtypes = {col: _union_dtype(parts, col) for col in categorical}
+    return pd.concat([p.astype(dtypes) for p in parts], ignore_index=True)
+
+
+def federated_version(versions):
+    """
+    Data version of a merge: the source's own version for a single source (so its
+    snapshots stay valid), else a digest of every (source, version) pair.
+    """
+    if len(versions) == 1:
+        return next(iter(versions.values()))
+    key = ";".join(f"{name}={version}" for name, version in sorted(versions.items()))
+    return hashlib.sha256(key.encode()).hexdigest()[:16]
+
+
+def _fetch_prepared_data():
+    """
+    Prepared Base_Data across every configured source (utils.SOURCES). Sources
+    are fetched in parallel; only those whose content changed are re-parsed and
+    re-prepared, and the merge is redone only when some source's version moved.
+    """
+    raw_parts = {name: raw for name, raw in load_base_sources().items() if not raw.empty}
+    if not raw_parts:
+        return pd.DataFrame()
+    versions = {name: raw.attrs.get('data_version', '') for name, raw in raw_parts.items()}
+    version = federated_version(versions)
+
+    state = _federation()
+    with state['lock']:
+        merged = state['merged']
+    if merged is not None and merged.attrs['data_version'] == version:
+        return merged
+    merged = merge_sources(_prepared_source(name, raw) for name, raw in raw_parts.items())
+    merged.attrs['data_version'] = version
+    merged.attrs['sources'] = versions
+    with state['lock']:
+        state['merged'] = merged
+    return merged
+
+
+def fetch_prepared_data():
+    """
+    Prepared Base_Data straight from the sheets, skipping the on-disk snapshot,
+    for batch jobs that must not publish stale data (reports.py). Empty when no
+    source could be loaded. A shallow copy, like load_prepared_data.
+    """
+    return _fetch_prepared_data().copy(deep=False)
+
+
+def load_prepared_data():
+    """
+    Loads Base_Data and applies the dashboard's preparation (date window, month
+    labels, numeric C0-C3). Shared by the Streamlit app and the JSON API.
+
+    Served from the on-disk snapshot after a restart and refreshed from the sheet
+    in the background (snapshot.snapshot_backed).
+
+    The frame is shared by every session; callers get a shallow copy, so even
+    adding or assigning columns on it never reaches the cached original.
+    """
+    return snapshot_backed(BASE_DATA_SNAPSHOT, _fetch_prepared_data).copy(deep=False)
+
+
+def month_dimension(df):
+    """
+    The shared month dimension table (Month_Sort, Month_Year) in calendar order,
+    read from the Month_Year categories rather than scanning rows.
+    """
+    labels = df['Month_Year'].cat.categories
+    periods = pd.PeriodIndex(pd.to_datetime(labels, format='%b %Y'), freq='M')
+    return pd.DataFrame({'Month_Sort': periods, 'Month_Year': labels})
+
+
+def filter_positions(frame, selected_type, selected_months=(), selected_sbu=()):
+    """
+    Row positions of `frame` matching the filters, from one combined mask.
+    """
+    # Type Toggle Filtering (Always applies since it's a radio)
+    mask = (frame['Type'] == selected_type).to_numpy(dtype=bool)
+
+    if selected_months:
+        mask = mask & frame['Month_Year'].isin(selected_months).to_numpy(dtype=bool)
+
+    if selected_sbu:
+        mask = mask & frame['SBUs'].isin(selected_sbu).to_numpy(dtype=bool)
+
+    return np.flatnonzero(mask)
+
+
+def apply_filters(frame, selected_type, selected_months=(), selected_sbu=(), columns=None):
+    """
+    The matching rows of `frame` (only `columns`, if given) in a single take. The
+    source frame is neither copied up front nor modified, and the result owns its
+    data, so concurrent sessions can filter the same cached frame.
+    """
+    positions = filter_positions(frame, selected_type, selected_months, selected_sbu)
+    if columns is None:
+        return frame.take(positions)
+    column_positions = frame.columns.get_indexer([c for c in columns if c in frame.columns])
+    return frame.iloc[positions, column_positions]
+
+
+# Prepare shared aggregation data
+def prepare_shared_data(filtered_df):
+    # Aggregation
+    agg_df = filtered_df.groupby(['Month_Sort', 'Month_Year'], observed=True)[cols_to_sum].sum().reset_index()
+    agg_df = agg_df.sort_values('Month_Sort')
+    display_df = agg_df.drop(columns=['Month_Sort'])
+
+    # Totals
+    total_row = display_df[cols_to_sum].sum()
+    total_data = {'Month_Year': 'TOTAL'}
+    for col in cols_to_sum:
+        total_data[col] = total_row[col]
+    return agg_df, display_df, total_data
+
+
+def _status_flag(column, predicate):
+    """
+    `predicate` over the non-blank statuses of `column`, False where blank. On a
+    categorical column it runs once per distinct status and is mapped via the codes
+    rather than evaluated per deal.
+    """
+    if isinstance(column.dtype, pd.CategoricalDtype):
+        per_status = np.asarray(predicate(pd.Series(column.cat.categories)), dtype=bool)
+        lookup = np.append(per_status, False)  # Code -1 (blank) picks the trailing False
+        return pd.Series(lookup[column.cat.codes.to_numpy()], index=column.index)
+    return column.notna() & predicate(column)
+
+
+def funnel_flags(frame):
+    """
+    Per deal, whether it reached each funnel stage (one boolean column per
+    FUNNEL_STAGES entry), so counts can be summed per group.
+    """
+    # Funnel Data - Redefined Status-based Logic
+    # C0-Ideation: Column J (C0 (Ideation/ Brainstorming Stage)) not blank
+    c0 = frame['C0 (Ideation/ Brainstorming Stage)'].notna()
+
+    # C1-Pitch: Column L (C1 (Pitch Stage)) in ('C2', 'Pitch Completed', 'Proposal Sent', 'Round 2 Needed')
+    pitch_statuses = ['C2', 'Pitch Completed', 'Proposal Sent', 'Round 2 Needed']
+    c1 = frame['C1 (Pitch Stage)'].isin(pitch_statuses)
+
+    # C2-Negotiation: Column O (C2 (Negotiation Stage)) not 'Lost' and not blank
+    c2 = _status_flag(
+        frame['C2 (Negotiation Stage)'],
+        lambda status: (status.str.strip() != 'Lost') & (status.str.strip() != '')
+    )
+
+    # C3-Closed: Column Q (C3 (Deal Closed Stage)) == 'Won'
+    c3 = _status_flag(frame['C3 (Deal Closed Stage)'], lambda status: status.str.strip() == 'Won')
+
+    return pd.DataFrame(dict(zip(FUNNEL_STAGES, [c0, c1, c2, c3])), index=frame.index).astype(bool)
+
+
+# Funnel stage counts (shared by the funnel chart, drill-down and API)
+def funnel_counts(frame):
+    funnel_data = pd.DataFrame({
+        'Stage': FUNNEL_STAGES,
+        'Count': funnel_flags(frame).sum().to_numpy()
+    })
+    return funnel_data
+
+
+def bottleneck_counts(frame):
+    """
+    Deals reaching C0, C1, C2 and C3 for the Executive Overview bottleneck insight
+    (a C3 status counts as Won even with stray spaces).
+    """
+    return (
+        frame['C0 (Ideation/ Brainstorming Stage)'].notna().sum(),
+        frame['C1 (Pitch Stage)'].notna().sum(),
+        frame['C2 (Negotiation Stage)'].notna().sum(),
+        _status_flag(frame['C3 (Deal Closed Stage)'], lambda status: status.str.strip() == 'Won').sum(),
+    )
+
+
+def conversion_flags(frame):
+    """
+    Per deal, whether it counts towards each stage of the Deep Dive conversion
+    rates (columns C0-C3: a status is present; C3 is 'Won').
+    """
+    return pd.DataFrame({
+        'C0': frame['C0 (Ideation/ Brainstorming Stage)'].notna(),
+        'C1': frame['C1 (Pitch Stage)'].notna(),
+        'C2': frame['C2 (Negotiation Stage)'].notna(),
+        'C3': frame['C3 (Deal Closed Stage)'] == 'Won',
+    }, index=frame.index).astype(bool)
+
+
+def stage_conversion(frame):
+    """
+    Deep Dive stage conversion: deals reaching each stage and the stage-to-stage
+    rates, with `conversion_data` laid out for the conversion bar chart.
+    """
+    # Calculate stage-wise deal counts
+    return conversion_from_counts(*conversion_flags(frame).sum())
+
+
+def conversion_from_counts(deals_with_c0, deals_with_c1, deals_with_c2, deals_with_c3):
+    """
+    stage_conversion from already-summed stage counts (e.g. one group of a groupby).
+    """
+    # Calculate conversion rates
+    c0_to_c1_rate = (deals_with_c1 / deals_with_c0 * 100) if deals_with_c0 > 0 else 0
+    c1_to_c2_rate = (deals_with_c2 / deals_with_c1 * 100) if deals_with_c1 > 0 else 0
+    c2_to_c3_rate = (deals_with_c3 / deals_with_c2 * 100) if deals_with_c2 > 0 else 0
+    overall_conv = (deals_with_c3 / deals_with_c0 * 100) if deals_with_c0 > 0 else 0
+
+    conversion_data = pd.DataFrame({
+        'Stage': ['Overall', 'C2→C3', 'C1→C2', 'C0→C1'],
+        'Conversion Rate': [overall_conv, c2_to_c3_rate, c1_to_c2_rate, c0_to_c1_rate],
+        'Color': ['#00BA7C', '#42A5F5', '#1976D2', '#1565C0']
+    })
+    return {
+        'deals_with_c0': deals_with_c0,
+        'deals_with_c1': deals_with_c1,
+        'deals_with_c2': deals_with_c2,
+        'deals_with_c3': deals_with_c3,
+        'overall_conv': overall_conv,
+        'conversion_data': conversion_data,
+    }
+
+
+def build_avp_perf(avp_totals):
+    """
+    Performance Matrix inputs per AVP (₹ Cr, conversion %, average deal size).
+    """
+    avp_perf = avp_totals.reset_index()
+
+    avp_perf['Total Pipeline (Cr)'] = (avp_perf['C0'] + avp_perf['C1'] + avp_perf['C2']) / 10000000
+    avp_perf['Closed Revenue (Cr)'] = avp_perf['C3'] / 10000000
+    avp_perf['Conversion Rate (%)'] = (avp_perf['C3'] / avp_perf['C0'] * 100).fillna(0)
+    avp_perf['Avg Deal Size (Cr)'] = (avp_perf['Closed Revenue (Cr)'] / avp_perf['Deal Count']).fillna(0)
+    return avp_perf
+
+
+def build_avp_metrics(avp_totals):
+    """
+    Per-AVP C0-C3 with Total Pipeline / Realized Value in ₹ Cr.
+    """
+    avp_metrics = avp_totals[cols_to_sum].reset_index()
+    avp_metrics['Total Pipeline'] = (avp_metrics['C0'] + avp_metrics['C1'] + avp_metrics['C2']) / 10000000
+    avp_metrics['Realized Value'] = avp_metrics['C3'] / 10000000
+    return avp_metrics
+
+
+# Simple linear regression function
+def simple_forecast(x, y, future_x):
+    # Calculate slope and intercept
+    x_mean = np.mean(x)
+    y_mean = np.mean(y)
+    slope = np.sum((x - x_mean) * (y - y_mean)) / np.sum((x - x_mean) ** 2)
+    intercept = y_mean - slope * x_mean
+    # Predict future values
+    return slope * future_x + intercept
+
+
+def forecast_trend(agg_df, periods=2):
+    """
+    Linear-trend forecast of Pipeline (C0) and Closed (C3), in ₹ Cr, for the
+    `periods` months following the last month in `agg_df`.
+    Returns (future_months, forecast_c0, forecast_c3).
+    """
+    if agg_df.empty:
+        return [], [], []
+    n_months = len(agg_df)
+    X = np.arange(n_months)
+    y_c0 = (agg_df['C0'] / 10000000).values
+    y_c3 = (agg_df['C3'] / 10000000).values
+
+    last_month = agg_df['Month_Sort'].iloc[-1]
+    future_months = [(last_month + i).strftime('%b %Y') for i in range(1, periods + 1)]
+    # A single month has no slope; the forecast is NaN (not plotted) rather than a warning
+    with np.errstate(divide='ignore', invalid='ignore'):
+        forecast_c0 = [simple_forecast(X, y_c0, n_months + i) for i in range(periods)]
+        forecast_c3 = [simple_forecast(X, y_c3, n_months + i) for i in range(periods)]
+    return future_months, forecast_c0, forecast_c3
@@ -0,0 +1,291 @@
+"""
+Pre-warms the per-filter caches (views.view_aggregates, views.deep_dive_figures
+and insights.evaluate_insights) after a data load.
+
+The most common filter combinations are computed in a small process pool and the
+results are seeded into the Streamlit cache from the parent, so the first visitor
+to each of those views gets a cache hit instead of paying for the groupbys,
+figures and insight rules. st.cache_data is per process, which is why the
+workers return bundles rather than writing to the cache themselves, and why
+every Streamlit process warms its own cache.
+
+Inside Streamlit the pool runs in a helper interpreter (`prewarm.py --pool`):
+Streamlit installs the app script as __main__, and spawned pool workers would
+re-execute app.py on startup.
+
+Memory: the helper and each of the PREWARM_WORKERS workers need the prepared
+frame for the length of the warm-up. When the app serves the memory-mapped
+snapshot (after a restart, or always with C0C3_SHARED_DATASET=1) they map the
+same file and share its pages; otherwise the frame would be pickled to each of
+them, up to PREWARM_WORKERS + 1 extra copies. So by default (C0C3_PREWARM=auto)
+the warm-up only runs on the mapped snapshot; C0C3_PREWARM=1 runs it on a
+private frame as well, C0C3_PREWARM=0 never.
+
+    python prewarm.py            # compute every common view once and print the report
+"""
+import logging
+import multiprocessing
+import os
+import pickle
+import subprocess
+import sys
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+import pandas as pd
+import streamlit as st
+from streamlit.runtime.scriptrunner import add_script_run_ctx
+
+from anomalies import compute_anomalies, detect_anomalies
+from insights import evaluate_insights, run_rules
+from pipeline import BASE_DATA_SNAPSHOT, month_dimension
+from snapshot import load_snapshot
+from views import compute_view, compute_deep_dive_figures, view_aggregates, deep_dive_figures
+
+logger = logging.getLogger("c0c3.prewarm")
+
+PREWARM_MODE = os.environ.get("C0C3_PREWARM", "auto")  # auto: mapped snapshot only | 1: always | 0: never
+if PREWARM_MODE not in ("auto", "1", "0"):
+    raise ValueError("C0C3_PREWARM must be auto, 1 or 0")
+PREWARM_WORKERS = max(1, min(4, (os.cpu_count() or 2) - 1))
+TYPES = ("VAS", "Retainer")  # Same order as the Type toggle; VAS is the landing view
+
+
+def common_filter_keys(df):
+    """
+    Filter keys worth warming, most visited first: each Type unfiltered (the
+    landing views), each Type for the latest month, then each Type x single SBU.
+    Keys use the same shape as app.py: (type, months tuple, SBUs tuple).
+    """
+    months = month_dimension(df)['Month_Year'].tolist()
+    sbus = sorted(df['SBUs'].dropna().unique().tolist())
+
+    keys = [(t, (), ()) for t in TYPES]
+    if months:
+        keys += [(t, (months[-1],), ()) for t in TYPES]
+    keys += [(t, (), (sbu,)) for t in TYPES for sbu in sbus]
+    return keys
+
+
+def frame_source(df):
+    """
+    What to hand the helper and workers for `df`: (snapshot name, data version)
+    when `df` is the memory-mapped snapshot, so they map it too, else the frame.
+    """
+    if df.attrs.get('mapped'):
+        return (BASE_DATA_SNAPSHOT, df.attrs.get('data_version', ''))
+    return df
+
+
+def load_source(source):
+    """
+    The frame for a frame_source() value. A snapshot that has since moved on to
+    another version is an error: its views would be seeded under the wrong key.
+    """
+    if isinstance(source, pd.DataFrame):
+        return source
+    name, version = source
+    df = load_snapshot(name)
+    if df is None or df.attrs.get('data_version') != version:
+        raise RuntimeError(f"snapshot {name} no longer holds version {version}")
+    return df
+
+
+# Worker-process state: the prepared frame (or the snapshot to map) and the
+# anomalies are sent once per worker by the pool initializer rather than
+# pickled with every task
+_worker = {}
+
+
+def _init_worker(source, anomalies):
+    _worker.update(df=load_source(source), anomalies=anomalies)
+
+
+def _compute(filter_key):
+    view = compute_view(_worker['df'], filter_key)
+    insights = run_rules(dict(view, anomalies=_worker['anomalies'], filter_key=filter_key))
+    return filter_key, (view, compute_deep_dive_figures(view), insights)
+
+
+def prewarm(df, keys=None, workers=PREWARM_WORKERS, seed=None, report=None, anomalies=None, source=None):
+    """
+    Computes the view, Deep Dive figures and insights for every key in a process
+    pool and calls seed(filter_key, (view, figures, insights)) in this process
+    as each one finishes. `anomalies` defaults to compute_anomalies(df) and
+    `source` (what the workers load, see frame_source) to `df` itself.
+
+    Returns a report dict (duration, coverage, failures); pass `report` to have
+    it filled in place so callers can watch progress.
+    """
+    keys = common_filter_keys(df) if keys is None else list(keys)
+    anomalies = compute_anomalies(df) if anomalies is None else anomalies
+    source = df if source is None else source
+    report = {} if report is None else report
+    report.update({
+        'status': 'running', 'workers': workers, 'total': len(keys),
+        'warmed': 0, 'failed': [], 'duration_s': None,
+    })
+    start = time.perf_counter()
+
+    # spawn: the app process runs threads, which fork does not mix well with
+    ctx = multiprocessing.get_context("spawn")
+    with ProcessPoolExecutor(max_workers=workers, mp_context=ctx,
+                             initializer=_init_worker, initargs=(source, anomalies)) as pool:
+        futures = {pool.submit(_compute, key): key for key in keys}
+        try:
+            for future in as_completed(futures):
+                key = futures[future]
+                try:
+                    _, bundle = future.result()
+                except Exception as e:
+                    logger.warning("pre-warm of %s failed: %s", key, e)
+                    report['failed'].append(key)
+                    continue
+                if seed is not None:
+                    seed(key, bundle)
+                report['warmed'] += 1
+        except BaseException:
+            # Seeding failed (e.g. the app went away): drop the queued work
+            pool.shutdown(wait=False, cancel_futures=True)
+            raise
+
+    report['duration_s'] = time.perf_counter() - start
+    report['status'] = 'done'
+    logger.info("pre-warmed %d/%d views in %.2fs (%d workers)",
+                report['warmed'], report['total'], report['duration_s'], workers)
+    return report
+
+
+def prewarm_in_subprocess(df, keys=None, workers=PREWARM_WORKERS, seed=None, report=None, anomalies=None):
+    """
+    prewarm() run by a helper interpreter whose __main__ is this module. The
+    frame_source(df), keys and anomalies go in over stdin; (filter_key, bundle)
+    pairs stream back over stdout and are passed to seed() here as they arrive.
+    """
+    keys = common_filter_keys(df) if keys is None else list(keys)
+    report = {} if report is None else report
+    report.update({
+        'status': 'running', 'workers': workers, 'total': len(keys),
+        'warmed': 0, 'failed': [], 'duration_s': None,
+    })
+    start = time.perf_counter()
+
+    proc = subprocess.Popen(
+        [sys.executable, os.path.abspath(__file__), "--pool", "--workers", str(workers)],
+        cwd=os.path.dirname(os.path.abspath(__file__)),
+        stdin=subprocess.PIPE, stdout=subprocess.PIPE,
+    )
+    with proc:
+        pickle.dump((frame_source(df), keys, anomalies), proc.stdin, protocol=pickle.HIGHEST_PROTOCOL)
+        proc.stdin.close()
+        while True:
+            try:
+                kind, key, payload = pickle.load(proc.stdout)
+            except EOFError:
+                break
+            if kind == 'failed':
+                report['failed'].append(key)
+                continue
+            if seed is not None:
+                seed(key, payload)
+            report['warmed'] += 1
+
+    if proc.returncode:
+        raise RuntimeError(f"pre-warm helper exited with {proc.returncode}")
+    report['duration_s'] = time.perf_counter() - start
+    report['status'] = 'done'
+    logger.info("pre-warmed %d/%d views in %.2fs (%d workers)",
+                report['warmed'], report['total'], report['duration_s'], workers)
+    return report
+
+
+def _serve_pool(workers):
+    # Helper side of prewarm_in_subprocess: stdout carries pickles only
+    out = sys.stdout.buffer
+    sys.stdout = sys.stderr
+    try:
+        source, keys, anomalies = pickle.load(sys.stdin.buffer)
+    except EOFError:
+        return  # The app process went away before handing over the frame
+    try:
+        df = load_source(source)
+    except RuntimeError as e:
+        raise SystemExit(f"pre-warm skipped: {e}")  # A newer version warms itself
+
+    def emit(key, bundle):
+        pickle.dump(('view', key, bundle), out, protocol=pickle.HIGHEST_PROTOCOL)
+        out.flush()
+
+    try:
+        result = prewarm(df, keys=keys, workers=workers, seed=emit, anomalies=anomalies, source=source)
+        for key in result['failed']:
+            pickle.dump(('failed', key, None), out)
+        out.flush()
+    except BrokenPipeError:
+        pass  # Nobody left to seed
+
+
+@st.cache_resource(max_entries=2)
+def start_prewarm(_df, data_version):
+    """
+    Starts pre-warming in a background thread once per data version and returns
+    its live report. Re-running the script with the same version is a no-op.
+    Skipped (see PREWARM_MODE) when it would copy a private frame to the workers.
+    """
+    report = {'status': 'starting', 'data_version': data_version}
+    if PREWARM_MODE == "0":
+        report['status'] = 'disabled'
+        return report
+    if PREWARM_MODE == "auto" and isinstance(frame_source(_df), pd.DataFrame):
+        report['status'] = 'skipped: not serving the mapped snapshot (set C0C3_PREWARM=1 to warm anyway)'
+        return report
+
+    def seed(filter_key, bundle, anomalies):
+        view, figures, insights = bundle
+        view = view_aggregates(_df, data_version, filter_key, _precomputed=view)
+        deep_dive_figures(view, data_version, filter_key, _precomputed=figures)
+        evaluate_insights(view, anomalies, data_version, filter_key, _precomputed=insights)
+
+    def run():
+        try:
+            # The same cached scores the app's insights read
+            anomalies = detect_anomalies(_df, data_version)
+            prewarm_in_subprocess(
+                _df, seed=lambda key, bundle: seed(key, bundle, anomalies),
+                report=report, anomalies=anomalies,
+            )
+        except Exception as e:
+            logger.warning("pre-warm aborted: %s", e)
+            report['status'] = f'error: {e}'
+
+    thread = threading.Thread(target=run, name="c0c3-prewarm", daemon=True)
+    add_script_run_ctx(thread)
+    thread.start()
+    return report
+
+
+if __name__ == "__main__":
+    import argparse
+
+    from pipeline import load_prepared_data
+
+    parser = argparse.ArgumentParser(description="Compute the common dashboard views and report timings.")
+    parser.add_argument("--workers", type=int, default=PREWARM_WORKERS)
+    parser.add_argument("--pool", action="store_true", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format="%(name)s %(message)s")
+    if args.pool:
+        _serve_pool(args.workers)
+        raise SystemExit(0)
+
+    df = load_prepared_data()
+    if df.empty:
+        raise SystemExit("no data loaded")
+
+    result = prewarm(df, workers=args.workers)
+    print(f"warmed {result['warmed']}/{result['total']} views in {result['duration_s']:.2f}s "
+          f"with {result['workers']} workers")
+    for key in result['failed']:
+        print(f"  failed: {key}")
@@ -0,0 +1,214 @@
+"""
+On-demand profiling of a single dashboard rerun.
+
+Opt-in per session: with C0C3_PROFILE_KEY set on the server, opening the app with
+?profile=<that key> shows a "Profile next rerun" button. The rerun after it (the
+next filter change, tab switch, ...) runs under RerunSampler, a sampling profiler
+that reads the script thread's stack every few milliseconds from a side thread,
+so it sees the same timings the user did. The result is shown as a flame graph
+plus a top-functions table and saved under PROFILE_DIR with the filter selection
+and data version. Without the key no sampler is ever started.
+"""
+import json
+import os
+import sys
+import threading
+import time
+from collections import Counter
+from datetime import datetime, timezone
+
+import pandas as pd
+
+PROFILE_KEY = os.environ.get("C0C3_PROFILE_KEY", "")
+PROFILE_DIR = os.environ.get(
+    "C0C3_PROFILE_DIR", os.path.join(os.path.dirname(os.path.abspath(__file__)), ".profiles")
+)
+SAMPLE_INTERVAL = 0.005   # Seconds between stack samples
+MAX_DURATION = 300        # Upper bound on sampling if no later rerun stops a leftover sampler
+MIN_FLAME_SHARE = 0.005   # Flame graph nodes under this share of samples are dropped
+
+
+def profiling_allowed(query_params):
+    """
+    True when the server has a profile key and this session's URL carries it.
+    """
+    return bool(PROFILE_KEY) and query_params.get("profile") == PROFILE_KEY
+
+
+class RerunSampler:
+    """
+    Samples the calling thread's Python stack until stop(). Stacks are kept from
+    the frame running `root_file` (app.py) down, as tuples of (function, file,
+    line) counted in `stacks`: the current line within `root_file`, the
+    function's first line elsewhere. `context` carries the rerun's data version,
+    filter key and tab once the app knows them, for finish_profile.
+    """
+
+    def __init__(self, root_file, interval=SAMPLE_INTERVAL, max_duration=MAX_DURATION):
+        self.root_file = os.path.abspath(root_file)
+        self.interval = interval
+        self.max_duration = max_duration
+        self.stacks = Counter()
+        self.duration_s = 0.0
+        self.context = {}
+        self._done = threading.Event()
+
+    def start(self):
+        self._thread_id = threading.get_ident()
+        self._started = self._last_sample = time.perf_counter()
+        self.started_at = datetime.now(timezone.utc).isoformat(timespec='seconds')
+        self._thread = threading.Thread(target=self._run, name="rerun-sampler", daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self, interrupted=False):
+        # An interrupted rerun is stopped from the next one: it ended at its last sample in root_file
+        self.duration_s = time.perf_counter() - self._started
+        self._done.set()
+        self._thread.join()  # No sample lands in `stacks` after this
+        if interrupted:
+            self.duration_s = self._last_sample - self._started
+        return self
+
+    def _run(self):
+        deadline = self._started + self.max_duration
+        while not self._done.wait(self.interval) and time.perf_counter() < deadline:
+            frame = sys._current_frames().get(self._thread_id)
+            stack = []
+            while frame is not None:
+                code = frame.f_code
+                # app.py is one long script, so its frames are told apart by the running line
+                line = frame.f_lineno if code.co_filename == self.root_file else code.co_firstlineno
+                stack.append((code.co_name, code.co_filename, line))
+                frame = frame.f_back
+            stack.reverse()
+            # Drop Streamlit's script runner frames above app.py
+            for i, (_, filename, _) in enumerate(stack):
+                if filename == self.root_file:
+                    self.stacks[tuple(stack[i:])] += 1
+                    self._last_sample = time.perf_counter()
+                    break
+
+    @property
+    def samples(self):
+        return sum(self.stacks.values())
+
+
+def frame_label(frame):
+    name, filename, line = frame
+    return f"{name} ({os.path.basename(filename)}:{line})"
+
+
+def top_functions(stacks, duration_s, limit=30):
+    """
+    Per function: samples where it was running (self) and on the stack (total),
+    as shares of all samples and estimated milliseconds of the rerun.
+    """
+    total = sum(stacks.values())
+    if not total:
+        return pd.DataFrame(columns=['Function', 'Self %', 'Total %', 'Self ms', 'Total ms'])
+    own, inclusive = Counter(), Counter()
+    for stack, count in stacks.items():
+        own[stack[-1]] += count
+        for frame in set(stack):  # Recursion counts once per sample
+            inclusive[frame] += count
+    table = pd.DataFrame({
+        'Function': [frame_label(f) for f in inclusive],
+        'Self': [own[f] for f in inclusive],
+        'Total': list(inclusive.values()),
+    })
+    ms_per_sample = duration_s * 1000 / total
+    table['Self %'] = table['Self'] / total * 100
+    table['Total %'] = table['Total'] / total * 100
+    table['Self ms'] = table['Self'] * ms_per_sample
+    table['Total ms'] = table['Total'] * ms_per_sample
+    table = table.sort_values(['Self', 'Total'], ascending=False).head(limit)
+    return table[['Function', 'Self %', 'Total %', 'Self ms', 'Total ms']].reset_index(drop=True)
+
+
+def flame_nodes(stacks, min_share=MIN_FLAME_SHARE):
+    """
+    The sampled call tree as (id, parent, label, samples) rows, each node's
+    samples inclusive of its children; nodes under `min_share` are dropped.
+    """
+    total = sum(stacks.values())
+    counts = Counter()
+    for stack, count in stacks.items():
+        path = ()
+        for frame in stack:
+            path += (frame,)
+            counts[path] += count
+    rows = []
+    for path, count in counts.items():
+        if count < total * min_share:
+            continue
+        rows.append({
+            'id': ";".join(frame_label(f) for f in path),
+            'parent': ";".join(frame_label(f) for f in path[:-1]),
+            'label': frame_label(path[-1]),
+            'samples': count,
+        })
+    return pd.DataFrame(rows, columns=['id', 'parent', 'label', 'samples'])
+
+
+def folded_stacks(stacks):
+    """
+    Brendan Gregg's folded format ("a;b;c <count>" per line), readable by
+    flamegraph.pl and speedscope.
+    """
+    return "\n".join(
+        f"{';'.join(frame_label(f) for f in stack)} {count}"
+        for stack, count in sorted(stacks.items(), key=lambda item: -item[1])
+    ) + "\n"
+
+
+def save_profile(sampler, data_version, filter_key, tab):
+    """
+    Writes the profile as <stem>.folded plus <stem>.json (metadata and top
+    functions) under PROFILE_DIR and returns the .json path.
+    """
+    selected_type, selected_months, selected_sbu = filter_key
+    stem = f"{datetime.now(timezone.utc):%Y%m%dT%H%M%SZ}-{data_version}-{os.getpid()}"
+    os.makedirs(PROFILE_DIR, exist_ok=True)
+    with open(os.path.join(PROFILE_DIR, f"{stem}.folded"), "w", encoding="utf-8") as f:
+        f.write(folded_stacks(sampler.stacks))
+    meta = {
+        'data_version': data_version,
+        'filters': {'type': selected_type, 'month': list(selected_months), 'sbu': list(selected_sbu)},
+        'tab': tab,
+        'started_at': sampler.started_at,
+        'duration_s': sampler.duration_s,
+        'samples': sampler.samples,
+        'interval_ms': sampler.interval * 1000,
+        'top_functions': top_functions(sampler.stacks, sampler.duration_s).to_dict(orient='records'),
+    }
+    path = os.path.join(PROFILE_DIR, f"{stem}.json")
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(meta, f, indent=2)
+    return path
+
+
+def finish_profile(sampler, interrupted=False):
+    """
+    Stops `sampler`, saves it and returns the summary the Profiling expander
+    shows. `interrupted` is for a sampler left running by a rerun that never
+    reached the end of the script (st.stop, a rerun request, an error).
+    """
+    sampler.stop(interrupted=interrupted)
+    version = sampler.context.get('version', 'unknown')
+    filter_key = sampler.context.get('filter_key', ('unknown', (), ()))
+    tab = sampler.context.get('tab', 'unknown')
+    try:
+        saved_to = save_profile(sampler, version, filter_key, tab)
+    except OSError as e:
+        saved_to = f"not saved ({e})"
+    return {
+        'tab': tab + (" (interrupted)" if interrupted else ""),
+        'filter_key': filter_key,
+        'version': version,
+        'duration_s': sampler.duration_s,
+        'samples': sampler.samples,
+        'top': top_functions(sampler.stacks, sampler.duration_s),
+        'nodes': flame_nodes(sampler.stacks),
+        'saved_to': saved_to,
+    }
@@ -0,0 +1,67 @@
+from typing import NamedTuple
+
+import pandas as pd
+import streamlit as st
+
+from pipeline import cols_to_sum
+
+
+class Ranking(NamedTuple):
+    top: pd.Series      # Top-k values, largest first
+    bottom: pd.Series   # Bottom-k values (excluding the top), smallest first
+    others: float       # Everything outside the top-k
+    total: float        # Sum over every member of the dimension
+
+
+def compute_dimension_totals(filtered_df, dimension):
+    """
+    Sums C0-C3 (plus the deal count) per value of `dimension`.
+    """
+    grouped = filtered_df.groupby(dimension, observed=True)
+    totals = grouped[cols_to_sum].sum()
+    totals['Deal Count'] = grouped.size()
+    return totals
+
+
+@st.cache_data(max_entries=256)
+def dimension_totals(_filtered_df, data_version, filter_key, dimension):
+    """
+    compute_dimension_totals for one filter state. One groupby per (data version,
+    filters, dimension), shared by every ranking and by checks such as stalled
+    opportunities that need the same per-brand totals.
+    """
+    return compute_dimension_totals(_filtered_df, dimension)
+
+
+def measure_values(totals, measure):
+    """
+    Resolves a measure to a Series: a column name, or a list of columns to add up
+    (e.g. ['C0', 'C1', 'C2'] for total pipeline).
+    """
+    if isinstance(measure, (list, tuple)):
+        return totals[list(measure)].sum(axis=1)
+    return totals[measure]
+
+
+def rank_values(values, k=5, bottom_k=0):
+    """
+    Partial selection over a Series: nlargest/nsmallest keep a k-sized heap instead
+    of sorting every member, so this stays cheap with tens of thousands of brands.
+    """
+    top = values.nlargest(k)
+    if bottom_k:
+        bottom = values.drop(top.index).nsmallest(bottom_k)
+    else:
+        bottom = values.iloc[:0]
+    total = values.sum()
+    return Ranking(top=top, bottom=bottom, others=total - top.sum(), total=total)
+
+
+@st.cache_data(max_entries=256)
+def rank_dimension(_filtered_df, data_version, filter_key, dimension, measure, k=5, bottom_k=0):
+    """
+    Top-k / bottom-k members of `dimension` by `measure`, with the "others" remainder.
+    Cached per filter state; reuses the cached dimension totals.
+    """
+    totals = dimension_totals(_filtered_df, data_version, filter_key, dimension)
+    return rank_values(measure_values(totals, measure), k=k, bottom_k=bottom_k)
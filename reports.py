@@ -0,0 +1,316 @@
+"""
+Pre-rendered static HTML reports of the default dashboard views.
+
+`python reports.py` renders the Executive Overview (pipeline table, funnel,
+insights) and Deep Dive figures for each Type across all SBUs and for every
+Type x SBU combination, one self-contained HTML file each (plotly.js embedded),
+in a process pool. Files go to REPORTS_DIR/<data version>/ with an index.html and
+manifest.json; latest.json is switched to the new version only once every file is written, so
+readers never see a half-finished set. Older versions are pruned.
+
+api.py serves them under /reports/, and when C0C3_REPORTS_URL points at that
+(e.g. http://host:8503/reports) the app links to the report matching the current
+filters, so peak-hour readers can skip a live rerun.
+
+    python reports.py --workers 4 [--plotlyjs inline|directory|cdn]
+"""
+import hashlib
+import html
+import json
+import logging
+import multiprocessing
+import os
+import re
+import shutil
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from datetime import datetime, timezone
+
+from plotly.offline import get_plotlyjs
+
+from anomalies import compute_anomalies
+from insights import run_rules
+from prewarm import TYPES, PREWARM_WORKERS
+from views import compute_view, compute_deep_dive_figures, pipeline_table_html
+
+logger = logging.getLogger("c0c3.reports")
+
+REPORTS_DIR = os.environ.get(
+    "C0C3_REPORTS_DIR", os.path.join(os.path.dirname(os.path.abspath(__file__)), ".reports")
+)
+REPORTS_URL = os.environ.get("C0C3_REPORTS_URL", "").rstrip("/")
+KEEP_VERSIONS = 3
+
+REPORT_CSS = """
+body { background: #000; color: #E7E9EA; margin: 0 auto; max-width: 1400px; padding: 24px;
+       font-family: -apple-system, BlinkMacSystemFont, Segoe UI, Roboto, Helvetica, Arial, sans-serif; }
+h1 { font-size: 1.4rem; margin: 0 0 4px; }
+h2 { font-size: 1.1rem; margin: 32px 0 12px; border-bottom: 1px solid #2F3336; padding-bottom: 6px; }
+.meta { color: #71767B; font-size: 0.8rem; }
+.chart-header { font-weight: 700; font-size: 0.95rem; margin: 16px 0 8px; }
+.row { display: flex; gap: 24px; flex-wrap: wrap; }
+.row > div { flex: 1 1 480px; min-width: 0; }
+.table-wrapper, .scroll-area { overflow-x: auto; }
+.pipeline-table { width: 100%; border-collapse: collapse; font-size: 0.85rem; }
+.pipeline-table th { text-align: right; color: #71767B; font-weight: 600; padding: 8px 12px; border-bottom: 1px solid #2F3336; }
+.pipeline-table td { text-align: right; padding: 8px 12px; border-bottom: 1px solid #16181C; white-space: nowrap; }
+.pipeline-table th:first-child, .pipeline-table td:first-child { text-align: left; }
+.pipeline-table .total-row td { font-weight: 700; border-top: 1px solid #2F3336; }
+.trend-up, .trend-down, .trend-neutral { font-size: 0.75rem; margin-left: 8px; font-weight: 700; display: inline-block; width: 45px; text-align: left; }
+.trend-up { color: #00BA7C; } .trend-down { color: #F4212E; } .trend-neutral { color: #71767B; }
+.trend-pct { font-size: 0.65rem; opacity: 0.7; margin-left: 2px; font-weight: 400; }
+.insight { background: #0B2A4A; border-radius: 8px; padding: 10px 14px; margin: 8px 0; font-size: 0.9rem; }
+a { color: #42A5F5; }
+"""
+
+
+def report_keys(df):
+    """
+    Filter keys to render: each Type across all SBUs, then each Type x SBU.
+    """
+    sbus = sorted(df['SBUs'].dropna().unique().tolist())
+    return [(t, (), ()) for t in TYPES] + [(t, (), (sbu,)) for t in TYPES for sbu in sbus]
+
+
+def report_filename(filter_key):
+    # Readable slug plus a short hash of the exact key, so SBUs differing only in
+    # case or punctuation do not share a file
+    selected_type, _, selected_sbu = filter_key
+    scope = selected_sbu[0] if selected_sbu else 'all'
+    slug = re.sub(r'[^a-z0-9]+', '-', f"{selected_type}-{scope}".lower()).strip('-')
+    digest = hashlib.sha1(json.dumps([selected_type, list(selected_sbu)]).encode()).hexdigest()[:8]
+    return f"{slug}-{digest}.html"
+
+
+def report_title(filter_key):
+    selected_type, _, selected_sbu = filter_key
+    return f"{selected_type} · {selected_sbu[0] if selected_sbu else 'All SBUs'}"
+
+
+def _markdown_bold(text):
+    # Insight messages use **bold** only
+    return re.sub(r'\*\*(.+?)\*\*', r'<strong>\1</strong>', html.escape(text))
+
+
+def render_report(df, filter_key, anomalies, meta, include_plotlyjs=True):
+    """
+    One filter view as an HTML page. `include_plotlyjs` is passed to plotly for the
+    first figure: True embeds it (standalone, ~4.5 MB per page), 'directory' loads
+    plotly.min.js from next to the page, 'cdn' links it.
+    """
+    view = compute_view(df, filter_key)
+    figures = compute_deep_dive_figures(view)
+    insights = run_rules(dict(view, anomalies=anomalies, filter_key=filter_key))
+
+    plotly_js = [include_plotlyjs]
+
+    def figure_html(fig):
+        if fig is None:
+            return '<p class="meta">No C3 revenue data available for this selection.</p>'
+        out = fig.to_html(full_html=False, include_plotlyjs=plotly_js[0], config={'displayModeBar': False})
+        plotly_js[0] = False  # plotly.js only once per page
+        return out
+
+    insight_html = "".join(
+        f'<div class="insight">{_markdown_bold(i.message)}</div>' for i in insights if i.message
+    ) or '<div class="insight">✅ Dashboard reflects stable performance. No critical anomalies detected.</div>'
+
+    title = html.escape(report_title(filter_key))
+    return f"""<!DOCTYPE html>
+<html lang="en"><head><meta charset="utf-8">
+<meta name="viewport" content="width=device-width, initial-scale=1">
+<title>Schbang C0-C3 · {title}</title>
+<style>{REPORT_CSS}</style></head>
+<body>
+<h1>Schbang C0-C3 · {title}</h1>
+<div class="meta">Data version {html.escape(meta['data_version'])}, fetched at {html.escape(meta['fetched_at'])};
+rendered at {html.escape(meta['generated_at'])}. <a href="index.html">All reports</a></div>
+
+<h2>Executive Overview</h2>
+<div class="row">
+  <div><div class="chart-header">C0-C3 Pipeline</div>{pipeline_table_html(view)}</div></div>
+  <div><div class="chart-header">Funnel Analysis</div>{figure_html(view['fig_funnel'])}</div>
+</div>
+<div class="chart-header">C0-C3 Insights</div>
+{insight_html}
+
+<h2>Deep Dive &amp; Insights</h2>
+<div class="row">
+  <div><div class="chart-header">Stage Conversion Rates</div>{figure_html(figures['fig_conv'])}</div>
+  <div><div class="chart-header">Revenue Shares By Brands</div>{figure_html(figures['fig_brands'])}</div>
+</div>
+<div class="chart-header">AVP Performance Matrix</div>
+{figure_html(figures['fig_perf'])}
+<div class="chart-header">Pipeline vs Closed Revenue Trends (with Forecast)</div>
+{figure_html(figures['fig_trend'])}
+</body></html>
+"""
+
+
+def render_index(meta, entries):
+    links = "".join(
+        f'<li><a href="{html.escape(e["file"])}">{html.escape(e["title"])}</a></li>' for e in entries
+    )
+    return f"""<!DOCTYPE html>
+<html lang="en"><head><meta charset="utf-8"><title>Schbang C0-C3 reports</title>
+<style>{REPORT_CSS}</style></head>
+<body><h1>Schbang C0-C3 reports</h1>
+<div class="meta">Data version {html.escape(meta['data_version'])}, fetched at {html.escape(meta['fetched_at'])};
+rendered at {html.escape(meta['generated_at'])}.</div>
+<ul>{links}</ul></body></html>
+"""
+
+
+# Worker-process state, sent once per worker by the pool initializer
+_worker = {}
+
+
+def _init_worker(df, anomalies, meta, out_dir, include_plotlyjs):
+    _worker.update(df=df, anomalies=anomalies, meta=meta, out_dir=out_dir, include_plotlyjs=include_plotlyjs)
+
+
+def _render(filter_key):
+    started = time.perf_counter()
+    page = render_report(
+        _worker['df'], filter_key, _worker['anomalies'], _worker['meta'], _worker['include_plotlyjs']
+    )
+    file_name = report_filename(filter_key)
+    with open(os.path.join(_worker['out_dir'], file_name), "w", encoding="utf-8") as f:
+        f.write(page)
+    return file_name, len(page.encode()), time.perf_counter() - started
+
+
+def _write_json(path, payload):
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(payload, f, indent=2)
+    os.replace(tmp_path, path)
+
+
+def latest_version():
+    """
+    The data version latest.json points at, or None before the first run.
+    """
+    try:
+        with open(os.path.join(REPORTS_DIR, "latest.json"), encoding="utf-8") as f:
+            return json.load(f).get('data_version')
+    except (OSError, ValueError):
+        return None
+
+
+def report_url(data_version, filter_key):
+    """
+    Public URL of the pre-rendered report for this data version and filter state,
+    or None (no C0C3_REPORTS_URL, a month filter or several SBUs, or not rendered).
+    """
+    selected_type, selected_months, selected_sbu = filter_key
+    if not REPORTS_URL or selected_months or len(selected_sbu) > 1:
+        return None
+    file_name = report_filename(filter_key)
+    if not os.path.exists(os.path.join(REPORTS_DIR, data_version, file_name)):
+        return None
+    return f"{REPORTS_URL}/{data_version}/{file_name}"
+
+
+def _prune(keep):
+    versions = [
+        d for d in os.listdir(REPORTS_DIR)
+        if os.path.isdir(os.path.join(REPORTS_DIR, d)) and not d.startswith('.')
+    ]
+    versions.sort(key=lambda d: os.path.getmtime(os.path.join(REPORTS_DIR, d)), reverse=True)
+    for old in versions[keep:]:
+        shutil.rmtree(os.path.join(REPORTS_DIR, old), ignore_errors=True)
+
+
+def write_reports(df, workers=PREWARM_WORKERS, include_plotlyjs=True, keep=KEEP_VERSIONS):
+    """
+    Renders every report_keys view for `df` into REPORTS_DIR/<data version>/ and
+    publishes it as the latest version. Returns a summary dict.
+    """
+    start = time.perf_counter()
+    version = df.attrs.get('data_version') or 'unversioned'
+    meta = {
+        'data_version': version,
+        'fetched_at': df.attrs.get('fetched_at') or 'unknown',
+        'generated_at': datetime.now(timezone.utc).isoformat(timespec='seconds'),
+    }
+    keys = report_keys(df)
+    anomalies = compute_anomalies(df)  # Once per version, shared by every report
+
+    os.makedirs(REPORTS_DIR, exist_ok=True)
+    staging = os.path.join(REPORTS_DIR, f".{version}.{os.getpid()}.tmp")
+    os.makedirs(staging)
+    entries, failed, total_bytes = [], [], 0
+    try:
+        if include_plotlyjs == 'directory':
+            with open(os.path.join(staging, "plotly.min.js"), "w", encoding="utf-8") as f:
+                f.write(get_plotlyjs())
+        ctx = multiprocessing.get_context("spawn")
+        with ProcessPoolExecutor(max_workers=workers, mp_context=ctx, initializer=_init_worker,
+                                 initargs=(df, anomalies, meta, staging, include_plotlyjs)) as pool:
+            futures = {pool.submit(_render, key): key for key in keys}
+            for future in as_completed(futures):
+                key = futures[future]
+                try:
+                    file_name, size, _ = future.result()
+                except Exception as e:
+                    logger.warning("report for %s failed: %s", key, e)
+                    failed.append(key)
+                    continue
+                total_bytes += size
+                entries.append({'file': file_name, 'title': report_title(key), 'type': key[0],
+                                'sbu': key[2][0] if key[2] else None})
+
+        # Same order as report_keys, whatever order the pool finished in
+        order = {report_filename(key): i for i, key in enumerate(keys)}
+        entries.sort(key=lambda e: order[e['file']])
+        with open(os.path.join(staging, "index.html"), "w", encoding="utf-8") as f:
+            f.write(render_index(meta, entries))
+        _write_json(os.path.join(staging, "manifest.json"), {**meta, 'reports': entries})
+
+        # Swap the finished set in, then point latest.json at it
+        final = os.path.join(REPORTS_DIR, version)
+        if os.path.exists(final):
+            shutil.rmtree(final)
+        os.replace(staging, final)
+    except BaseException:
+        shutil.rmtree(staging, ignore_errors=True)
+        raise
+    _write_json(os.path.join(REPORTS_DIR, "latest.json"), meta)
+    _prune(keep)
+
+    summary = {
+        'data_version': version, 'reports': len(entries), 'failed': failed, 'workers': workers,
+        'megabytes': total_bytes / 1024 ** 2, 'duration_s': time.perf_counter() - start,
+    }
+    logger.info("rendered %d reports for %s in %.2fs", len(entries), version, summary['duration_s'])
+    return summary
+
+
+if __name__ == "__main__":
+    import argparse
+
+    from pipeline import load_prepared_data, fetch_prepared_data
+
+    parser = argparse.ArgumentParser(description="Render static HTML reports for every Type x SBU view.")
+    parser.add_argument("--workers", type=int, default=PREWARM_WORKERS)
+    parser.add_argument("--plotlyjs", choices=["inline", "directory", "cdn"], default="inline",
+                        help="Embed plotly.js in every page (self-contained), load it from one shared "
+                             "file per version, or load it from the CDN")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format="%(name)s %(message)s")
+    df = fetch_prepared_data()  # Straight from the sheet: a batch run should not render a stale snapshot
+    if df.empty:
+        df = load_prepared_data()  # Sheet unavailable: fall back to the last good snapshot
+    else:
+        df.attrs['fetched_at'] = datetime.now(timezone.utc).isoformat(timespec='seconds')
+    if df.empty:
+        raise SystemExit("no data loaded")
+
+    result = write_reports(df, workers=args.workers,
+                           include_plotlyjs={"inline": True}.get(args.plotlyjs, args.plotlyjs))
+    print(f"rendered {result['reports']} reports ({result['megabytes']:.1f} MB) for version "
+          f"{result['data_version']} in {result['duration_s']:.2f}s with {result['workers']} workers")
+    for key in result['failed']:
+        print(f"  failed: {key}")
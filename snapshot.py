@@ -0,0 +1,303 @@
+"""
+Disk-persisted snapshots of the loaded datasets, so a restarted process can paint
+from the last good data without waiting on Google Sheets.
+
+Each dataset is written as one uncompressed Arrow IPC file per name under
+SNAPSHOT_DIR, stamped with its data_version and fetched-at time in the schema
+metadata. Writes go to a temp file and are swapped in with os.replace, so readers
+never see a half-written snapshot.
+
+Columns are laid out so a reader can wrap the memory-mapped buffers directly:
+fixed-width columns keep their numpy bytes (NaN/NaT included), categoricals are
+stored as their codes with the categories in the metadata, and Arrow-backed
+strings are stored as-is. load_snapshot therefore returns a frame whose data
+lives in the page cache, not on this process's heap, and whose arrays are
+read-only.
+
+With C0C3_SHARED_DATASET=1 every Streamlit process on the host serves that
+mapped file instead of its own fetched copy: one process publishes a new
+version (atomic os.replace) and the others re-map it, so extra processes add
+little resident memory and do not each hit the sheet.
+"""
+import json
+import logging
+import os
+import threading
+import time
+from datetime import datetime, timezone
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import streamlit as st
+from streamlit.runtime.scriptrunner import add_script_run_ctx
+
+try:
+    import fcntl
+except ImportError:  # Windows: no cross-process refresh lock
+    fcntl = None
+
+logger = logging.getLogger("c0c3.snapshot")
+
+SNAPSHOT_DIR = os.environ.get(
+    "C0C3_SNAPSHOT_DIR", os.path.join(os.path.dirname(os.path.abspath(__file__)), ".snapshots")
+)
+SHARED_DATASET = os.environ.get("C0C3_SHARED_DATASET", "0") == "1"
+REFRESH_SECONDS = 600  # Same cadence as the loaders' ttl
+METADATA_KEY = b"c0c3"
+
+
+def snapshot_path(name):
+    return os.path.join(SNAPSHOT_DIR, f"{name}.arrow")
+
+
+def _encode_column(series):
+    """
+    Arrow array plus a decode spec for one column (see module docstring).
+    """
+    dtype = series.dtype
+    if isinstance(dtype, pd.CategoricalDtype) and pd.api.types.is_string_dtype(dtype.categories):
+        spec = {'kind': 'category', 'categories': dtype.categories.tolist(), 'ordered': bool(dtype.ordered)}
+        return pa.array(series.array.codes, from_pandas=False), spec
+    if isinstance(dtype, pd.PeriodDtype):
+        return pa.array(series.array.asi8, from_pandas=False), {'kind': 'period', 'dtype': str(dtype)}
+    if isinstance(dtype, np.dtype) and dtype.kind in 'iufmM':
+        values = series.to_numpy()
+        if dtype.kind in 'mM':
+            values = values.view('int64')  # Keeps NaT as a value rather than an Arrow null
+        return pa.array(values, from_pandas=False), {'kind': 'numpy', 'dtype': str(dtype)}
+    if isinstance(dtype, pd.StringDtype) and dtype.storage == 'pyarrow':
+        return pa.array(series), {'kind': 'string', 'dtype': str(dtype)}
+    return pa.array(series, from_pandas=True), {'kind': 'arrow'}
+
+
+def _decode_column(column, spec):
+    # Wraps the mapped buffers without copying; 'arrow' columns are converted normally
+    if column.num_chunks != 1:
+        column = pa.chunked_array([column.combine_chunks()])
+    kind = spec['kind']
+    if kind == 'string':
+        return pd.array(column, dtype=pd.api.types.pandas_dtype(spec['dtype']))
+    if kind == 'arrow':
+        return column.to_pandas()
+    values = column.chunk(0).to_numpy(zero_copy_only=True)
+    if kind == 'category':
+        dtype = pd.CategoricalDtype(pd.Index(spec['categories'], dtype='str'), ordered=spec['ordered'])
+        return pd.Categorical.from_codes(values, dtype=dtype, validate=False)
+    if kind == 'period':
+        return pd.arrays.PeriodArray(values, dtype=pd.api.types.pandas_dtype(spec['dtype']))
+    return values.view(spec['dtype'])
+
+
+def save_snapshot(name, df):
+    """
+    Atomically writes `df` (with its data_version / fetched_at attrs) to disk.
+    """
+    os.makedirs(SNAPSHOT_DIR, exist_ok=True)
+    arrays, specs = [], {}
+    for col in df.columns:
+        array, specs[col] = _encode_column(df[col])
+        arrays.append(array)
+    stamp = {
+        'data_version': df.attrs.get('data_version', ''),
+        'fetched_at': df.attrs.get('fetched_at', ''),
+        'columns': specs,
+    }
+    table = pa.Table.from_arrays(arrays, names=[str(c) for c in df.columns])
+    table = table.replace_schema_metadata({METADATA_KEY: json.dumps(stamp).encode()})
+
+    path = snapshot_path(name)
+    tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+    with pa.OSFile(tmp_path, "wb") as sink:
+        with pa.ipc.new_file(sink, table.schema) as writer:
+            writer.write_table(table)
+    os.replace(tmp_path, path)
+    logger.info("snapshot %s: saved version %s (%d rows)", name, stamp['data_version'], len(df))
+
+
+def load_snapshot(name):
+    """
+    The last saved frame for `name`, memory-mapped and read-only, or None if there
+    is none (or it is unreadable). Processes that map the same file share its pages.
+    """
+    path = snapshot_path(name)
+    if not os.path.exists(path):
+        return None
+    try:
+        # Buffers keep the mapping alive after the file handle is closed, and a
+        # later os.replace does not disturb it (the old inode stays mapped)
+        with pa.memory_map(path, "r") as source:
+            table = pa.ipc.open_file(source).read_all()
+        stamp = json.loads((table.schema.metadata or {}).get(METADATA_KEY, b"{}"))
+        specs = stamp.get('columns')
+        if specs is None:
+            df = table.to_pandas()  # Written before the zero-copy layout
+        else:
+            df = pd.DataFrame(
+                {name: _decode_column(table.column(name), spec) for name, spec in specs.items()},
+                copy=False,
+            )
+    except (OSError, pa.ArrowInvalid, ValueError, KeyError) as e:
+        logger.warning("snapshot %s: unreadable (%s), ignoring", name, e)
+        return None
+    df.attrs['data_version'] = stamp.get('data_version', '')
+    df.attrs['fetched_at'] = stamp.get('fetched_at', '')
+    df.attrs['from_snapshot'] = True      # Cleared once a live process publishes it (shared mode)
+    df.attrs['mapped'] = specs is not None  # Columns wrap the file's pages (zero-copy layout)
+    logger.info("snapshot %s: loaded version %s fetched at %s", name, df.attrs['data_version'], df.attrs['fetched_at'])
+    return df
+
+
+def _file_stat(name):
+    try:
+        return os.stat(snapshot_path(name))
+    except FileNotFoundError:
+        return None
+
+
+def _file_id(file_stat):
+    # Changes whenever a new snapshot is swapped in (os.replace gives a new inode)
+    return None if file_stat is None else (file_stat.st_dev, file_stat.st_ino)
+
+
+def _persist(name, df):
+    # A failed write only costs the next cold start; keep serving
+    try:
+        save_snapshot(name, df)
+    except (OSError, pa.ArrowException) as e:
+        logger.warning("snapshot %s: could not be saved (%s)", name, e)
+
+
+@st.cache_resource
+def _datasets():
+    # Current frame per dataset name for this process, and its refresh bookkeeping
+    return {'lock': threading.Lock(), 'entries': {}}
+
+
+def _adopt(name, entry, df):
+    # Shared mode: publish, then serve the mapped file instead of the private copy
+    _persist(name, df)
+    mapped = load_snapshot(name)
+    if mapped is not None:
+        mapped.attrs.pop('from_snapshot', None)
+        df = mapped
+    with _datasets()['lock']:
+        entry.update(df=df, file_id=_file_id(_file_stat(name)))
+
+
+def _refresh_lock(name):
+    """
+    Non-blocking cross-process lock so only one process on the host refreshes a
+    shared dataset at a time. Returns the open lock file, or None if another
+    process holds it.
+    """
+    os.makedirs(SNAPSHOT_DIR, exist_ok=True)
+    handle = open(os.path.join(SNAPSHOT_DIR, f"{name}.lock"), "w")
+    if fcntl is not None:
+        try:
+            fcntl.flock(handle, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except OSError:
+            handle.close()
+            return None
+    return handle
+
+
+def _refresh(name, fetch, entry):
+    lock = _refresh_lock(name) if SHARED_DATASET else None
+    if SHARED_DATASET and lock is None:
+        with _datasets()['lock']:
+            entry['refreshing'] = False
+        return  # Another process is fetching; its publication will be re-mapped
+    try:
+        df = fetch()
+    except Exception as e:
+        logger.warning("snapshot %s: background refresh failed (%s)", name, e)
+        df = None
+    try:
+        with _datasets()['lock']:
+            entry['checked_at'] = time.monotonic()
+            entry['refreshing'] = False
+            if df is None or df.empty:
+                return  # Keep serving the last good frame
+            current = entry['df']
+            changed = current is None or df.attrs.get('data_version') != current.attrs.get('data_version')
+            if not SHARED_DATASET:
+                entry['df'] = df
+        if SHARED_DATASET:
+            if changed:
+                _adopt(name, entry, df)
+            else:
+                os.utime(snapshot_path(name))  # Tell the other processes it is fresh
+        elif changed:
+            _persist(name, df)
+    finally:
+        if lock is not None:
+            lock.close()
+
+
+def snapshot_backed(name, fetch, refresh_after=REFRESH_SECONDS):
+    """
+    Returns the current frame for `name`, where `fetch()` loads it from the source
+    (an empty frame means the fetch failed).
+
+    A cold process answers from the disk snapshot immediately and refreshes in a
+    background thread; later calls trigger a background refresh once the frame is
+    older than `refresh_after`. Only with no snapshot on disk (first run on a host)
+    does the caller wait on `fetch()`. Successful fetches are stamped with
+    fetched_at and persisted when their data_version changes.
+
+    In shared mode (C0C3_SHARED_DATASET=1) the frame is always the mapped snapshot:
+    a newer file published by another process is re-mapped, and the age check uses
+    the file's mtime so processes do not refresh in lockstep.
+    """
+    def stamped_fetch():
+        df = fetch()
+        if not df.empty:
+            df.attrs['fetched_at'] = datetime.now(timezone.utc).isoformat(timespec='seconds')
+        return df
+
+    state = _datasets()
+    with state['lock']:
+        entry = state['entries'].setdefault(
+            name, {'df': None, 'checked_at': None, 'refreshing': False, 'file_id': None}
+        )
+        file_stat = _file_stat(name)
+        file_id = _file_id(file_stat)
+        if entry['df'] is None or (SHARED_DATASET and file_id is not None and file_id != entry['file_id']):
+            mapped = load_snapshot(name)
+            if mapped is not None:
+                if entry['df'] is not None:
+                    mapped.attrs.pop('from_snapshot', None)  # Published by a live process
+                entry.update(df=mapped, file_id=file_id)
+
+        if entry['df'] is None:
+            start_refresh = False
+        else:
+            if SHARED_DATASET and file_stat is not None:
+                due = time.time() - file_stat.st_mtime >= refresh_after
+            else:
+                due = entry['checked_at'] is None or time.monotonic() - entry['checked_at'] >= refresh_after
+            start_refresh = due and not entry['refreshing']
+            if start_refresh:
+                entry['refreshing'] = True
+        current = entry['df']
+
+    if current is None:
+        # Nothing on disk yet: this request waits for the source
+        df = stamped_fetch()
+        if not df.empty:
+            if SHARED_DATASET:
+                _adopt(name, entry, df)
+                return entry['df']
+            with state['lock']:
+                entry.update(df=df, checked_at=time.monotonic())
+            _persist(name, df)
+        return df
+
+    if start_refresh:
+        thread = threading.Thread(
+            target=_refresh, args=(name, stamped_fetch, entry), name=f"c0c3-refresh-{name}", daemon=True
+        )
+        add_script_run_ctx(thread)
+        thread.start()
+    return current
@@ -0,0 +1,73 @@
+"""
+Time-series metrics over the monthly C0-C3 aggregates: month-over-month change,
+rolling sums and averages, year-over-year deltas and fiscal-year-to-date totals,
+used by the trend chart and the pipeline table.
+"""
+import numpy as np
+import pandas as pd
+
+from pipeline import cols_to_sum
+from fiscal import FY_START_MONTH
+
+ROLLING_WINDOWS = (3, 6)
+
+
+def _calendar_frame(agg_df):
+    """
+    C0-C3 on a gap-free monthly PeriodIndex (months with no deals are 0), so that
+    window and year-over-year offsets are calendar months rather than rows.
+    """
+    values = agg_df.set_index('Month_Sort')[cols_to_sum].astype('float64')
+    if values.empty:
+        return values
+    full_range = pd.period_range(values.index.min(), values.index.max(), freq='M')
+    return values.reindex(full_range, fill_value=0.0)
+
+
+def compute_time_series(agg_df):
+    """
+    MoM change, rolling 3/6-month sums and averages, YoY deltas and FY-to-date
+    cumulative totals for all of C0-C3 in one pass of window operations.
+
+    Returns a frame indexed by the months present in `agg_df` (same order), with
+    columns '<C> <metric>' such as 'C3 MoM %', 'C0 Roll3 Avg', 'C2 YoY Δ', 'C3 FYTD',
+    plus 'Pipeline Coverage' (C0 / C3).
+
+    MoM compares each month with the previous month *in view*, matching the
+    pipeline table rows; rolling/YoY/FYTD use calendar months.
+    """
+    in_view = agg_df.set_index('Month_Sort')[cols_to_sum].astype('float64')
+    calendar = _calendar_frame(agg_df)
+    parts = []
+
+    # MoM vs previous month in view; undefined when the previous value is 0
+    prev = in_view.shift(1)
+    mom = ((in_view - prev) / prev.where(prev > 0)) * 100
+    parts.append(mom.add_suffix(' MoM %'))
+
+    cal_parts = []
+    for window in ROLLING_WINDOWS:
+        rolling = calendar.rolling(window, min_periods=1)
+        cal_parts.append(rolling.sum().add_suffix(f' Roll{window} Sum'))
+        cal_parts.append(rolling.mean().add_suffix(f' Roll{window} Avg'))
+
+    last_year = calendar.shift(12)
+    cal_parts.append((calendar - last_year).add_suffix(' YoY Δ'))
+    cal_parts.append(((calendar - last_year) / last_year.where(last_year > 0) * 100).add_suffix(' YoY %'))
+
+    fiscal_year = (calendar.index - (FY_START_MONTH - 1)).year
+    cal_parts.append(calendar.groupby(fiscal_year).cumsum().add_suffix(' FYTD'))
+
+    parts.append(pd.concat(cal_parts, axis=1).reindex(in_view.index))
+
+    metrics = pd.concat(parts, axis=1)
+    metrics['Pipeline Coverage'] = (in_view['C0'] / in_view['C3']).fillna(0)
+    return metrics
+
+
+def trend_direction(pct, threshold=0.5):
+    """
+    Vectorized ▲/▼/- classification of MoM % changes (NaN counts as flat).
+    """
+    pct = np.asarray(pct, dtype='float64')
+    return np.where(pct > threshold, 'up', np.where(pct < -threshold, 'down', 'neutral'))
@@ -0,0 +1,75 @@
+"""
+Checks the anomaly scoring (anomalies.py) and the Anomalies insight on the
+synthetic stand-in data: a spike and a collapse to 0 are flagged, steady
+members are not, and the rule follows the SBU filter.
+
+    python tools/anomaly_check.py
+"""
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from sheet_standin import synthetic_base_data  # noqa: E402
+
+
+def check(name, condition, detail=""):
+    print(f"{'PASS' if condition else 'FAIL'}  {name}{'  ' + detail if detail else ''}")
+    return condition
+
+
+def main():
+    import pipeline
+    import utils
+    from anomalies import ALL_SBUS, compute_anomalies
+    from insights import RULES
+
+    df = pipeline._prepare_base_data(utils._parse_base_data(synthetic_base_data(20000)), 'anomaly-check')
+    months = list(df['Month_Year'].cat.categories)
+    results = []
+
+    found = compute_anomalies(df)
+    results.append(check("anomalies fire on the stand-in data", len(found) > 0, f"{len(found)} flagged"))
+    results.append(check("all-SBU series are scored", bool((found['SBUs'] == ALL_SBUS).any())))
+
+    # Collapse: AVP 03 / SBU 2 / VAS has no C2 at all in one month
+    member = (df['AVP'] == 'AVP 03') & (df['SBUs'] == 'SBU 2') & (df['Type'] == 'VAS')
+    collapsed = df.copy()
+    collapsed.loc[member & (collapsed['Month_Year'] == months[6]), 'C2'] = 0
+    hits = compute_anomalies(collapsed)
+    hit = hits[
+        (hits['Member'] == 'AVP 03') & (hits['SBUs'] == 'SBU 2') & (hits['Measure'] == 'C2')
+        & (hits['Month_Year'] == months[6])
+    ]
+    results.append(check(
+        "a month collapsing to 0 is flagged", len(hit) == 1 and hit['Value'].iloc[0] == 0 and hit['Robust Z'].iloc[0] < 0,
+        f"z {hit['Robust Z'].iloc[0]:+.1f}" if len(hit) else "",
+    ))
+
+    # Spike: +₹60 Cr of C0 on one deal of the same member
+    spiked = df.copy()
+    row = spiked.index[member & (spiked['Month_Year'] == months[3])][0]
+    spiked.loc[row, 'C0'] += 600000000
+    hits = compute_anomalies(spiked)
+    hit = hits[
+        (hits['Member'] == 'AVP 03') & (hits['SBUs'] == 'SBU 2') & (hits['Measure'] == 'C0')
+        & (hits['Month_Year'] == months[3])
+    ]
+    results.append(check("a spike is flagged", len(hit) == 1 and hit['Robust Z'].iloc[0] > 0))
+
+    # The rule reads the SBU's own series when filtered, the all-SBU series otherwise
+    rule = next(r for r in RULES if r.name == 'Anomalies')
+    filtered = rule.evaluate({'anomalies': hits, 'filter_key': ('VAS', (), ('SBU 2',))}, **rule.params)
+    unfiltered = rule.evaluate({'anomalies': hits, 'filter_key': ('VAS', (), ())}, **rule.params)
+    other_sbus = [s for s in df['SBUs'].cat.categories if s != 'SBU 2']
+    results.append(check(
+        "SBU filter keeps other SBUs out", filtered is not None and not any(f"({s})" in filtered for s in other_sbus),
+    ))
+    results.append(check("unfiltered view shows all-SBU series", unfiltered is not None and "(SBU" not in unfiltered))
+
+    print(f"\n{sum(results)}/{len(results)} checks passed")
+    sys.exit(0 if all(results) else 1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,115 @@
+"""
+Load test for the JSON API (api.py).
+
+Drives N concurrent clients against a running API, mixing endpoints and filter
+selections, and replays ETags as If-None-Match like a well-behaved client would.
+
+    python api.py --port 8503 &
+    python tools/api_loadtest.py --url http://127.0.0.1:8503 --clients 20 --duration 30
+"""
+import argparse
+import json
+import random
+import threading
+import time
+from urllib.error import HTTPError
+from urllib.parse import urlencode
+from urllib.request import Request, urlopen
+
+ENDPOINTS = ['pipeline', 'funnel', 'avp', 'brands', 'forecast']
+
+
+def percentile(values, pct):
+    if not values:
+        return 0.0
+    values = sorted(values)
+    idx = min(len(values) - 1, int(round(pct / 100 * (len(values) - 1))))
+    return values[idx]
+
+
+def discover_filters(base_url):
+    """
+    Builds a pool of filter selections from the API itself (months / SBUs that
+    actually occur in the pipeline data).
+    """
+    selections = [{'type': t} for t in ('VAS', 'Retainer')]
+    with urlopen(f"{base_url}/api/pipeline?type=VAS", timeout=30) as resp:
+        months = [row['Month_Year'] for row in json.load(resp)['rows']]
+    for month in months:
+        selections.append({'type': 'VAS', 'month': month})
+        selections.append({'type': 'Retainer', 'month': month})
+    return selections
+
+
+def client_loop(base_url, selections, deadline, conditional, results, lock):
+    etags = {}
+    latencies, statuses = [], {}
+    while time.perf_counter() < deadline:
+        endpoint = random.choice(ENDPOINTS)
+        query = urlencode(random.choice(selections), doseq=True)
+        url = f"{base_url}/api/{endpoint}?{query}"
+        headers = {'If-None-Match': etags[url]} if conditional and url in etags else {}
+
+        start = time.perf_counter()
+        try:
+            with urlopen(Request(url, headers=headers), timeout=30) as resp:
+                resp.read()
+                status = resp.status
+                if resp.headers.get('ETag'):
+                    etags[url] = resp.headers['ETag']
+        except HTTPError as e:
+            status = e.code
+        except OSError:
+            status = 'error'
+        latencies.append(time.perf_counter() - start)
+        statuses[status] = statuses.get(status, 0) + 1
+
+    with lock:
+        results['latencies'].extend(latencies)
+        for status, count in statuses.items():
+            results['statuses'][status] = results['statuses'].get(status, 0) + count
+
+
+def run(base_url, clients, duration, conditional=True):
+    selections = discover_filters(base_url)
+    results = {'latencies': [], 'statuses': {}}
+    lock = threading.Lock()
+    deadline = time.perf_counter() + duration
+    threads = [
+        threading.Thread(target=client_loop, args=(base_url, selections, deadline, conditional, results, lock))
+        for _ in range(clients)
+    ]
+    started = time.perf_counter()
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    elapsed = time.perf_counter() - started
+
+    latencies = results['latencies']
+    return {
+        'clients': clients,
+        'requests': len(latencies),
+        'throughput_rps': len(latencies) / elapsed if elapsed else 0.0,
+        'p50_ms': percentile(latencies, 50) * 1000,
+        'p95_ms': percentile(latencies, 95) * 1000,
+        'p99_ms': percentile(latencies, 99) * 1000,
+        'statuses': {str(k): v for k, v in sorted(results['statuses'].items(), key=str)},
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Load test for the C0-C3 JSON API")
+    parser.add_argument("--url", default="http://127.0.0.1:8503")
+    parser.add_argument("--clients", type=int, nargs='+', default=[1, 5, 20])
+    parser.add_argument("--duration", type=float, default=20, help="Seconds per concurrency level")
+    parser.add_argument("--no-conditional", action="store_true", help="Do not send If-None-Match")
+    args = parser.parse_args()
+
+    for clients in args.clients:
+        report = run(args.url.rstrip('/'), clients, args.duration, conditional=not args.no_conditional)
+        print(json.dumps(report))
+
+
+if __name__ == "__main__":
+    main()
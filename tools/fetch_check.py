@@ -0,0 +1,88 @@
+"""
+Exercises the sheet fetch client (fetch.py) against the local stand-in server
+with injected latency and failures.
+
+    python tools/fetch_check.py
+"""
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from fetch import SheetClient, CircuitBreaker, FetchError, CircuitOpenError  # noqa: E402
+from sheet_standin import serve  # noqa: E402
+
+
+def check(name, condition, detail=""):
+    print(f"{'PASS' if condition else 'FAIL'}  {name}{'  ' + detail if detail else ''}")
+    return condition
+
+
+def main():
+    random.seed(1)
+    server, state, base_url = serve(rows=2000)
+    url = f"{base_url}/spreadsheets/d/x/gviz/tq?tqx=out:csv&sheet=Base_Data"
+    results = []
+
+    # Healthy: gzip negotiated, body decoded, validators honoured
+    client = SheetClient()
+    resp = client.get(url)
+    results.append(check("healthy fetch", resp.status_code == 200 and resp.content.startswith(b"Brand Name")))
+    results.append(check("gzip negotiated", resp.headers.get("Content-Encoding") == "gzip"))
+    resp = client.get(url, headers={"If-None-Match": resp.headers["ETag"]})
+    results.append(check("conditional GET -> 304", resp.status_code == 304))
+
+    # Slow responses: read timeout + bounded retries instead of hanging
+    state.latency = 1.0
+    client = SheetClient(read_timeout=0.3, max_attempts=2, backoff_base=0.05)
+    start = time.perf_counter()
+    try:
+        client.get(url)
+        timed_out = False
+    except FetchError:
+        timed_out = True
+    elapsed = time.perf_counter() - start
+    results.append(check("read timeout bounded", timed_out and elapsed < 2.0, f"{elapsed:.2f}s"))
+    state.latency = 0.0
+
+    # Flaky endpoint: retries with jitter get through
+    state.fail_rate = 0.3
+    client = SheetClient(max_attempts=6, backoff_base=0.01)
+    ok = sum(1 for _ in range(10) if client.get(url).status_code == 200)
+    results.append(check("retries survive 30% failures", ok == 10, f"{ok}/10"))
+
+    # Hard down: breaker opens and later calls fail fast without a request
+    state.fail_rate = 1.0
+    client = SheetClient(max_attempts=2, backoff_base=0.01, breaker=CircuitBreaker(threshold=2, cooldown=60))
+    for _ in range(2):
+        try:
+            client.get(url)
+        except FetchError:
+            pass
+    before = state.requests
+    try:
+        client.get(url)
+        fast_fail = False
+    except CircuitOpenError:
+        fast_fail = True
+    results.append(check("circuit breaker fails fast", fast_fail and state.requests == before))
+    state.fail_rate = 0.0
+
+    # Loader fallback: a failed refresh serves the last good snapshot
+    os.environ["C0C3_SHEETS_BASE_URL"] = base_url
+    import utils
+    utils.SHEETS_BASE_URL = base_url
+    first = utils.fetch_sheet(utils.sheet_url("Base_Data"), utils._parse_base_data)
+    state.fail_rate = 1.0
+    second = utils.fetch_sheet(utils.sheet_url("Base_Data"), utils._parse_base_data)
+    results.append(check("falls back to last good snapshot", second is first and utils.data_version(second) != ""))
+
+    server.shutdown()
+    print(f"\n{sum(results)}/{len(results)} checks passed")
+    sys.exit(0 if all(results) else 1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,65 @@
+"""
+Checks the fiscal rollups (fiscal.py) and /api/fiscal payloads against the
+synthetic stand-in data for every level x SBU selection.
+
+    python tools/fiscal_check.py
+"""
+import json
+import os
+import sys
+import tempfile
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from sheet_standin import serve, synthetic_base_data  # noqa: E402
+
+
+def check(name, condition, detail=""):
+    print(f"{'PASS' if condition else 'FAIL'}  {name}{'  ' + detail if detail else ''}")
+    return condition
+
+
+def main():
+    server, state, base_url = serve(rows=20000)
+    # Read at import time: point the loaders at the stand-in and a throwaway snapshot dir
+    os.environ["C0C3_SHEETS_BASE_URL"] = base_url
+    os.environ["C0C3_SNAPSHOT_DIR"] = tempfile.mkdtemp()
+
+    import api
+    import pipeline
+    import utils
+    from fiscal import LEVELS, compute_fiscal_rollups, fiscal_view
+
+    df = pipeline._prepare_base_data(utils._parse_base_data(synthetic_base_data(20000)), 'fiscal-check')
+    rollups = compute_fiscal_rollups(df)
+    selected_type = df['Type'].dropna().iloc[0]
+    sbus = sorted(df['SBUs'].dropna().unique())
+    selections = {'all': (), 'one SBU': tuple(sbus[:1]), 'two SBUs': tuple(sbus[:2]), 'unknown SBU': ('No such SBU',)}
+    results = []
+
+    for level in LEVELS:
+        for label, selected_sbu in selections.items():
+            name = f"{level} x {label}"
+            try:
+                view = fiscal_view(rollups, level, selected_type, selected_sbu)
+                payload = api.build_payload('fiscal', df, (selected_type, (), selected_sbu), {'level': [level]})
+                json.dumps(payload, default=api._json_default)
+            except Exception as e:  # noqa: BLE001 - any failure is a failed check
+                results.append(check(name, False, repr(e)))
+                continue
+            filtered = pipeline.apply_filters(df, selected_type, (), selected_sbu)
+            ok = (
+                abs(view['C3'].sum() - filtered['C3'].sum()) < 1e-6 * max(1.0, filtered['C3'].sum())
+                and view['Deals'].sum() == len(filtered)
+                and bool(view['Coverage'].between(0, 1).all())
+                and len(payload['rows']) == len(view)
+            )
+            results.append(check(name, ok, f"{len(view)} periods"))
+
+    server.shutdown()
+    print(f"\n{sum(results)}/{len(results)} checks passed")
+    sys.exit(0 if all(results) else 1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,297 @@
+"""
+Concurrent-session load test for the Streamlit dashboard. Linux only (/proc).
+
+Starts the sheet stand-in (synthetic Base_Data / Revenue_Summary) and a real
+`streamlit run app.py` pointed at it, then drives N concurrent sessions over the
+same websocket protocol the browser uses. Each session clicks through a
+realistic script (tab switches, Type toggle, month / SBU filters, AVP drill-down)
+with think time between actions, and every rerun is timed until the server
+reports the script finished.
+
+For each concurrency level it reports rerun latency p50/p95/p99, reruns per
+second, script errors, server CPU (100 = one core, app process plus children)
+and peak RSS.
+
+    python tools/session_loadtest.py --sessions 1 5 10 20 --duration 30
+"""
+import argparse
+import asyncio
+import json
+import os
+import random
+import socket
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import urllib.request
+
+import websockets
+from streamlit.proto.BackMsg_pb2 import BackMsg
+from streamlit.proto.ForwardMsg_pb2 import ForwardMsg
+
+from api_loadtest import percentile
+from sheet_standin import serve
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+CLOCK_TICKS = os.sysconf("SC_CLK_TCK")
+PAGE_SIZE = os.sysconf("SC_PAGE_SIZE")
+
+WIDGET_VALUE_FIELDS = {'radio': 'string_value', 'selectbox': 'string_value', 'multiselect': 'string_array_value'}
+
+
+# --- server process metrics ---
+
+def process_tree(pid):
+    pids, stack = [], [pid]
+    while stack:
+        current = stack.pop()
+        pids.append(current)
+        try:
+            for task in os.listdir(f"/proc/{current}/task"):
+                with open(f"/proc/{current}/task/{task}/children") as f:
+                    stack.extend(int(c) for c in f.read().split())
+        except FileNotFoundError:
+            continue
+    return pids
+
+
+def tree_usage(pid):
+    """
+    (CPU seconds, resident bytes) summed over `pid` and its descendants (the
+    pre-warm helper and its pool workers count against the server).
+    """
+    cpu, rss = 0.0, 0
+    for p in process_tree(pid):
+        try:
+            with open(f"/proc/{p}/stat") as f:
+                fields = f.read().rsplit(")", 1)[1].split()
+            with open(f"/proc/{p}/statm") as f:
+                rss += int(f.read().split()[1]) * PAGE_SIZE
+        except FileNotFoundError:
+            continue
+        cpu += (int(fields[11]) + int(fields[12])) / CLOCK_TICKS  # utime + stime
+    return cpu, rss
+
+
+class UsageSampler(threading.Thread):
+    def __init__(self, pid, interval=0.25):
+        super().__init__(daemon=True)
+        self.pid, self.interval = pid, interval
+        self.peak_rss = 0
+        self._stop_event = threading.Event()
+
+    def run(self):
+        while not self._stop_event.is_set():
+            self.peak_rss = max(self.peak_rss, tree_usage(self.pid)[1])
+            self._stop_event.wait(self.interval)
+
+    def stop(self):
+        self._stop_event.set()
+        self.join()
+
+
+# --- one dashboard session ---
+
+class Session:
+    """
+    A browser tab as far as the server can tell: one websocket, the widget values
+    it has set (by label), and the widgets the last rerun rendered.
+    """
+
+    def __init__(self, ws_url, rng):
+        self.ws_url = ws_url
+        self.rng = rng
+        self.values = {}    # widget label -> value
+        self.widgets = {}   # widget label -> (kind, id, options) from the last rerun
+        self.ws = None
+
+    async def connect(self):
+        self.ws = await websockets.connect(self.ws_url, subprotocols=["streamlit"], max_size=None)
+
+    async def close(self):
+        if self.ws is not None:
+            await self.ws.close()
+
+    async def rerun(self):
+        """
+        Sends the current widget state and waits for script_finished.
+        Returns (seconds, script raised an exception).
+        """
+        msg = BackMsg()
+        msg.rerun_script.query_string = ""
+        for label, value in self.values.items():
+            if label not in self.widgets:
+                continue
+            kind, widget_id, _ = self.widgets[label]
+            state = msg.rerun_script.widget_states.widgets.add()
+            state.id = widget_id
+            if kind == 'multiselect':
+                state.string_array_value.data.extend(value)
+            else:
+                setattr(state, WIDGET_VALUE_FIELDS[kind], value)
+
+        started = time.perf_counter()
+        await self.ws.send(msg.SerializeToString())
+        widgets, failed = {}, False
+        while True:
+            fwd = ForwardMsg()
+            fwd.ParseFromString(await self.ws.recv())
+            kind = fwd.WhichOneof('type')
+            if kind == 'delta' and fwd.delta.WhichOneof('type') == 'new_element':
+                element = fwd.delta.new_element
+                element_type = element.WhichOneof('type')
+                if element_type == 'exception':
+                    failed = True
+                elif element_type in WIDGET_VALUE_FIELDS:
+                    widget = getattr(element, element_type)
+                    widgets[widget.label] = (element_type, widget.id, list(widget.options))
+            elif kind == 'script_finished':
+                break
+        self.widgets = widgets
+        return time.perf_counter() - started, failed
+
+    def options(self, label):
+        return self.widgets.get(label, (None, None, []))[2]
+
+    def next_action(self):
+        """
+        Picks the next interaction, weighted roughly like real use: mostly filter
+        changes and tab switches, occasionally a drill-down or a reset.
+        """
+        on_deep_dive = self.values.get('Nav') == 'Deep Dive & Insights'
+        actions = ['tab'] * 3 + ['type'] * 2 + ['month'] * 3 + ['sbu'] * 2 + ['reset']
+        if on_deep_dive and self.options('AVP'):
+            actions += ['drill'] * 2
+        action = self.rng.choice(actions)
+
+        if action == 'tab':
+            self.values['Nav'] = 'Executive Overview' if on_deep_dive else 'Deep Dive & Insights'
+        elif action == 'type':
+            self.values['Type'] = 'Retainer' if self.values.get('Type') == 'VAS' else 'VAS'
+        elif action == 'month':
+            months = self.options('Month')
+            self.values['Month'] = self.rng.sample(months, k=min(len(months), self.rng.choice([0, 1, 1, 2])))
+        elif action == 'sbu':
+            sbus = self.options('SBUs')
+            self.values['SBUs'] = self.rng.sample(sbus, k=min(len(sbus), self.rng.choice([0, 1, 1, 2])))
+        elif action == 'drill':
+            self.values['AVP'] = self.rng.choice(self.options('AVP'))
+        else:
+            for label in ('Month', 'SBUs', 'AVP'):
+                self.values.pop(label, None)
+        return action
+
+
+async def run_session(ws_url, deadline, think, seed, results):
+    session = Session(ws_url, random.Random(seed))
+    await session.connect()
+    try:
+        elapsed, failed = await session.rerun()  # First paint
+        results['first_paint'].append(elapsed)
+        results['errors'] += failed
+        while time.monotonic() < deadline:
+            await asyncio.sleep(session.rng.uniform(*think))
+            action = session.next_action()
+            results['actions'][action] = results['actions'].get(action, 0) + 1
+            elapsed, failed = await session.rerun()
+            results['latencies'].append(elapsed)
+            results['errors'] += failed
+    finally:
+        await session.close()
+
+
+def run_level(ws_url, server_pid, sessions, duration, think, seed=0):
+    results = {'latencies': [], 'first_paint': [], 'errors': 0, 'actions': {}}
+    sampler = UsageSampler(server_pid)
+    cpu_before, _ = tree_usage(server_pid)
+    sampler.start()
+    started = time.monotonic()
+
+    async def main():
+        deadline = time.monotonic() + duration
+        await asyncio.gather(*(
+            run_session(ws_url, deadline, think, seed * 1000 + i, results) for i in range(sessions)
+        ))
+
+    asyncio.run(main())
+    elapsed = time.monotonic() - started
+    sampler.stop()
+    cpu_after, _ = tree_usage(server_pid)
+
+    latencies = results['latencies']
+    return {
+        'sessions': sessions,
+        'reruns': len(latencies),
+        'throughput_rps': len(latencies) / elapsed if elapsed else 0.0,
+        'p50_ms': percentile(latencies, 50) * 1000,
+        'p95_ms': percentile(latencies, 95) * 1000,
+        'p99_ms': percentile(latencies, 99) * 1000,
+        'first_paint_p95_ms': percentile(results['first_paint'], 95) * 1000,
+        'errors': results['errors'],
+        'cpu_pct': (cpu_after - cpu_before) / elapsed * 100 if elapsed else 0.0,
+        'peak_rss_mb': sampler.peak_rss / 1024 ** 2,
+        'actions': dict(sorted(results['actions'].items())),
+    }
+
+
+# --- server lifecycle ---
+
+def free_port():
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def start_app(sheets_url, snapshot_dir, extra_env=None):
+    port = free_port()
+    env = dict(os.environ, C0C3_SHEETS_BASE_URL=sheets_url, C0C3_SNAPSHOT_DIR=snapshot_dir, **(extra_env or {}))
+    proc = subprocess.Popen(
+        [sys.executable, "-m", "streamlit", "run", "app.py",
+         "--server.headless", "true", "--server.port", str(port),
+         "--server.fileWatcherType", "none", "--browser.gatherUsageStats", "false"],
+        cwd=REPO_ROOT, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+    )
+    for _ in range(150):
+        try:
+            with urllib.request.urlopen(f"http://127.0.0.1:{port}/_stcore/health", timeout=1):
+                return proc, f"ws://127.0.0.1:{port}/_stcore/stream"
+        except OSError:
+            if proc.poll() is not None:
+                raise RuntimeError("streamlit exited during startup")
+            time.sleep(0.2)
+    proc.terminate()
+    raise RuntimeError("streamlit did not become healthy")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Concurrent-session load test for the Streamlit app")
+    parser.add_argument("--sessions", type=int, nargs='+', default=[1, 5, 10, 20])
+    parser.add_argument("--duration", type=float, default=30, help="Seconds per concurrency level")
+    parser.add_argument("--think", type=float, nargs=2, default=[0.5, 2.0], metavar=("MIN", "MAX"),
+                        help="Think time between actions, seconds")
+    parser.add_argument("--rows", type=int, default=5000, help="Stand-in Base_Data rows")
+    parser.add_argument("--brands", type=int, default=500)
+    parser.add_argument("--avps", type=int, default=12)
+    parser.add_argument("--latency", type=float, default=0.0, help="Stand-in response latency, seconds")
+    parser.add_argument("--env", action="append", default=[], metavar="KEY=VALUE",
+                        help="Extra environment for the app, e.g. C0C3_PREWARM=0")
+    args = parser.parse_args()
+
+    sheet_server, _, sheets_url = serve(rows=args.rows, brands=args.brands, avps=args.avps, latency=args.latency)
+    extra_env = dict(item.split("=", 1) for item in args.env)
+    with tempfile.TemporaryDirectory() as snapshot_dir:
+        app, ws_url = start_app(sheets_url, snapshot_dir, extra_env)
+        try:
+            for level, sessions in enumerate(args.sessions):
+                report = run_level(ws_url, app.pid, sessions, args.duration, tuple(args.think), seed=level)
+                print(json.dumps({k: round(v, 1) if isinstance(v, float) else v for k, v in report.items()}), flush=True)
+        finally:
+            app.terminate()
+            app.wait(timeout=30)
+            sheet_server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
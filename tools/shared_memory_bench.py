@@ -0,0 +1,123 @@
+"""
+Memory benchmark for the shared (memory-mapped) dataset mode. Linux only (/proc).
+
+Builds a prepared Base_Data frame from the synthetic stand-in data, publishes it
+as a snapshot, then starts N worker processes that each hold the dataset either
+as a private in-memory copy (the default per-process behaviour) or as the
+read-only memory-mapped snapshot (C0C3_SHARED_DATASET=1). Every worker touches
+all columns, and with all N alive the parent reads their smaps_rollup: total PSS
+(shared pages split between the processes that map them) and per-process
+private dirty memory.
+
+    python tools/shared_memory_bench.py --rows 1000000 --processes 1 2 4 8
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+import tempfile
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, REPO_ROOT)
+
+
+def smaps_rollup(pid="self"):
+    # kB values from /proc/<pid>/smaps_rollup
+    fields = {}
+    with open(f"/proc/{pid}/smaps_rollup") as f:
+        for line in f:
+            parts = line.split()
+            if len(parts) == 3 and parts[2] == "kB":
+                fields[parts[0].rstrip(":")] = int(parts[1])
+    return fields
+
+
+def child(mode):
+    import gc
+
+    import pandas as pd
+
+    from snapshot import load_snapshot
+
+    df = load_snapshot("base_data")
+    if mode == "private":
+        df = df.copy(deep=True)  # What a process holding its own fetched frame pays
+        gc.collect()
+
+    # Touch every column so all pages are resident
+    for col in df.columns:
+        values = df[col]
+        if isinstance(values.dtype, pd.CategoricalDtype):
+            values.cat.codes.sum()
+        elif values.dtype.kind in "iuf":
+            values.sum()
+        else:
+            values.nunique()
+
+    print("ready", flush=True)
+    sys.stdin.readline()  # Stay alive until the parent has measured everyone
+
+
+def measure(mode, processes, snapshot_dir):
+    env = dict(os.environ, C0C3_SNAPSHOT_DIR=snapshot_dir)
+    procs = [
+        subprocess.Popen(
+            [sys.executable, os.path.abspath(__file__), "--child", mode],
+            cwd=REPO_ROOT, env=env, stdin=subprocess.PIPE, stdout=subprocess.PIPE,
+            stderr=subprocess.DEVNULL, text=True,
+        )
+        for _ in range(processes)
+    ]
+    try:
+        for proc in procs:
+            if proc.stdout.readline().strip() != "ready":
+                raise RuntimeError(f"{mode} worker failed to load the snapshot")
+        rollups = [smaps_rollup(proc.pid) for proc in procs]
+    finally:
+        for proc in procs:
+            proc.stdin.close()
+            proc.wait()
+    return {
+        "mode": mode,
+        "processes": processes,
+        "total_pss_mb": sum(r["Pss"] for r in rollups) / 1024,
+        "mean_rss_mb": sum(r["Rss"] for r in rollups) / len(rollups) / 1024,
+        "mean_private_dirty_mb": sum(r["Private_Dirty"] for r in rollups) / len(rollups) / 1024,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Private vs memory-mapped dataset memory across processes")
+    parser.add_argument("--rows", type=int, default=1_000_000)
+    parser.add_argument("--processes", type=int, nargs="+", default=[1, 2, 4, 8])
+    parser.add_argument("--child", choices=["private", "shared"], help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        child(args.child)
+        return
+
+    with tempfile.TemporaryDirectory() as snapshot_dir:
+        os.environ["C0C3_SNAPSHOT_DIR"] = snapshot_dir
+        sys.path.insert(0, os.path.join(REPO_ROOT, "tools"))
+        from sheet_standin import synthetic_base_data
+        import snapshot
+        from pipeline import _prepare_base_data
+        from utils import _parse_base_data
+
+        snapshot.SNAPSHOT_DIR = snapshot_dir
+        raw = _parse_base_data(synthetic_base_data(rows=args.rows))
+        df = _prepare_base_data(raw, "bench")
+        snapshot.save_snapshot("base_data", df)
+        size_mb = os.path.getsize(snapshot.snapshot_path("base_data")) / 1024 ** 2
+        print(json.dumps({"rows": len(df), "snapshot_mb": round(size_mb, 1)}))
+
+        for processes in args.processes:
+            for mode in ("private", "shared"):
+                report = measure(mode, processes, snapshot_dir)
+                print(json.dumps({k: round(v, 1) if isinstance(v, float) else v for k, v in report.items()}))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,161 @@
+"""
+Local stand-in for the Google Sheets gviz CSV export.
+
+Serves synthetic Base_Data / Revenue_Summary CSV on the same path shape as
+docs.google.com, with optional latency and failure injection, gzip and
+ETag / 304 support. Point the app at it with:
+
+    python tools/sheet_standin.py --port 8600 --rows 20000 &
+    C0C3_SHEETS_BASE_URL=http://127.0.0.1:8600 streamlit run app.py
+"""
+import argparse
+import gzip
+import hashlib
+import random
+import threading
+import time
+from datetime import date
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlparse, parse_qs
+
+STAGE_C1 = ['C2', 'Pitch Completed', 'Proposal Sent', 'Round 2 Needed', 'Dropped', '']
+STAGE_C2 = ['In Negotiation', 'Commercials Shared', 'Lost', '']
+STAGE_C3 = ['Won', 'Lost', '']
+
+
+def synthetic_base_data(rows=5000, brands=500, avps=12, sbus=6, months=12, seed=7):
+    """
+    Builds a Base_Data-shaped CSV (bytes) with the columns the dashboard reads.
+    """
+    rng = random.Random(seed)
+    header = [
+        'Brand Name', 'Type', 'SBUs', 'AVP', 'Month222',
+        'C0 (Ideation/ Brainstorming Stage)', 'C1 (Pitch Stage)',
+        'C2 (Negotiation Stage)', 'C3 (Deal Closed Stage)',
+        'C0', 'C1', 'C2', 'C3',
+    ]
+    lines = [','.join(header)]
+    start = date(2025, 10, 1)
+    for _ in range(rows):
+        m = rng.randrange(months)
+        month = date(start.year + (start.month - 1 + m) // 12, (start.month - 1 + m) % 12 + 1, 1)
+        c0 = rng.randrange(5, 500) * 100000
+        c1_status = rng.choice(STAGE_C1)
+        c2_status = rng.choice(STAGE_C2) if c1_status else ''
+        c3_status = rng.choice(STAGE_C3) if c2_status else ''
+        c1 = c0 if c1_status else 0
+        c2 = c1 if c2_status and c2_status != 'Lost' else 0
+        c3 = c2 if c3_status == 'Won' else 0
+        lines.append(','.join(str(v) for v in [
+            f"Brand {rng.randrange(brands):05d}",
+            rng.choice(['VAS', 'Retainer']),
+            f"SBU {rng.randrange(sbus) + 1}",
+            f"AVP {rng.randrange(avps) + 1:02d}",
+            month.strftime('%d/%m/%Y'),
+            'Idea', c1_status, c2_status, c3_status,
+            c0, c1, c2, c3,
+        ]))
+    return ('\n'.join(lines) + '\n').encode()
+
+
+def synthetic_revenue_summary():
+    return (
+        "Metric,H1 Target,H1 Achieved,H2 Target,H2 Achieved,FY Target,FY Achieved\n"
+        "Revenue,500000000,420000000,600000000,150000000,1100000000,570000000\n"
+    ).encode()
+
+
+class StandinState:
+    def __init__(self, sheets, latency=0.0, fail_rate=0.0, fail_status=503, seed=0):
+        self.rng = random.Random(seed)
+        self.latency = latency
+        self.fail_rate = fail_rate
+        self.fail_status = fail_status
+        self.requests = 0
+        self._lock = threading.Lock()
+        self.set_sheets(sheets)
+
+    def set_sheets(self, sheets):
+        with self._lock:
+            self.sheets = {
+                name: (body, '"' + hashlib.sha1(body).hexdigest()[:16] + '"')
+                for name, body in sheets.items()
+            }
+
+
+def make_handler(state):
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"  # keep-alive, like the real endpoint
+
+        def do_GET(self):
+            with state._lock:
+                state.requests += 1
+            if state.latency:
+                time.sleep(state.latency)
+            if state.fail_rate and state.rng.random() < state.fail_rate:
+                return self._send(state.fail_status, b"simulated failure")
+
+            sheet = parse_qs(urlparse(self.path).query).get('sheet', [''])[0]
+            if sheet not in state.sheets:
+                return self._send(404, b"unknown sheet")
+            body, etag = state.sheets[sheet]
+            if self.headers.get('If-None-Match') == etag:
+                return self._send(304, b"", {'ETag': etag})
+
+            headers = {'ETag': etag, 'Content-Type': 'text/csv'}
+            if 'gzip' in self.headers.get('Accept-Encoding', ''):
+                body = gzip.compress(body, compresslevel=1)
+                headers['Content-Encoding'] = 'gzip'
+            self._send(200, body, headers)
+
+        def _send(self, status, body, headers=None):
+            self.send_response(status)
+            for key, value in (headers or {}).items():
+                self.send_header(key, value)
+            self.send_header('Content-Length', str(len(body)))
+            self.end_headers()
+            try:
+                self.wfile.write(body)
+            except (BrokenPipeError, ConnectionResetError):
+                pass  # Client gave up (e.g. its read timeout fired first)
+
+        def log_message(self, format, *args):
+            pass
+
+    return Handler
+
+
+def serve(port=0, rows=5000, latency=0.0, fail_rate=0.0, **data_kwargs):
+    """
+    Starts the stand-in on a background thread. Returns (server, state, base_url);
+    call server.shutdown() when done.
+    """
+    state = StandinState(
+        {'Base_Data': synthetic_base_data(rows, **data_kwargs), 'Revenue_Summary': synthetic_revenue_summary()},
+        latency=latency, fail_rate=fail_rate,
+    )
+    server = ThreadingHTTPServer(('127.0.0.1', port), make_handler(state))
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, state, f"http://127.0.0.1:{server.server_address[1]}"
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Local stand-in for the Google Sheets CSV export")
+    parser.add_argument("--port", type=int, default=8600)
+    parser.add_argument("--rows", type=int, default=5000)
+    parser.add_argument("--brands", type=int, default=500)
+    parser.add_argument("--latency", type=float, default=0.0, help="Seconds added to every response")
+    parser.add_argument("--fail-rate", type=float, default=0.0, help="Fraction of requests answered with 503")
+    args = parser.parse_args()
+
+    server, state, base_url = serve(args.port, args.rows, args.latency, args.fail_rate, brands=args.brands)
+    print(f"Serving synthetic sheets on {base_url} (set C0C3_SHEETS_BASE_URL={base_url})")
+    try:
+        while True:
+            time.sleep(3600)
+    except KeyboardInterrupt:
+        server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,121 @@
+"""
+Cold-start benchmark for the Streamlit app.
+
+Runs app.py once per tab in a fresh Python process (streamlit.testing AppTest,
+so no browser), with `-X importtime`, and reports time-to-first-paint for that
+tab plus the packages that dominate import time. Data comes from the local
+sheet stand-in unless --url points at a real sheet export; pre-warming is
+switched off so it does not compete for the CPU.
+
+    python tools/startup_bench.py --repeat 5
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import time
+from collections import defaultdict
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+APP_PATH = os.path.join(REPO_ROOT, "app.py")
+TABS = ["Executive Overview", "Deep Dive & Insights", "Compare"]
+
+
+def import_profile(stderr, top=10):
+    """
+    Sums `-X importtime` self times per top-level package, largest first (ms).
+    """
+    totals = defaultdict(int)
+    for line in stderr.splitlines():
+        if not line.startswith("import time:"):
+            continue
+        parts = line.split("|")
+        if len(parts) != 3 or not parts[0].split(":")[1].strip().isdigit():
+            continue  # header row
+        package = parts[2].strip().split(".")[0]
+        totals[package] += int(parts[0].split(":")[1])
+    ranked = sorted(totals.items(), key=lambda kv: kv[1], reverse=True)[:top]
+    return [(name, us / 1000) for name, us in ranked]
+
+
+def child(tab):
+    # Runs in the cold process: everything below is measured from scratch
+    started = time.perf_counter()
+    from streamlit.testing.v1 import AppTest
+    imported = time.perf_counter()
+
+    at = AppTest.from_file(APP_PATH, default_timeout=120)
+    at.session_state["nav_tab"] = tab
+    at.run()
+    painted = time.perf_counter()
+
+    print(json.dumps({
+        "tab": tab,
+        "streamlit_import_ms": (imported - started) * 1000,
+        "first_paint_ms": (painted - imported) * 1000,
+        "exceptions": [str(e.value) for e in at.exception],
+        "plotly_express_loaded": "plotly.express" in sys.modules,
+    }))
+
+
+def run_cold(tab, base_url):
+    env = dict(os.environ, C0C3_PREWARM="0")
+    if base_url:
+        env["C0C3_SHEETS_BASE_URL"] = base_url
+    proc = subprocess.run(
+        [sys.executable, "-X", "importtime", os.path.abspath(__file__), "--child", tab],
+        cwd=REPO_ROOT, env=env, capture_output=True, text=True, timeout=300,
+    )
+    lines = [l for l in proc.stdout.splitlines() if l.startswith("{")]
+    if proc.returncode or not lines:
+        raise RuntimeError(f"cold run for {tab!r} failed:\n{proc.stderr[-2000:]}")
+    return json.loads(lines[-1]), proc.stderr
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Cold-start time-to-first-paint per tab")
+    parser.add_argument("--repeat", type=int, default=3, help="Cold processes per tab")
+    parser.add_argument("--url", default=None, help="Sheets base URL (default: local stand-in)")
+    parser.add_argument("--rows", type=int, default=3000, help="Stand-in Base_Data rows")
+    parser.add_argument("--top", type=int, default=10, help="Packages to list from -X importtime")
+    parser.add_argument("--child", metavar="TAB", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        child(args.child)
+        return
+
+    server = None
+    base_url = args.url
+    if base_url is None:
+        from sheet_standin import serve
+        server, _, base_url = serve(rows=args.rows)
+
+    try:
+        for tab in TABS:
+            runs, profile = [], None
+            for i in range(args.repeat):
+                result, stderr = run_cold(tab, base_url)
+                if result["exceptions"]:
+                    raise RuntimeError(f"{tab!r} raised: {result['exceptions']}")
+                runs.append(result)
+                if profile is None:
+                    profile = import_profile(stderr, top=args.top)
+            print(json.dumps({
+                "tab": tab,
+                "runs": len(runs),
+                "first_paint_ms_median": statistics.median(r["first_paint_ms"] for r in runs),
+                "first_paint_ms_min": min(r["first_paint_ms"] for r in runs),
+                "streamlit_import_ms_median": statistics.median(r["streamlit_import_ms"] for r in runs),
+                "plotly_express_loaded": runs[0]["plotly_express_loaded"],
+                "top_imports_ms": [[name, round(ms, 1)] for name, ms in profile],
+            }))
+    finally:
+        if server is not None:
+            server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
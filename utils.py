@@ -1,51 +1,235 @@
+import hashlib
+import io
+import json
+import logging
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import NamedTuple
+
 import pandas as pd
 import streamlit as st
+from streamlit.runtime.scriptrunner import add_script_run_ctx, get_script_run_ctx
+
+from fetch import SheetClient, FetchError
+from snapshot import snapshot_backed
+
+logger = logging.getLogger("c0c3.loader")
+
 
-@st.cache_data(ttl=600)  # Cache for 10 minutes to support "real-time" but not spam
-def load_google_sheet_data():
+def data_version(df):
     """
-    Fetches data from the specified public Google Sheet.
-    Returns a dataframe with relevant columns, including parsed dates.
+    Returns the version token stamped on a loaded frame (fetch_sheet, or the merge
+    of several sources in pipeline.py).
+    Downstream caches key on it instead of hashing the whole frame.
     """
-    # Public URL for CSV export of the 'Base_Data' sheet
+    return df.attrs.get('data_version', '')
+
+
+# Overridable so the app can be pointed at a local stand-in (tools/sheet_standin.py)
+SHEETS_BASE_URL = os.environ.get("C0C3_SHEETS_BASE_URL", "https://docs.google.com")
+
+
+DEFAULT_SHEET_ID = "1MbhJ_8sI1-j7N6vb_tJfipoDx7mTQ1SpQSEVoJw1bp4"
+
+
+def sheet_url(sheet_name, sheet_id=DEFAULT_SHEET_ID):
     # Using the gviz API is often more reliable for export than the /export format for public sheets
-    sheet_id = "1MbhJ_8sI1-j7N6vb_tJfipoDx7mTQ1SpQSEVoJw1bp4"
-    sheet_name = "Base_Data" # Ensure this matches exactly
-    url = f"https://docs.google.com/spreadsheets/d/{sheet_id}/gviz/tq?tqx=out:csv&sheet={sheet_name}"
-    
+    return f"{SHEETS_BASE_URL}/spreadsheets/d/{sheet_id}/gviz/tq?tqx=out:csv&sheet={sheet_name}"
+
+
+class Source(NamedTuple):
+    name: str                       # Shown in the Source column of the prepared data
+    sheet_id: str = DEFAULT_SHEET_ID
+    sheet: str = "Base_Data"        # Tab with the Base_Data schema
+    ttl: int = 600                  # Seconds before the sheet is asked again
+
+
+def configured_sources():
+    """
+    Base_Data sources from C0C3_SOURCES: a JSON list of objects with Source's
+    fields (only "name" is required), or the path of a file holding one. Without
+    it the dashboard reads the single main sheet.
+    """
+    spec = os.environ.get("C0C3_SOURCES", "").strip()
+    if not spec:
+        return [Source("Main")]
+    if not spec.startswith('['):
+        with open(spec, encoding="utf-8") as f:
+            spec = f.read()
+    sources = [Source(**entry) for entry in json.loads(spec)]
+    if not sources:
+        raise ValueError("C0C3_SOURCES: at least one source is required")
+    if len({s.name for s in sources}) != len(sources):
+        raise ValueError("C0C3_SOURCES: source names must be unique")
+    return sources
+
+
+SOURCES = configured_sources()
+
+
+@st.cache_resource
+def get_sheet_client(source_name=None):
+    # One pooled keep-alive session and circuit breaker per process and source,
+    # so one failing sheet does not trip the breaker for the others
+    return SheetClient()
+
+
+@st.cache_resource
+def _sheet_states():
+    # Last fetch per URL: HTTP validators, content digest and the parsed frame.
+    # Lives outside st.cache_data so an unchanged refresh can hand back the same frame.
+    return {'lock': threading.Lock(), 'sheets': {}}
+
+
+def fetch_sheet(url, parse, max_age=0, client=None):
+    """
+    Fetches a CSV export and parses it with `parse(raw_bytes)`, skipping the parse
+    when the content has not changed since the last fetch. Within `max_age`
+    seconds of the last successful check the last frame is returned without a
+    request.
+
+    Sends If-None-Match / If-Modified-Since when the endpoint gave us validators,
+    and otherwise compares a SHA-256 of the raw bytes. An unchanged refresh returns
+    the previously parsed frame with its existing data_version, so everything keyed
+    on the version (preparation, aggregates, figures) stays warm.
+
+    If the fetch fails (timeouts, retries exhausted, circuit open) the last good
+    snapshot is served instead; FetchError is raised only when there is none.
+    """
+    states = _sheet_states()
+    with states['lock']:
+        state = states['sheets'].get(url)
+    if state and time.monotonic() - state['checked_at'] < max_age:
+        return state['df']
+
+    headers = {}
+    if state and state.get('etag'):
+        headers['If-None-Match'] = state['etag']
+    if state and state.get('last_modified'):
+        headers['If-Modified-Since'] = state['last_modified']
+
+    start = time.perf_counter()
     try:
-        # Read CSV
-        df = pd.read_csv(url)
-        
-        # Ensure we have the columns we expect to filter on
-        # BH -> Month222
-        # BF -> AVP
-        # B -> Brand Name
-        # C -> Type
-        
-        # Parse Dates
-        if 'Month222' in df.columns:
-            # Format appears to be dd/mm/yyyy based on 01/09/2025
-            df['Month222'] = pd.to_datetime(df['Month222'], dayfirst=True, errors='coerce')
-        
-        return df
-        
-    except Exception as e:
-        st.error(f"Error loading data from Google Sheet: {e}")
-        return pd.DataFrame()
+        resp = (client or get_sheet_client()).get(url, headers=headers)
+    except FetchError as e:
+        if state:
+            logger.warning("refresh %s: failed (%s), serving last good snapshot %s", url, e, state['df'].attrs.get('data_version'))
+            return state['df']
+        raise
+    if resp.status_code == 304 and state:
+        with states['lock']:
+            state['checked_at'] = time.monotonic()
+        logger.info("refresh %s: unchanged (304) in %.0f ms", url, (time.perf_counter() - start) * 1000)
+        return state['df']
+    raw = resp.content
+    etag, last_modified = resp.headers.get('ETag'), resp.headers.get('Last-Modified')
+    fetch_ms = (time.perf_counter() - start) * 1000
 
-@st.cache_data(ttl=600)
-def load_revenue_summary_data():
+    digest = hashlib.sha256(raw).hexdigest()
+    if state and state['digest'] == digest:
+        with states['lock']:
+            state.update(etag=etag, last_modified=last_modified, checked_at=time.monotonic())
+        logger.info("refresh %s: unchanged (same content) in %.0f ms", url, fetch_ms)
+        return state['df']
+
+    parse_start = time.perf_counter()
+    df = parse(raw)
+    df.attrs['data_version'] = digest[:16]
+    with states['lock']:
+        states['sheets'][url] = {
+            'etag': etag, 'last_modified': last_modified, 'digest': digest, 'df': df,
+            'checked_at': time.monotonic(),
+        }
+    logger.info(
+        "refresh %s: changed (version %s) in %.0f ms (fetch %.0f ms, parse %.0f ms)",
+        url, digest[:16], (time.perf_counter() - start) * 1000, fetch_ms,
+        (time.perf_counter() - parse_start) * 1000,
+    )
+    return df
+
+
+def _parse_base_data(raw):
+    # Read CSV
+    df = pd.read_csv(io.BytesIO(raw))
+
+    # Ensure we have the columns we expect to filter on
+    # BH -> Month222
+    # BF -> AVP
+    # B -> Brand Name
+    # C -> Type
+
+    # Parse Dates
+    if 'Month222' in df.columns:
+        # Format appears to be dd/mm/yyyy based on 01/09/2025
+        df['Month222'] = pd.to_datetime(df['Month222'], dayfirst=True, errors='coerce')
+    return df
+
+
+def load_source(source, client=None):
     """
-    Fetches data from the 'Revenue_Summary' sheet.
+    One Base_Data source's raw frame, stamped with its own data_version. The
+    sheet is asked again only after the source's TTL and re-parsed only when its
+    content changed (fetch_sheet).
+    """
+    return fetch_sheet(
+        sheet_url(source.sheet, source.sheet_id), _parse_base_data,
+        max_age=source.ttl, client=client or get_sheet_client(source.name),
+    )
+
+
+def cached_base_sources(sources=None):
     """
-    sheet_id = "1MbhJ_8sI1-j7N6vb_tJfipoDx7mTQ1SpQSEVoJw1bp4"
-    sheet_name = "Revenue_Summary"
-    url = f"https://docs.google.com/spreadsheets/d/{sheet_id}/gviz/tq?tqx=out:csv&sheet={sheet_name}"
-    
+    The raw frames this process already holds from earlier fetches, as {source
+    name: frame}, without asking any sheet (sources never fetched here, e.g. in
+    shared-dataset mode, are left out). For diagnostics.
+    """
+    sources = SOURCES if sources is None else sources
+    states = _sheet_states()
+    with states['lock']:
+        held = {url: state['df'] for url, state in states['sheets'].items()}
+    urls = {s.name: sheet_url(s.sheet, s.sheet_id) for s in sources}
+    return {name: held[url] for name, url in urls.items() if url in held}
+
+
+def load_base_sources(sources=None):
+    """
+    Fetches every Base_Data source (default: SOURCES) in parallel threads and
+    returns {source name: raw frame} in configuration order. A source that fails
+    with no last good copy is logged and left out, so the others still load.
+    """
+    sources = SOURCES if sources is None else sources
+    # Clients and the Streamlit context are resolved here, not in the pool threads
+    clients = [get_sheet_client(s.name) for s in sources]
+    ctx = get_script_run_ctx()
+    with ThreadPoolExecutor(
+        max_workers=min(8, len(sources)), thread_name_prefix="c0c3-source",
+        initializer=lambda: add_script_run_ctx(threading.current_thread(), ctx),
+    ) as pool:
+        futures = [pool.submit(load_source, s, c) for s, c in zip(sources, clients)]
+    frames = {}
+    for source, future in zip(sources, futures):
+        try:
+            frames[source.name] = future.result()
+        except Exception as e:
+            logger.warning("source %s: load failed (%s)", source.name, e)
+    return frames
+
+
+@st.cache_data(ttl=600)
+def _fetch_revenue_summary_data():
+    url = sheet_url("Revenue_Summary")
+
     try:
-        df = pd.read_csv(url)
-        return df
+        return fetch_sheet(url, lambda raw: pd.read_csv(io.BytesIO(raw)))
     except Exception as e:
         st.error(f"Error loading Revenue Summary: {e}")
         return pd.DataFrame()
+
+
+def load_revenue_summary_data():
+    """
+    Fetches data from the 'Revenue_Summary' sheet (snapshot-backed, see snapshot.py).
+    """
+    return snapshot_backed('revenue_summary', _fetch_revenue_summary_data)
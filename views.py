@@ -0,0 +1,161 @@
+"""
+Everything the dashboard derives from one filter selection, computed in one place.
+
+compute_view / compute_deep_dive_figures are plain functions so they can run
+outside Streamlit (the pre-warm worker processes in prewarm.py); view_aggregates
+and deep_dive_figures are the cached entry points the app calls, keyed on
+(data version, filter key) like the other per-filter caches. The Deep Dive
+figures are kept separate so the Executive Overview never pays for them (or for
+importing plotly.express).
+"""
+import streamlit as st
+
+from pipeline import (
+    cols_to_sum, VIEW_COLUMNS, apply_filters, prepare_shared_data, funnel_counts, stage_conversion,
+    bottleneck_counts, build_avp_perf, build_avp_metrics,
+)
+from ranking import compute_dimension_totals, measure_values, rank_values
+from timeseries import compute_time_series, trend_direction
+from charts import (
+    build_funnel_figure, build_conversion_figure, build_performance_figure,
+    build_brand_treemap, build_trend_figure,
+)
+
+
+def compute_view(df, filter_key):
+    """
+    Aggregates (and the overview funnel figure) for one filter state, as a dict.
+    """
+    selected_type, selected_months, selected_sbu = filter_key
+    # Only the rows and columns the aggregates read; the shared frame is not copied
+    filtered_df = apply_filters(df, selected_type, selected_months, selected_sbu, columns=VIEW_COLUMNS)
+
+    agg_df, display_df, total_data = prepare_shared_data(filtered_df)
+    brand_totals = compute_dimension_totals(filtered_df, 'Brand Name')
+    avp_totals = compute_dimension_totals(filtered_df, 'AVP')
+    funnel_data = funnel_counts(filtered_df)
+
+    return {
+        'agg_df': agg_df,
+        'display_df': display_df,
+        'total_data': total_data,
+        'brand_totals': brand_totals,
+        'brand_ranking': rank_values(measure_values(brand_totals, 'C3'), k=5),
+        'avp_totals': avp_totals,
+        'avp_metrics': build_avp_metrics(avp_totals),
+        'ts_metrics': compute_time_series(agg_df),
+        'funnel_data': funnel_data,
+        'conversion': stage_conversion(filtered_df),
+        'bottleneck_counts': bottleneck_counts(filtered_df),
+        'avp_perf': build_avp_perf(avp_totals),
+        # Built here so a warm cache skips plotly work on rerun
+        'fig_funnel': build_funnel_figure(funnel_data),
+    }
+
+
+def compute_deep_dive_figures(view):
+    """
+    Deep Dive figures for a compute_view bundle.
+    """
+    fig_perf, perf_plot_df = build_performance_figure(view['avp_perf'])
+    return {
+        'fig_conv': build_conversion_figure(view['conversion']['conversion_data']),
+        'fig_perf': fig_perf,
+        'perf_plot_df': perf_plot_df,
+        'fig_brands': build_brand_treemap(view['brand_ranking']),
+        'fig_trend': build_trend_figure(view['agg_df'], view['ts_metrics']),
+    }
+
+
+def pipeline_table_html(view):
+    """
+    The Executive Overview C0-C3 pipeline table (months, TOTAL row, MoM trend
+    arrows) as HTML, styled by the app's .pipeline-table CSS.
+    """
+    display_df, total_data, ts_metrics = view['display_df'], view['total_data'], view['ts_metrics']
+
+    def fmt_cr(val):
+        return f"₹{val/10000000:.1f} Cr"
+
+    # Construct HTML Table with Trends
+    html = '<div class="table-wrapper">'
+    html += '<div class="scroll-area">'
+    html += '<table class="pipeline-table" style="margin:0;">'
+    html += '<thead><tr><th>Month</th><th>C0 - Ideation</th><th>C1 - Pitch</th><th>C2 - Negotiation</th><th>C3 - Closed</th></tr></thead>'
+    html += '<tbody>'
+
+    # Trend arrows from the cached MoM % (vs previous month in view; first row / zero base = neutral)
+    def trend_span(direction, diff):
+        if direction == 'up':
+            return f'<span class="trend-up">▲<span class="trend-pct">{diff:.0f}%</span></span>'
+        if direction == 'down':
+            return f'<span class="trend-down">▼<span class="trend-pct">{abs(diff):.0f}%</span></span>'
+        return '<span class="trend-neutral">-<span class="trend-pct">0%</span></span>'
+
+    trend_cells = {}
+    for col in cols_to_sum:
+        mom_pct = ts_metrics[f'{col} MoM %'].values
+        trend_cells[col] = [trend_span(d, p) for d, p in zip(trend_direction(mom_pct), mom_pct)]
+
+    for i in range(len(display_df)):
+        row = display_df.iloc[i]
+
+        row_html = f"<tr><td>{row['Month_Year']}</td>"
+        for col in cols_to_sum:
+            row_html += f"<td>{fmt_cr(row[col])}{trend_cells[col][i]}</td>"
+        row_html += "</tr>"
+        html += row_html
+
+    html += f"<tr class='total-row'><td>TOTAL</td><td>{fmt_cr(total_data['C0'])}</td><td>{fmt_cr(total_data['C1'])}</td><td>{fmt_cr(total_data['C2'])}</td><td>{fmt_cr(total_data['C3'])}</td></tr>"
+    html += '</tbody></table></div>'
+    return html
+
+
+def build_detail_table(totals):
+    """
+    One row per AVP / brand from the view's dimension totals: C0-C3 and Total
+    Pipeline in ₹ Cr, deal count and conversion (C3 / pipeline), plus the
+    matching totals row.
+    """
+    name = totals.index.name
+    rows = (totals[cols_to_sum] / 10000000).reset_index()
+    rows[name] = rows[name].astype(str)  # Sorts by name, not by category code
+    rows['Total Pipeline'] = rows['C0'] + rows['C1'] + rows['C2']
+    rows['Deals'] = totals['Deal Count'].to_numpy()
+    pipeline = rows['Total Pipeline'].where(rows['Total Pipeline'] > 0)
+    rows['Conversion %'] = (rows['C3'] / pipeline * 100).fillna(0)
+
+    total = rows.drop(columns=name).sum()
+    total['Conversion %'] = total['C3'] / total['Total Pipeline'] * 100 if total['Total Pipeline'] > 0 else 0
+    total[name] = 'TOTAL'
+    return rows, total[rows.columns]
+
+
+@st.cache_data(max_entries=64)
+def detail_table(_view, data_version, filter_key, dimension):
+    """
+    build_detail_table for 'AVP' or 'Brand Name', cached per filter state.
+    """
+    return build_detail_table(_view['avp_totals'] if dimension == 'AVP' else _view['brand_totals'])
+
+
+@st.cache_data(max_entries=256)
+def view_aggregates(_df, data_version, filter_key, _precomputed=None):
+    """
+    compute_view, cached per (data version, filter state). The pre-warmer passes a
+    bundle it computed in a worker process as `_precomputed` (not part of the key),
+    which seeds this cache so the first real visit to that view is a hit.
+    """
+    if _precomputed is not None:
+        return _precomputed
+    return compute_view(_df, filter_key)
+
+
+@st.cache_data(max_entries=256)
+def deep_dive_figures(_view, data_version, filter_key, _precomputed=None):
+    """
+    compute_deep_dive_figures, cached and seeded like view_aggregates.
+    """
+    if _precomputed is not None:
+        return _precomputed
+    return compute_deep_dive_figures(_view)